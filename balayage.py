@@ -0,0 +1,202 @@
+import os
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from execution_amie import ExecutionAmie, ArchiveClasses, construire_commande
+from regles_amie import TableRegles, ParseurAmie
+
+def lire_valeurs(texte):
+    # "0.1, 0.3; 0.5" -> ["0.1", "0.3", "0.5"] (valeurs conservées telles que saisies)
+    return [v.strip() for v in texte.replace(";", ",").split(",") if v.strip()]
+
+def grille_parametres(valeurs_minc, valeurs_minpca, valeurs_const=(False,)):
+    # Produit cartésien des valeurs, sans doublon et dans l'ordre de saisie
+    grille = []
+    for minc, minpca, const in itertools.product(valeurs_minc, valeurs_minpca, valeurs_const):
+        configuration = (str(minc), str(minpca), bool(const))
+        if configuration not in grille:
+            grille.append(configuration)
+    return grille
+
+def repartir_coeurs(nb_coeurs, nb_configurations, max_paralleles=None):
+    # Nombre d'exécutions simultanées et valeur de -nc pour chacune, sans dépasser nb_coeurs
+    nb_coeurs = max(1, int(nb_coeurs or os.cpu_count() or 1))
+    paralleles = max(1, min(nb_configurations, max_paralleles or nb_coeurs, nb_coeurs))
+    return paralleles, max(1, nb_coeurs // paralleles)
+
+# <-------------------------->
+# Résultat d'une configuration
+# <-------------------------->
+class ResultatConfiguration:
+    def __init__(self, minc, minpca, const):
+        self.minc = minc
+        self.minpca = minpca
+        self.const = const
+        self.nc = None
+        self.commande = None  # Ligne de commande d'AMIE3, une fois lancée
+        self.statut = ExecutionAmie.EN_ATTENTE
+        self.duree = None
+        self.erreur = None
+        self.lignes = []
+        self.regles = None  # TableRegles, remplie à la fin de l'exécution
+        self.stats = {}
+        self.reutilise = False
+
+    @property
+    def cle(self):
+        # -nc ne change pas les règles produites : il ne fait pas partie de la clé
+        return (self.minc, self.minpca, self.const)
+
+    def resume(self):
+        regles = self.regles if self.regles is not None else TableRegles()
+        pca = regles.colonne("pca_confidence")
+        hc = regles.colonne("head_coverage")
+        return {
+            "minc": self.minc,
+            "minpca": self.minpca,
+            "const": self.const,
+            "nc": self.nc,
+            "statut": self.statut,
+            "duree": self.duree,
+            "nb_regles": len(regles),
+            "pca_moyenne": float(pca.mean()) if len(pca) else 0.0,
+            "pca_max": float(pca.max()) if len(pca) else 0.0,
+            "hc_moyenne": float(hc.mean()) if len(hc) else 0.0,
+            "reutilise": self.reutilise,
+        }
+
+def tableau_resultats(resultats):
+    # Une ligne par configuration, colonnes alignées pour comparer les exécutions
+    entetes = ["minc", "minpca", "const", "nc", "statut", "durée (s)", "règles", "PCA moy.", "PCA max", "HC moy."]
+    lignes = [entetes]
+    for resultat in resultats:
+        r = resultat.resume()
+        duree = f"{r['duree']:.1f}" if r["duree"] is not None else "-"
+        if r["reutilise"]:
+            duree += " (réutilisé)"
+        lignes.append([r["minc"], r["minpca"], "oui" if r["const"] else "non", str(r["nc"] or "-"), r["statut"], duree,
+                       str(r["nb_regles"]), f"{r['pca_moyenne']:.4f}", f"{r['pca_max']:.4f}", f"{r['hc_moyenne']:.4f}"])
+    largeurs = [max(len(l[k]) for l in lignes) for k in range(len(entetes))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(l, largeurs)).rstrip() for l in lignes)
+
+# <-------------------------->
+# Balayage de paramètres
+# <-------------------------->
+class BalayageAmie:
+    # Lance une exécution d'AMIE par configuration, au plus `paralleles` à la fois, en partageant
+    # les cœurs de la machine entre elles via -nc. Les configurations déjà terminées (dictionnaire
+    # `termines`, clé ResultatConfiguration.cle) sont reprises sans relancer AMIE.
+    # on_resultat(resultat) et on_fin(balayage) sont appelés depuis les threads de lecture.
+    def __init__(self, jar_path, input_path, configurations, nb_coeurs=None, max_paralleles=None,
+                 timeout=None, termines=None, nouvelle_table=None, on_resultat=None, on_fin=None, java="java"):
+        self.jar_path = jar_path
+        self.input_path = input_path
+        self.timeout = timeout
+        self.java = java
+        self.nouvelle_table = nouvelle_table or TableRegles
+        self.on_resultat = on_resultat
+        self.on_fin = on_fin
+        self.resultats = [ResultatConfiguration(*c) for c in configurations]
+        termines = termines or {}
+        self._a_lancer = []
+        for resultat in self.resultats:
+            precedent = termines.get(resultat.cle)
+            if precedent is not None and precedent.statut == ExecutionAmie.TERMINE:
+                resultat.__dict__.update(precedent.__dict__)
+                resultat.reutilise = True
+            else:
+                self._a_lancer.append(resultat)
+        self.paralleles, self.nc = repartir_coeurs(nb_coeurs, len(self._a_lancer), max_paralleles)
+        self.executions = {}  # ResultatConfiguration -> ExecutionAmie en cours
+        self.debut = None
+        self.duree = None
+        self._verrou = threading.Lock()
+        self._annule = False
+        self._fini = threading.Event()
+
+    def demarrer(self):
+        self.debut = time.perf_counter()
+        for resultat in self.resultats:
+            if resultat.reutilise and self.on_resultat:
+                self.on_resultat(resultat)
+        for _ in range(self.paralleles):
+            self._lancer_suivante()
+        self._verifier_fin()
+
+    def _lancer_suivante(self):
+        with self._verrou:
+            if self._annule or not self._a_lancer:
+                return
+            resultat = self._a_lancer.pop(0)
+            resultat.nc = self.nc
+            resultat.statut = ExecutionAmie.EN_COURS
+            archive = ArchiveClasses(self.jar_path, java=self.java)
+            commande = construire_commande(self.jar_path, self.input_path, resultat.minc, resultat.minpca,
+                                           self.nc, const=resultat.const, java=self.java, options_jvm=archive.options_jvm())
+            execution = ExecutionAmie(commande, timeout=self.timeout, archive_classes=archive,
+                                      on_fin=lambda e, r=resultat: self._fin_execution(r, e))
+            self.executions[resultat] = execution
+        # demarrer() peut rappeler _fin_execution immédiatement (échec du lancement) : hors verrou
+        execution.demarrer()
+
+    def _fin_execution(self, resultat, execution):
+        table = self.nouvelle_table()
+        parseur = ParseurAmie(table)
+        parseur.alimenter_lignes(execution.lignes)
+        resultat.lignes = execution.lignes
+        resultat.commande = execution.commande
+        resultat.regles = table
+        resultat.stats = parseur.stats
+        resultat.statut = execution.statut
+        resultat.duree = execution.duree
+        resultat.erreur = execution.erreur
+        if self.on_resultat:
+            self.on_resultat(resultat)
+        # Retirée seulement maintenant : on_fin ne doit pas précéder le dernier on_resultat
+        self._lancer_suivante()
+        with self._verrou:
+            self.executions.pop(resultat, None)
+        self._verifier_fin()
+
+    def _verifier_fin(self):
+        with self._verrou:
+            if self.executions or (self._a_lancer and not self._annule) or self._fini.is_set():
+                return
+            self._fini.set()
+        self.duree = time.perf_counter() - self.debut
+        if self.on_fin:
+            self.on_fin(self)
+
+    @property
+    def en_cours(self):
+        return self.debut is not None and not self._fini.is_set()
+
+    def annuler(self):
+        # Les configurations en attente sont abandonnées, celles en cours arrêtées
+        with self._verrou:
+            self._annule = True
+            for resultat in self._a_lancer:
+                resultat.statut = ExecutionAmie.ANNULE
+            self._a_lancer = []
+            executions = list(self.executions.values())
+        for execution in executions:
+            execution.annuler()
+        self._verifier_fin()
+
+    def attendre(self, timeout=None):
+        return self._fini.wait(timeout)
+
+    def nb_termines(self):
+        return sum(1 for r in self.resultats if r.statut not in (ExecutionAmie.EN_ATTENTE, ExecutionAmie.EN_COURS))
+
+    def tableau(self):
+        return tableau_resultats(self.resultats)
+
+    def meilleur(self, critere="pca_moyenne"):
+        termines = [r for r in self.resultats if r.statut == ExecutionAmie.TERMINE]
+        if not termines:
+            return None
+        return termines[int(np.argmax([r.resume()[critere] for r in termines]))]
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows : ni mémoire maximale ni temps CPU des sous-processus
+    resource = None
+
+from generateur_cohorte import CohorteSource, generer_cohorte
+from traces import memoire_max_mo, rss_en_mo
+
+# Banc d'essai du pipeline sur des cohortes synthétiques de taille croissante :
+#   python benchmark.py ontology.owl --facteurs 10,100,1000 -o resultats.json
+#   python benchmark.py ontology.owl --facteurs 10,100 --reference resultats.json  (détection de régressions)
+# Chaque étape tourne dans un processus neuf : la mémoire maximale mesurée est bien celle de l'étape.
+# Code de retour 1 si une étape est plus lente (ou plus gourmande) que la référence au-delà du seuil.
+
+ETAPES = ["conversion_ttl", "conversion_tsv", "filtrage", "amie", "analyse", "qualite", "sauvegarde", "sauvegarde_binaire",
+          "lecture_binaire", "sauvegarde_compressee", "lecture_compressee", "affichage"]
+
+# Sortie d'AMIE3 de référence, analysée quand AMIE3 n'a pas pu tourner sur la cohorte
+REGLES_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regles_extraites.txt")
+
+# Les mesures plus courtes que ceci sont trop bruitées pour signaler une régression
+DUREE_MIN_COMPARAISON = 0.05
+
+class EtapeIgnoree(Exception):
+    pass
+
+# <-------------------------->
+# Étapes mesurées (exécutées dans le processus fils)
+# <-------------------------->
+def _fichier(contexte, nom):
+    return os.path.join(contexte["dossier"], nom)
+
+def _etape_conversion_ttl(contexte):
+    from conversion import convert_owl_to_ttl
+    if not convert_owl_to_ttl(contexte["cohorte"], _fichier(contexte, "cohorte.ttl")):
+        raise RuntimeError("conversion en Turtle échouée")
+    return {"octets": os.path.getsize(_fichier(contexte, "cohorte.ttl"))}
+
+def _etape_conversion_tsv(contexte):
+    from conversion import convertir_en_tsv
+    stats = convertir_en_tsv(contexte["cohorte"], _fichier(contexte, "cohorte.tsv"))
+    if stats is None:
+        raise RuntimeError("conversion en TSV échouée")
+    return {"faits": stats["faits"]}
+
+def _etape_filtrage(contexte):
+    from filtrage import filtrer_fichier, ConfigurationFiltre
+    stats = filtrer_fichier(contexte["cohorte"], _fichier(contexte, "cohorte_filtree.nt"), ConfigurationFiltre.profil_clinique())
+    if stats is None:
+        raise RuntimeError("filtrage échoué")
+    return {"faits": stats["lus"], "conserves": stats["conserves"], "inferes": stats["inferes"]}
+
+def _etape_amie(contexte):
+    from execution_amie import ExecutionAmie, construire_commande
+    jar = contexte["jar"]
+    if not jar or not os.path.exists(jar) or shutil.which("java") is None:
+        raise EtapeIgnoree("java ou amie3.5.1.jar introuvable")
+    entree = _fichier(contexte, "cohorte.tsv")
+    if not os.path.exists(entree):
+        raise EtapeIgnoree("pas d'entrée TSV (étape conversion_tsv non exécutée)")
+    execution = ExecutionAmie(construire_commande(jar, entree, contexte["minc"], contexte["minpca"], os.cpu_count() or 1),
+                              timeout=contexte["timeout"])
+    execution.demarrer()
+    execution.attendre()
+    if execution.statut != ExecutionAmie.TERMINE:
+        raise RuntimeError(f"AMIE3 : {execution.statut} {execution.erreur or ''}".strip())
+    with open(_fichier(contexte, "regles_amie.txt"), "w", encoding="utf-8") as f:
+        f.writelines(ligne + "\n" for ligne in execution.lignes)
+    return {"lignes": len(execution.lignes)}
+
+def _sortie_amie(contexte):
+    chemin = _fichier(contexte, "regles_amie.txt")
+    if os.path.exists(chemin):
+        return chemin
+    # Sans AMIE3, la sortie de référence est recopiée autant de fois que le facteur de la cohorte
+    with open(REGLES_REFERENCE, "r", encoding="utf-8") as f:
+        lignes = f.readlines()
+    regles = [l for l in lignes if "=>" in l]
+    chemin = _fichier(contexte, "regles_repliquees.txt")
+    with open(chemin, "w", encoding="utf-8") as f:
+        f.writelines(l for l in lignes if "=>" not in l)
+        for _ in range(max(1, int(contexte["facteur"]))):
+            f.writelines(regles)
+    return chemin
+
+def _etape_analyse(contexte):
+    from regles_amie import lire_sortie_amie
+    parseur = lire_sortie_amie(_sortie_amie(contexte))
+    return {"regles": len(parseur.table)}
+
+def _etape_qualite(contexte):
+    from regles_amie import lire_sortie_amie
+    from qualite import EvaluateurQualite
+    from index_triplets import IndexTriplets
+    table = lire_sortie_amie(_sortie_amie(contexte)).table
+    index = IndexTriplets.depuis_fichier(contexte["cohorte"])
+    metriques = EvaluateurQualite(index).evaluer_table(table)
+    return {"faits": len(index), "regles": len(table), "pca_moyenne": float(metriques["pca_confidence"].mean()) if len(table) else 0.0}
+
+def _etape_sauvegarde(contexte):
+    from modele import RuleExtractionModel
+    model = RuleExtractionModel(historique=False)
+    if model.extraire_regles(_sortie_amie(contexte)) is None:
+        raise RuntimeError("lecture des règles échouée")
+    debut = time.perf_counter()
+    if not model.sauvegarder_regles(_fichier(contexte, "regles_sauvegardees.txt")):
+        raise RuntimeError("sauvegarde échouée")
+    return {"regles": len(model.regles), "duree_ecriture": time.perf_counter() - debut}
+
+def _sauvegarde_binaire(contexte, compresser):
+    from modele import RuleExtractionModel
+    model = RuleExtractionModel(historique=False)
+    if model.extraire_regles(_sortie_amie(contexte)) is None:
+        raise RuntimeError("lecture des règles échouée")
+    chemin = _fichier(contexte, "regles_compressees.regles" if compresser else "regles.regles")
+    debut = time.perf_counter()
+    if not model.sauvegarder_regles(chemin, binaire=True, compresser=compresser):
+        raise RuntimeError("sauvegarde binaire échouée")
+    return {"regles": len(model.regles), "duree_ecriture": time.perf_counter() - debut, "octets": os.path.getsize(chemin)}
+
+def _lecture_binaire(contexte, compresser):
+    # Ouverture (en-tête, décompression), puis parcours de toutes les colonnes comme un tri ou un filtre
+    from regles_amie import COLONNES_METRIQUES
+    from regles_binaires import charger_regles_binaire
+    chemin = _fichier(contexte, "regles_compressees.regles" if compresser else "regles.regles")
+    if not os.path.exists(chemin):
+        etape = "sauvegarde_compressee" if compresser else "sauvegarde_binaire"
+        raise EtapeIgnoree(f"pas de fichier de règles binaire (étape {etape} non exécutée)")
+    debut = time.perf_counter()
+    table = charger_regles_binaire(chemin)
+    ouverture = time.perf_counter() - debut
+    for nom, _ in COLONNES_METRIQUES:
+        table.colonne(nom).sum()
+    int(table.atomes.sum())
+    textes = [table.texte_regle(i) for i in (0, len(table) - 1)] if len(table) else []
+    return {"regles": len(table), "duree_ouverture": ouverture, "octets_textes": sum(map(len, textes))}
+
+def _etape_sauvegarde_binaire(contexte):
+    return _sauvegarde_binaire(contexte, compresser=False)
+
+def _etape_sauvegarde_compressee(contexte):
+    return _sauvegarde_binaire(contexte, compresser=True)
+
+def _etape_lecture_binaire(contexte):
+    return _lecture_binaire(contexte, compresser=False)
+
+def _etape_lecture_compressee(contexte):
+    return _lecture_binaire(contexte, compresser=True)
+
+def _etape_affichage(contexte):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtWidgets import QApplication, QTableView
+        from interfaceV2 import ModeleTableRegles
+    except ImportError:
+        raise EtapeIgnoree("PyQt5 non installé")
+    from regles_amie import lire_sortie_amie
+    table = lire_sortie_amie(_sortie_amie(contexte)).table
+    app = QApplication.instance() or QApplication([])
+    # Comme do_lister_regles : le tableau suit la table, puis tri par confiance PCA et défilement jusqu'en bas
+    modele = ModeleTableRegles()
+    vue = QTableView()
+    vue.setModel(modele)
+    vue.verticalHeader().setDefaultSectionSize(22)
+    vue.resize(1000, 600)
+    vue.show()
+    modele.synchroniser(table)
+    app.processEvents()
+    modele.sort(4, Qt.DescendingOrder)
+    vue.scrollToBottom()
+    app.processEvents()
+    return {"regles": len(table), "lignes": modele.rowCount()}
+
+def _mesurer(nom, contexte):
+    # Exécuté dans un processus neuf ; RUSAGE_CHILDREN couvre les sous-processus (java pour AMIE3)
+    memoire_base = memoire_max_mo()
+    debut, debut_cpu = time.perf_counter(), time.process_time()
+    try:
+        compteurs = globals()[f"_etape_{nom}"](contexte)
+        statut = "ok"
+    except EtapeIgnoree as e:
+        compteurs, statut = {"raison": str(e)}, "ignorée"
+    except Exception as e:
+        compteurs, statut = {"raison": str(e)}, "erreur"
+    duree, cpu = time.perf_counter() - debut, time.process_time() - debut_cpu
+    memoire_max = None
+    if resource is not None:
+        enfants = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += enfants.ru_utime + enfants.ru_stime
+        memoire_max = rss_en_mo(max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, enfants.ru_maxrss))
+    return dict(compteurs, statut=statut, duree=duree, cpu=cpu, memoire_max_mo=memoire_max, memoire_base_mo=memoire_base)
+
+def executer_etape(nom, contexte):
+    # "spawn" : le processus fils ne reçoit rien de la mémoire du parent
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_mesurer, nom, contexte).result()
+
+# <-------------------------->
+# Campagne et comparaison
+# <-------------------------->
+def executer_campagne(source, facteurs, dossier, etapes=ETAPES, jar=None, graine=0, minc=0.1, minpca=0.5, timeout=None, afficher=print):
+    cohorte = CohorteSource(source)
+    resultats = {}
+    for facteur in facteurs:
+        dossier_facteur = os.path.join(dossier, f"x{facteur:g}")
+        os.makedirs(dossier_facteur, exist_ok=True)
+        chemin = os.path.join(dossier_facteur, "cohorte.owl")
+        debut = time.perf_counter()
+        stats = generer_cohorte(source, chemin, facteur, graine, cohorte=cohorte)
+        afficher(f"Cohorte ×{facteur:g} : {stats['patients']} patients, {stats['faits']} faits ({time.perf_counter() - debut:.1f} s)")
+        contexte = {"cohorte": chemin, "dossier": dossier_facteur, "facteur": facteur, "jar": jar,
+                    "minc": minc, "minpca": minpca, "timeout": timeout}
+        mesures = {"cohorte": stats}
+        for nom in etapes:
+            mesure = executer_etape(nom, contexte)
+            mesures[nom] = mesure
+            if mesure["statut"] == "ok":
+                memoire = "-" if mesure["memoire_max_mo"] is None else f"{mesure['memoire_max_mo']:.1f}"
+                afficher(f"  {nom:<22} {mesure['duree']:8.2f} s  cpu {mesure['cpu']:8.2f} s  {memoire:>8} Mo")
+            else:
+                afficher(f"  {nom:<22} {mesure['statut']} : {mesure['raison']}")
+        resultats[f"{facteur:g}"] = mesures
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "systeme": platform.platform(), "processeur": platform.processor(),
+                    "coeurs": os.cpu_count()},
+        "source": os.path.abspath(source),
+        "facteurs": resultats,
+    }
+
+def comparer(resultats, reference, seuil=0.2):
+    # Régressions : (facteur, étape, mesure, valeur de référence, valeur actuelle), au-delà de (1 + seuil) × référence
+    regressions = []
+    for facteur, mesures in resultats["facteurs"].items():
+        for nom, mesure in mesures.items():
+            ancienne = reference.get("facteurs", {}).get(facteur, {}).get(nom)
+            if nom == "cohorte" or not ancienne or mesure.get("statut") != "ok" or ancienne.get("statut") != "ok":
+                continue
+            for cle in ("duree", "memoire_max_mo"):
+                if ancienne.get(cle) is None or mesure.get(cle) is None:
+                    continue  # Mémoire non mesurée (Windows)
+                if cle == "duree" and ancienne[cle] < DUREE_MIN_COMPARAISON:
+                    continue
+                if mesure[cle] > (1 + seuil) * ancienne[cle]:
+                    regressions.append((facteur, nom, cle, ancienne[cle], mesure[cle]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline sur des cohortes LLC synthétiques.")
+    parser.add_argument("source", nargs="?", default="ontology.owl", help="Ontologie d'origine de la cohorte")
+    parser.add_argument("--facteurs", default="10,100,1000", help="Tailles des cohortes, en multiples de l'originale")
+    parser.add_argument("--etapes", default=",".join(ETAPES), help="Étapes à mesurer, parmi : " + ", ".join(ETAPES))
+    parser.add_argument("-o", "--sortie", default="benchmark.json", help="Fichier JSON des résultats")
+    parser.add_argument("--reference", help="Résultats précédents (JSON) auxquels se comparer")
+    parser.add_argument("--seuil", type=float, default=0.2, help="Hausse relative tolérée avant de signaler une régression")
+    parser.add_argument("--dossier", default=None, help="Dossier de travail (cohortes et fichiers intermédiaires)")
+    parser.add_argument("--jar", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "amie3.5.1.jar"),
+                        help="Chemin de amie3.5.1.jar")
+    parser.add_argument("--graine", type=int, default=0, help="Graine de la génération des cohortes")
+    parser.add_argument("--minc", type=float, default=0.1)
+    parser.add_argument("--minpca", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=None, help="Durée maximale d'AMIE3 par cohorte, en secondes")
+    args = parser.parse_args(argv)
+
+    try:
+        facteurs = [float(f) for f in args.facteurs.split(",") if f.strip()]
+    except ValueError:
+        print(f"Facteurs invalides : {args.facteurs}")
+        return 1
+    etapes = [e.strip() for e in args.etapes.split(",") if e.strip()]
+    inconnues = [e for e in etapes if e not in ETAPES]
+    if inconnues or not facteurs:
+        print(f"Étapes inconnues : {', '.join(inconnues)}" if inconnues else "Aucun facteur de taille.")
+        return 1
+    reference = None
+    if args.reference:
+        try:
+            with open(args.reference, "r", encoding="utf-8") as f:
+                reference = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Référence illisible : {e}")
+            return 1
+
+    dossier = args.dossier or os.path.join(os.path.dirname(os.path.abspath(args.sortie)), "benchmark_travail")
+    try:
+        resultats = executer_campagne(args.source, facteurs, dossier, etapes, jar=args.jar, graine=args.graine,
+                                      minc=args.minc, minpca=args.minpca, timeout=args.timeout)
+    except (OSError, ValueError) as e:
+        print(f"Erreur lors du banc d'essai : {e}")
+        return 1
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.sortie}")
+
+    if reference is not None:
+        regressions = comparer(resultats, reference, args.seuil)
+        for facteur, nom, cle, avant, apres in regressions:
+            print(f"Régression ×{facteur} {nom} ({cle}) : {avant:.3f} → {apres:.3f} (+{(apres / avant - 1) * 100:.0f} %)")
+        if regressions:
+            return 1
+        print(f"Aucune régression au-delà de {args.seuil * 100:.0f} % par rapport à {args.reference}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
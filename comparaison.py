@@ -0,0 +1,184 @@
+import ast
+import hashlib
+import itertools
+
+import numpy as np
+
+from regles_amie import ParseurAmie, COLONNES_METRIQUES, est_variable
+from regles_binaires import est_fichier_binaire, charger_regles_binaire
+
+# <-------------------------->
+# Forme canonique des règles
+# <-------------------------->
+def _terme_complet(table, terme):
+    # Les préfixes (p7, ...) changent d'une exécution à l'autre : on compare des IRIs complètes,
+    # y compris pour le type d'un littéral ("true"^^p8:boolean)
+    if terme.startswith('"'):
+        lexical, sep, type_ = terme.rpartition('"^^')
+        if sep:
+            return lexical + sep + table.developper_terme(type_.rstrip(">"))
+        return terme
+    return table.developper_terme(terme)
+
+def canoniser(corps, tete):
+    # Deux règles égales à un renommage des variables et à l'ordre des atomes du corps près ont
+    # la même forme canonique. Les variables sont renommées dans l'ordre d'apparition (tête, puis
+    # corps) ; l'ordre du corps est fixé par une clé indépendante des noms de variables, et seuls
+    # les atomes de même clé sont permutés, en gardant la plus petite forme obtenue.
+    noms_tete = {}
+    for terme in (tete[0], tete[2]):
+        if terme[:1] == "?" and terme not in noms_tete:
+            noms_tete[terme] = f"?v{len(noms_tete)}"
+
+    cles = sorted(((tuple([noms_tete.get(t, "?") if t[:1] == "?" else t for t in a]), a) for a in corps))
+    if len({c for c, _ in cles}) == len(cles):
+        # Cas courant : aucune égalité de clé, un seul ordre possible
+        ordres = [[a for _, a in cles]]
+    else:
+        groupes = [[a for _, a in g] for _, g in itertools.groupby(cles, key=lambda x: x[0])]
+        ordres = (itertools.chain.from_iterable(o) for o in itertools.product(*(itertools.permutations(g) for g in groupes)))
+    tete_forme = "  ".join([noms_tete.get(t, t) for t in tete])
+    meilleure = None
+    for ordre in ordres:
+        noms = dict(noms_tete)
+        atomes = []
+        for atome in ordre:
+            for t in atome:
+                if t not in noms and t[:1] == "?":
+                    noms[t] = f"?v{len(noms)}"
+            atomes.append("  ".join([noms.get(t, t) for t in atome]))
+        atomes.sort()
+        forme = "  ".join(atomes) + "   => " + tete_forme
+        if meilleure is None or forme < meilleure:
+            meilleure = forme
+    return meilleure
+
+def empreinte(forme):
+    return int.from_bytes(hashlib.blake2b(forme.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def empreintes_table(table):
+    # Empreinte 64 bits de la forme canonique de chaque règle de la table
+    termes = [t if est_variable(t) else _terme_complet(table, t) for t in table.termes]
+    debut = table.debut_atomes.tolist()
+    atomes = [(termes[s], termes[p], termes[o]) for s, p, o in table.atomes.tolist()]
+    resultat = np.zeros(len(table), dtype=np.int64)
+    for i, (d, f) in enumerate(zip(debut[:-1], debut[1:])):
+        atomes_regle = atomes[d:f]
+        resultat[i] = empreinte(canoniser(atomes_regle[:-1], atomes_regle[-1]))
+    return resultat
+
+# <-------------------------->
+# Chargement des ensembles de règles
+# <-------------------------->
+def charger_ensemble(path):
+    # Sortie d'AMIE (texte ou TSV), ou fichier de règles sauvegardé (binaire, ou un dictionnaire par ligne)
+    if est_fichier_binaire(path):
+        return charger_regles_binaire(path)
+    parseur = ParseurAmie()
+    dictionnaires = []
+    with open(path, "r", encoding="utf-8") as f:
+        for ligne in f:
+            if ligne.startswith("{"):
+                dictionnaires.append(ligne)
+            else:
+                parseur.alimenter(ligne)
+    table = parseur.table
+    for ligne in dictionnaires:
+        try:
+            regle = ast.literal_eval(ligne.strip())
+            table.ajouter_texte(regle["rule"], regle, regle.get("functional_variable", ""))
+        except (ValueError, SyntaxError, KeyError):
+            parseur.erreurs += 1
+    return table
+
+# <-------------------------->
+# Comparaison de plusieurs ensembles
+# <-------------------------->
+class ComparaisonRegles:
+    # Chaque ensemble est réduit aux empreintes de ses règles, puis toutes les empreintes sont
+    # triées une fois : la présence d'une règle dans chaque ensemble s'obtient par recherche
+    # dichotomique, en O(n log n) au total au lieu de comparer les textes deux à deux.
+    def __init__(self, ensembles, empreintes_calculees=None):
+        # ensembles : liste de (nom, TableRegles) ; empreintes_calculees : empreintes_table() déjà
+        # obtenues pour certains ensembles (None pour les autres)
+        self.noms = [nom for nom, _ in ensembles]
+        self.tables = [table for _, table in ensembles]
+        empreintes_calculees = empreintes_calculees or [None] * len(self.tables)
+        empreintes = []
+        self.doublons = []
+        for table, h in zip(self.tables, empreintes_calculees):
+            if h is None:
+                h = empreintes_table(table)
+            uniques, premiers = np.unique(h, return_index=True)
+            self.doublons.append(len(h) - len(uniques))
+            empreintes.append((uniques, premiers))
+        self.empreintes = np.unique(np.concatenate([u for u, _ in empreintes])) if empreintes else np.zeros(0, dtype=np.int64)
+        # indices[k, j] : numéro de la règle k dans l'ensemble j, -1 si elle en est absente
+        self.indices = np.full((len(self.empreintes), len(self.tables)), -1, dtype=np.int64)
+        for j, (uniques, premiers) in enumerate(empreintes):
+            self.indices[np.searchsorted(self.empreintes, uniques), j] = premiers
+
+    @property
+    def presence(self):
+        return self.indices >= 0
+
+    def _lignes(self, j, reference, dans_j, dans_reference):
+        presence = self.presence
+        masque = (presence[:, j] == dans_j) & (presence[:, reference] == dans_reference)
+        return np.flatnonzero(masque)
+
+    def ajoutees(self, j, reference=0):
+        # Règles de l'ensemble j absentes de la référence (indices dans l'ensemble j)
+        return self.indices[self._lignes(j, reference, True, False), j]
+
+    def supprimees(self, j, reference=0):
+        # Règles de la référence absentes de l'ensemble j (indices dans la référence)
+        return self.indices[self._lignes(j, reference, False, True), reference]
+
+    def communes(self, j, reference=0):
+        # Couples (indice dans la référence, indice dans j)
+        lignes = self._lignes(j, reference, True, True)
+        return self.indices[lignes, reference], self.indices[lignes, j]
+
+    def communes_a_tous(self):
+        return np.flatnonzero(self.presence.all(axis=1))
+
+    def ecarts(self, j, reference=0, metriques=None):
+        # Écart (j - référence) de chaque métrique sur les règles communes
+        ref, autre = self.communes(j, reference)
+        metriques = metriques or [nom for nom, _ in COLONNES_METRIQUES]
+        return ref, autre, {nom: self.tables[j].colonne(nom)[autre].astype(np.float64)
+                                 - self.tables[reference].colonne(nom)[ref].astype(np.float64) for nom in metriques}
+
+    def rapport(self, reference=0, limite=20, metrique="pca_confidence"):
+        lignes = [f"Référence : {self.noms[reference]} ({len(self.tables[reference])} règles)"]
+        if len(self.tables) > 2:
+            lignes.append(f"Règles communes à tous les ensembles : {len(self.communes_a_tous())} sur {len(self.empreintes)} distinctes")
+        for j in range(len(self.tables)):
+            if j == reference:
+                continue
+            ajoutees = self.ajoutees(j, reference)
+            supprimees = self.supprimees(j, reference)
+            ref, autre, ecarts = self.ecarts(j, reference, [metrique])
+            lignes.append("")
+            lignes.append(f"{self.noms[j]} ({len(self.tables[j])} règles) : {len(ajoutees)} ajoutées, "
+                          f"{len(supprimees)} supprimées, {len(ref)} communes")
+            if len(ref):
+                ecart = ecarts[metrique]
+                lignes.append(f"  Écart de {metrique} sur les règles communes : moyen {ecart.mean():+.4f}, "
+                              f"{int(np.count_nonzero(ecart > 0))} en hausse, {int(np.count_nonzero(ecart < 0))} en baisse")
+                ordre = np.argsort(-np.abs(ecart), kind="stable")[:limite]
+                for k in ordre:
+                    if ecart[k] == 0:
+                        break
+                    lignes.append(f"  {ecart[k]:+.4f}  {self.tables[j].texte_regle(int(autre[k]))}")
+            for titre, indices, table in (("Ajoutées", ajoutees, self.tables[j]), ("Supprimées", supprimees, self.tables[reference])):
+                if not len(indices):
+                    continue
+                lignes.append(f"  {titre} :")
+                ordre = table.trier(metrique, indices=indices)[:limite]
+                for i in ordre:
+                    lignes.append(f"    {table.colonne(metrique)[i]:.4f}  {table.texte_regle(int(i))}")
+                if len(indices) > limite:
+                    lignes.append(f"    ... et {len(indices) - limite} autres")
+        return "\n".join(lignes)
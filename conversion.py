@@ -0,0 +1,364 @@
+import os
+import time
+import json
+import hashlib
+import glob
+import tempfile
+
+# rdflib est importé dans les fonctions qui lisent ou écrivent du RDF : réutiliser une
+# conversion en cache ne le charge pas
+
+# Extension du fichier produit pour chaque format de sérialisation
+EXTENSIONS_FORMAT = {
+    "turtle": ".ttl",
+    "nt": ".nt",
+    "xml": ".owl",
+    "tsv": ".tsv",
+}
+
+# Format rdflib selon l'extension du fichier
+FORMATS_RDF = {
+    ".owl": "xml",
+    ".rdf": "xml",
+    ".xml": "xml",
+    ".ttl": "turtle",
+    ".nt": "nt",
+    ".n3": "n3",
+}
+
+def format_rdf(path):
+    return FORMATS_RDF.get(os.path.splitext(path)[1].lower(), "xml")
+
+# <-------------------------->
+# Fonctions de conversion d'ontologie
+# <-------------------------->
+def convert_owl_to_ttl(input_file, output_file, format='turtle'):
+    try:
+        from rdflib import Graph
+        g = Graph()
+        g.parse(input_file, format='xml')
+        g.serialize(destination=output_file, format=format)
+        print(f"Fichier converti : {input_file} → {output_file}")
+        return True
+    except Exception as e:
+        print(f"Erreur lors de la conversion OWL->TTL: {e}")
+        return False
+
+# <-------------------------->
+# Lecture en flux et export TSV pour AMIE
+# <-------------------------->
+class _PuitsTriplets:
+    # Remplace le Graph attendu par les analyseurs rdflib : les triplets sont seulement accumulés
+    # le temps d'un bloc, puis transmis et oubliés
+    def __init__(self):
+        self.triplets = []
+
+    def add(self, triplet):
+        self.triplets.append(triplet)
+
+    def triple(self, s, p, o):
+        self.triplets.append((s, p, o))
+
+    def bind(self, *args, **kwargs):
+        pass
+
+def iterer_triplets(path, format=None, taille_bloc=1024 * 1024):
+    # Triplets rdflib d'un fichier RDF/XML ou N-Triples, lus par blocs : la mémoire utilisée ne
+    # dépend pas de la taille du graphe. Les autres formats passent par un Graph rdflib complet.
+    format = format or format_rdf(path)
+    puits = _PuitsTriplets()
+    if format == "xml":
+        from rdflib.parser import create_input_source
+        from rdflib.plugins.parsers.rdfxml import create_parser
+        parseur = create_parser(create_input_source(source=path, format="xml"), puits)
+        with open(path, "rb") as f:
+            for bloc in iter(lambda: f.read(taille_bloc), b""):
+                parseur.feed(bloc)
+                yield from puits.triplets
+                puits.triplets = []
+        parseur.close()
+        yield from puits.triplets
+    elif format == "nt":
+        from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+        parseur = W3CNTriplesParser(sink=puits)
+        noeuds_anonymes = {}
+        with open(path, "r", encoding="utf-8") as f:
+            while True:
+                lignes = f.readlines(taille_bloc)
+                if not lignes:
+                    break
+                parseur.parsestring("".join(lignes), bnode_context=noeuds_anonymes)
+                yield from puits.triplets
+                puits.triplets = []
+    else:
+        from rdflib import Graph
+        g = Graph()
+        g.parse(path, format=format)
+        yield from g
+
+_GENRES_TERMES = {}  # classe rdflib -> "iri", "litteral" ou "anonyme"
+
+def genre_terme(terme):
+    # Nature d'un terme rdflib, mémorisée par classe : évite un import par appel sur les boucles chaudes
+    genre = _GENRES_TERMES.get(type(terme))
+    if genre is None:
+        from rdflib import Literal, BNode
+        genre = "litteral" if isinstance(terme, Literal) else "anonyme" if isinstance(terme, BNode) else "iri"
+        _GENRES_TERMES[type(terme)] = genre
+    return genre
+
+def _espace_de_noms(iri):
+    coupure = max(iri.rfind("#"), iri.rfind("/"))
+    return (iri[:coupure + 1], iri[coupure + 1:]) if coupure > 0 else ("", iri)
+
+_ECHAPPEMENTS = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+def terme_ntriples(terme):
+    # Forme N-Triples sur une seule ligne (n3() écrit les littéraux multilignes entre triples guillemets)
+    genre = genre_terme(terme)
+    if genre == "litteral":
+        texte = '"' + str(terme).translate(_ECHAPPEMENTS) + '"'
+        if terme.language:
+            return f"{texte}@{terme.language}"
+        if terme.datatype:
+            return f"{texte}^^<{terme.datatype}>"
+        return texte
+    if genre == "iri":
+        return f"<{terme}>"
+    return terme.n3()
+
+class CompacteurTermes:
+    # Réécrit les termes en jetons courts pour AMIE et garde de quoi les décoder ensuite.
+    # mode "prefixe" : <http://...#fp> -> ns3:fp ; mode "entier" : chaque terme -> e42
+    # mode None : terme N-Triples complet (<iri>, "littéral", _:nœud)
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.prefixes = {}  # espace de noms -> préfixe
+        self.ids = {}       # terme -> jeton (mode entier)
+        self.nouveaux = []  # (jeton, terme N-Triples) pas encore écrits dans le dictionnaire
+
+    def jeton(self, terme):
+        if self.mode == "entier":
+            jeton = self.ids.get(terme)
+            if jeton is None:
+                jeton = f"e{len(self.ids)}"
+                self.ids[terme] = jeton
+                self.nouveaux.append((jeton, terme_ntriples(terme)))
+            return jeton
+        if self.mode == "prefixe" and genre_terme(terme) == "iri":
+            espace, local = _espace_de_noms(str(terme))
+            if espace and local and all(c.isalnum() or c in "_-." for c in local):
+                prefixe = self.prefixes.get(espace)
+                if prefixe is None:
+                    # "ns" plutôt que "p" : AMIE nomme déjà ses propres préfixes p0, p1...
+                    prefixe = f"ns{len(self.prefixes)}"
+                    self.prefixes[espace] = prefixe
+                    self.nouveaux.append((prefixe + ":", espace))
+                return f"{prefixe}:{local}"
+        return terme_ntriples(terme)
+
+def ecrire_tsv(triplets, output_file, mode=None):
+    # Écrit un fait par ligne (sujet, prédicat, objet séparés par des tabulations), format
+    # natif d'AMIE. Le dictionnaire de décodage est écrit au fil de l'eau dans output_file.dict.
+    compacteur = CompacteurTermes(mode)
+    nb = 0
+    with open(output_file, "w", encoding="utf-8") as f, open(output_file + ".dict", "w", encoding="utf-8") as d:
+        for s, p, o in triplets:
+            f.write(f"{compacteur.jeton(s)}\t{compacteur.jeton(p)}\t{compacteur.jeton(o)}\n")
+            nb += 1
+            if compacteur.nouveaux:
+                d.writelines(f"{jeton}\t{terme}\n" for jeton, terme in compacteur.nouveaux)
+                compacteur.nouveaux = []
+    return nb
+
+def convertir_en_tsv(input_file, output_file, mode=None, triplets=None):
+    try:
+        nb = ecrire_tsv(triplets if triplets is not None else iterer_triplets(input_file), output_file, mode)
+        print(f"Fichier converti : {input_file} → {output_file} ({nb} faits)")
+        return {"faits": nb}
+    except Exception as e:
+        print(f"Erreur lors de la conversion en TSV : {e}")
+        return None
+
+class DictionnaireTermes:
+    # Décodage des jetons produits par CompacteurTermes (fichier <sortie>.dict). Les IRIs
+    # décodées sont présentées sous forme préfixée (ns0:local), comme dans la sortie d'AMIE ;
+    # self.prefixes permet ensuite de les développer.
+    def __init__(self, path):
+        self.prefixes = {}
+        self.termes = {}
+        espaces = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for ligne in f:
+                jeton, _, terme = ligne.rstrip("\n").partition("\t")
+                if jeton.endswith(":"):
+                    self.prefixes[jeton[:-1]] = terme
+                    espaces[terme] = jeton[:-1]
+                else:
+                    self.termes[jeton] = terme
+        for jeton, terme in self.termes.items():
+            if terme.startswith("<"):
+                espace, local = _espace_de_noms(terme[1:-1])
+                if espace and local:
+                    if espace not in espaces:
+                        espaces[espace] = f"ns{len(espaces)}"
+                        self.prefixes[espaces[espace]] = espace
+                    self.termes[jeton] = f"{espaces[espace]}:{local}"
+
+    def decoder(self, jeton):
+        return self.termes.get(jeton, jeton)
+
+def hash_fichier(path, taille_bloc=1024 * 1024):
+    # Empreinte SHA-256 du contenu, lue par blocs pour ne pas charger le fichier en mémoire
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+# <-------------------------->
+# Cache de conversion adressé par contenu
+# <-------------------------->
+def dossier_cache_defaut():
+    racine = os.environ.get("LLC_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "extracteur_llc")
+    return os.path.join(racine, "conversions")
+
+class ConversionCache:
+    # Les fichiers convertis sont rangés sous <empreinte>.<ext> avec un fichier <empreinte>.json
+    # de métadonnées (source, format, durée de conversion). La date de modification sert d'horodatage
+    # LRU : elle est rafraîchie à chaque réutilisation et les entrées les plus anciennes sont
+    # supprimées dès que la taille totale dépasse taille_max.
+    def __init__(self, dossier=None, taille_max=2 * 1024 ** 3):
+        self.dossier = dossier or dossier_cache_defaut()
+        self.taille_max = taille_max
+        self.hits = 0
+        self.misses = 0
+        self.temps_economise = 0.0
+        self.dernier_hit = False
+        self.derniere_duree = 0.0
+        self.derniers_details = {}
+        # Empreintes déjà calculées pendant la session : (chemin, taille, mtime) -> sha256
+        self._empreintes = {}
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def empreinte_source(self, path):
+        st = os.stat(path)
+        cle = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        if cle not in self._empreintes:
+            self._empreintes[cle] = hash_fichier(path)
+        return self._empreintes[cle]
+
+    def cle(self, empreinte, format, variante=""):
+        return hashlib.sha256(f"{empreinte}|{format}|{variante}".encode("utf-8")).hexdigest()[:32]
+
+    def chemin_entree(self, cle, format):
+        return os.path.join(self.dossier, cle + EXTENSIONS_FORMAT.get(format, "." + format))
+
+    def convertir(self, input_file, format='turtle', convertisseur=None, variante="", empreinte=None):
+        # Renvoie le chemin du fichier converti (réutilisé ou produit), ou None en cas d'échec.
+        # `convertisseur(source, destination)` produit le fichier ; par défaut, conversion rdflib.
+        # S'il renvoie un dictionnaire, celui-ci est conservé avec l'entrée (statistiques...).
+        # `variante` distingue plusieurs sorties d'une même source (filtrage, options...).
+        if convertisseur is None:
+            convertisseur = lambda src, dst: convert_owl_to_ttl(src, dst, format=format)
+        debut = time.perf_counter()
+        if empreinte is None:
+            empreinte = self.empreinte_source(input_file)
+        cle = self.cle(empreinte, format, variante)
+        chemin = self.chemin_entree(cle, format)
+        meta_path = os.path.join(self.dossier, cle + ".json")
+
+        if os.path.exists(chemin):
+            os.utime(chemin, None)
+            meta = self._lire_meta(meta_path)
+            self.hits += 1
+            self.dernier_hit = True
+            self.derniere_duree = time.perf_counter() - debut
+            self.temps_economise += max(0.0, meta.get("duree", 0.0) - self.derniere_duree)
+            self.derniers_details = meta.get("details", {})
+            print(f"Cache de conversion : réutilisation de {chemin}")
+            return chemin
+
+        self.misses += 1
+        self.dernier_hit = False
+        fd, tmp_path = tempfile.mkstemp(dir=self.dossier, prefix=".tmp-", suffix=EXTENSIONS_FORMAT.get(format, ""))
+        os.close(fd)
+        try:
+            resultat = convertisseur(input_file, tmp_path)
+            if not resultat:
+                return None
+            # Remplacement atomique : un lecteur concurrent ne voit jamais un fichier partiel.
+            # Les fichiers annexes (<sortie>.dict...) sont déplacés avant le fichier principal.
+            for annexe in glob.glob(glob.escape(tmp_path) + ".*"):
+                os.replace(annexe, chemin + annexe[len(tmp_path):])
+            os.replace(tmp_path, chemin)
+        finally:
+            for reste in [tmp_path] + glob.glob(glob.escape(tmp_path) + ".*"):
+                if os.path.exists(reste):
+                    os.remove(reste)
+        self.derniere_duree = time.perf_counter() - debut
+        self.derniers_details = resultat if isinstance(resultat, dict) else {}
+        self._ecrire_meta(meta_path, {
+            "source": os.path.abspath(input_file),
+            "empreinte": empreinte,
+            "format": format,
+            "variante": variante,
+            "duree": self.derniere_duree,
+            "details": self.derniers_details,
+        })
+        self.evincer()
+        return chemin
+
+    def _lire_meta(self, meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _ecrire_meta(self, meta_path, meta):
+        fd, tmp_path = tempfile.mkstemp(dir=self.dossier, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def entrees(self):
+        # Liste (mtime, taille, chemins) des entrées du cache, métadonnées comprises
+        groupes = {}
+        for nom in os.listdir(self.dossier):
+            if nom.startswith("."):
+                continue
+            # Une entrée peut avoir plusieurs fichiers : <clé>.tsv, <clé>.tsv.dict, <clé>.json
+            cle, _, ext = nom.partition(".")
+            chemin = os.path.join(self.dossier, nom)
+            try:
+                st = os.stat(chemin)
+            except OSError:
+                continue
+            groupe = groupes.setdefault(cle, [0.0, 0, []])
+            if ext != "json":
+                groupe[0] = max(groupe[0], st.st_mtime)
+            groupe[1] += st.st_size
+            groupe[2].append(chemin)
+        return sorted(groupes.values())
+
+    def taille_totale(self):
+        return sum(taille for _, taille, _ in self.entrees())
+
+    def evincer(self):
+        entrees = self.entrees()
+        total = sum(taille for _, taille, _ in entrees)
+        # On garde toujours l'entrée la plus récente, même si elle dépasse à elle seule la limite
+        for _, taille, chemins in entrees[:-1]:
+            if total <= self.taille_max:
+                break
+            for chemin in chemins:
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    pass
+            total -= taille
+
+    def statistiques(self):
+        return (f"Cache de conversion : {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.temps_economise:.2f} s économisées")
@@ -0,0 +1,203 @@
+import itertools
+
+import numpy as np
+
+from regles_amie import est_variable
+
+# <-------------------------->
+# Élagage des règles redondantes
+# <-------------------------->
+# Une règle est écartée si elle est :
+#   - une tautologie : l'atome de tête figure dans le corps ;
+#   - un doublon : égale à une règle conservée, au renommage des variables et à l'ordre du corps près ;
+#   - une spécialisation : une règle plus générale (corps inclus dans le sien, à une substitution
+#     des variables près, ex. une variable remplacée par une constante avec -const) atteint une
+#     confiance au moins égale. L'atome ajouté n'apporte alors rien.
+# Les règles plus générales ne sont pas cherchées par comparaison deux à deux : chaque règle est
+# rangée sous la signature de sa tête et de son corps (prédicats et constantes, variables
+# anonymisées), et une règle ne consulte que les signatures de ses généralisations possibles
+# (sous-ensembles de son corps, constantes remplacées par des variables).
+
+TAUTOLOGIE = "tautologie"
+DOUBLON = "doublon"
+SPECIALISATION = "specialisation"
+
+LIBELLES_MOTIFS = {
+    TAUTOLOGIE: "tautologie (la tête figure dans le corps)",
+    DOUBLON: "doublon de la règle",
+    SPECIALISATION: "spécialisation sans gain de la règle",
+}
+
+# Au-delà, les généralisations d'un corps sont trop nombreuses à énumérer : la règle est conservée
+MAX_ATOMES_CORPS = 6
+
+# Écart de confiance en deçà duquel deux règles sont jugées aussi confiantes l'une que l'autre
+TOLERANCE = 1e-9
+
+VARIABLE = -1
+
+def _variantes(atome, variables):
+    # Signatures des atomes plus généraux que `atome` : chaque constante peut devenir une variable
+    s, p, o = atome
+    sujets = (VARIABLE,) if s in variables else (s, VARIABLE)
+    objets = (VARIABLE,) if o in variables else (o, VARIABLE)
+    return [(s2, p, o2) for s2 in sujets for o2 in objets]
+
+def _signature(atome, variables):
+    s, p, o = atome
+    return (VARIABLE if s in variables else s, p, VARIABLE if o in variables else o)
+
+def _cles_generalisations(corps, tete, variables):
+    # Clés (signature de tête, signatures du corps triées) sous lesquelles une règle plus générale
+    # serait rangée. La clé de la règle elle-même en fait partie : elle mène à ses doublons.
+    cles = set()
+    variantes_tete = _variantes(tete, variables)
+    variantes_corps = [_variantes(a, variables) for a in corps]
+    for taille in range(1, len(corps) + 1):
+        for sous_ensemble in itertools.combinations(range(len(corps)), taille):
+            for signatures in itertools.product(*(variantes_corps[k] for k in sous_ensemble)):
+                corps_cle = tuple(sorted(signatures))
+                for t in variantes_tete:
+                    cles.add((t, corps_cle))
+    return cles
+
+def _substitution(general, specifique, variables):
+    # Cherche θ (variables de `general` -> termes de `specifique`) avec tête(general)θ = tête(specifique)
+    # et corps(general)θ inclus dans corps(specifique). Les variables de `specifique` sont des termes fixes.
+    corps_g, tete_g = general
+    corps_s, tete_s = specifique
+
+    def lier(atome, cible, theta):
+        theta = dict(theta)
+        for t, c in ((atome[0], cible[0]), (atome[2], cible[2])):
+            if t in variables:
+                if theta.setdefault(t, c) != c:
+                    return None
+            elif t != c:
+                return None
+        return theta if atome[1] == cible[1] else None
+
+    def corps(k, theta):
+        if k == len(corps_g):
+            return True
+        for cible in corps_s:
+            suite = lier(corps_g[k], cible, theta)
+            if suite is not None and corps(k + 1, suite):
+                return True
+        return False
+
+    theta = lier(tete_g, tete_s, {})
+    return theta is not None and corps(0, theta)
+
+class ElagageRegles:
+    # Résultat de l'élagage d'une table : indices conservés, et pour chaque règle écartée son motif
+    # et la règle qui la rend redondante (None pour une tautologie)
+    def __init__(self, table, mesure):
+        self.table = table
+        self.mesure = mesure
+        self.conserves = np.arange(len(table))
+        self.ecartees = {}  # indice -> (motif, indice de la règle qui la couvre)
+
+    def __len__(self):
+        return len(self.ecartees)
+
+    def nb_par_motif(self):
+        compte = {TAUTOLOGIE: 0, DOUBLON: 0, SPECIALISATION: 0}
+        for motif, _ in self.ecartees.values():
+            compte[motif] += 1
+        return compte
+
+    def resume(self):
+        compte = self.nb_par_motif()
+        return (f"{len(self.conserves)} règles conservées sur {len(self.table)} : {compte[SPECIALISATION]} spécialisations, "
+                f"{compte[DOUBLON]} doublons et {compte[TAUTOLOGIE]} tautologies écartés")
+
+    def lignes(self):
+        # (indice, règle, motif, indice couvrant, règle couvrante, confiance, confiance couvrante) par règle écartée
+        valeurs = self.table.colonne(self.mesure)
+        for i in sorted(self.ecartees):
+            motif, j = self.ecartees[i]
+            yield (i, self.table.texte_regle(i), motif, j, "" if j is None else self.table.texte_regle(j),
+                   float(valeurs[i]), None if j is None else float(valeurs[j]))
+
+    def rapport(self, limite=20):
+        lignes = [self.resume()]
+        for k, (i, regle, motif, j, couvrante, valeur, valeur_couvrante) in enumerate(self.lignes()):
+            if k == limite:
+                lignes.append(f"... ({len(self.ecartees) - limite} autres)")
+                break
+            if j is None:
+                lignes.append(f"Règle {i + 1} : {regle} : {LIBELLES_MOTIFS[motif]}")
+            else:
+                lignes.append(f"Règle {i + 1} : {regle} : {LIBELLES_MOTIFS[motif]} {j + 1} ({couvrante}), "
+                              f"{self.mesure} {valeur:.4f} ≤ {valeur_couvrante:.4f}")
+        return "\n".join(lignes)
+
+    def sauvegarder(self, path):
+        # Trace complète en TSV : une ligne par règle écartée, numérotées à partir de 1 comme dans le tableau
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"numero\tregle\tmotif\tnumero_couvrant\tregle_couvrante\t{self.mesure}\t{self.mesure}_couvrante\n")
+            for i, regle, motif, j, couvrante, valeur, valeur_couvrante in self.lignes():
+                f.write(f"{i + 1}\t{regle}\t{motif}\t{'' if j is None else j + 1}\t{couvrante}\t{valeur}\t"
+                        f"{'' if valeur_couvrante is None else valeur_couvrante}\n")
+
+    def table_reduite(self):
+        return self.table.sous_table(self.conserves)
+
+def elaguer_regles(table, mesure="pca_confidence"):
+    # Écarte les tautologies, les doublons et les spécialisations dominées de la table
+    elagage = ElagageRegles(table, mesure)
+    n = len(table)
+    if not n:
+        return elagage
+    atomes = table.atomes
+    ids = np.unique(atomes[:, [0, 2]])
+    variables = {int(t) for t in ids if est_variable(table.termes[int(t)])}
+    debut = table.debut_atomes.tolist()
+    tous = [tuple(a) for a in atomes.tolist()]
+    regles = [(tous[d:f - 1], tous[f - 1]) for d, f in zip(debut[:-1], debut[1:])]
+    valeurs = table.colonne(mesure).tolist()
+
+    # Copies exactes (mêmes atomes, corps dans un autre ordre au plus) : réglées d'abord, sans
+    # vérification, pour que l'index ne range qu'une règle par texte
+    representants = {}
+    for i, (corps, tete) in enumerate(regles):
+        if tete in corps:
+            elagage.ecartees[i] = (TAUTOLOGIE, None)
+            continue
+        j = representants.setdefault((tuple(sorted(corps)), tete), i)
+        if j != i:
+            if valeurs[i] > valeurs[j] + TOLERANCE:
+                elagage.ecartees[j] = (DOUBLON, i)
+                representants[(tuple(sorted(corps)), tete)] = i
+            else:
+                elagage.ecartees[i] = (DOUBLON, j)
+
+    # Index : clé (tête, corps) -> règles rangées sous cette signature
+    index = {}
+    for i in sorted(representants.values()):
+        corps, tete = regles[i]
+        cle = (_signature(tete, variables), tuple(sorted(_signature(a, variables) for a in corps)))
+        index.setdefault(cle, []).append(i)
+
+    for i, (corps, tete) in enumerate(regles):
+        if i in elagage.ecartees or len(corps) > MAX_ATOMES_CORPS:
+            continue
+        couvrante = None
+        for cle in _cles_generalisations(corps, tete, variables):
+            for j in index.get(cle, ()):
+                if j == i or valeurs[i] > valeurs[j] + TOLERANCE:
+                    continue
+                if couvrante is not None and valeurs[j] <= couvrante[2]:
+                    continue
+                if not _substitution(regles[j], regles[i], variables):
+                    continue
+                # Règles équivalentes : seule la première est conservée (parmi les plus confiantes)
+                equivalentes = len(regles[j][0]) == len(corps) and _substitution(regles[i], regles[j], variables)
+                if equivalentes and abs(valeurs[i] - valeurs[j]) <= TOLERANCE and j > i:
+                    continue
+                couvrante = (DOUBLON if equivalentes else SPECIALISATION, j, valeurs[j])
+        if couvrante is not None:
+            elagage.ecartees[i] = couvrante[:2]
+    elagage.conserves = np.array([i for i in range(n) if i not in elagage.ecartees], dtype=np.int64)
+    return elagage
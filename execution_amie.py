@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import uuid
+import subprocess
+import threading
+
+from traces import rss_en_mo
+
+# <-------------------------->
+# Construction de la commande AMIE3
+# <-------------------------->
+def construire_commande(jar_path, input_path, minc, minpca, nc, const=False, java="java", options_jvm=()):
+    command = [
+        java, *options_jvm, "-jar", jar_path,
+        "-minc", str(minc),
+        "-minpca", str(minpca),
+        "-nc", str(nc),
+        input_path
+    ]
+    if const:
+        command.insert(3 + len(options_jvm), "-const")
+    return command
+
+# <-------------------------->
+# Démarrage du JVM
+# <-------------------------->
+_versions_java = {}
+
+def version_java(java="java"):
+    # Version majeure du JVM (8 pour "1.8.0_292", 17 pour "17.0.2"), None si inconnue ; lue une fois par processus
+    if java not in _versions_java:
+        try:
+            sortie = subprocess.run([java, "-version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    universal_newlines=True, timeout=10).stdout
+            m = re.search(r'version "(\d+)(?:\.(\d+))?', sortie)
+        except (OSError, subprocess.SubprocessError):
+            m = None
+        majeure = int(m.group(1)) if m else None
+        _versions_java[java] = int(m.group(2) or 0) if majeure == 1 else majeure
+    return _versions_java[java]
+
+def dossier_jvm_defaut():
+    racine = os.environ.get("LLC_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "extracteur_llc")
+    return os.path.join(racine, "jvm")
+
+class ArchiveClasses:
+    # Archive des classes chargées par AMIE3 (AppCDS, JDK 13 et suivants) : la première exécution
+    # l'écrit en quittant, les suivantes la partagent et le JVM démarre plus vite. Chaque exécution
+    # écrit sous un nom temporaire qui lui est propre, renommé à la fin : des exécutions simultanées
+    # (balayage) ne produisent jamais d'archive à moitié écrite. L'archive dépend du jar. Seul le démarrage
+    # du JVM est plus court : AMIE3 relit la base de connaissances à chaque exécution.
+    def __init__(self, jar_path, java="java", dossier=None):
+        self.java = java
+        self.dossier = dossier or dossier_jvm_defaut()
+        self.temporaire = None
+        try:
+            stat = os.stat(jar_path)
+        except OSError:
+            self.chemin = None
+            return
+        self.chemin = os.path.join(self.dossier, f"amie-{int(stat.st_mtime)}-{stat.st_size}.jsa")
+
+    def options_jvm(self):
+        if self.chemin is None or (version_java(self.java) or 0) < 13:
+            return []
+        if os.path.exists(self.chemin):
+            return [f"-XX:SharedArchiveFile={self.chemin}", "-Xshare:auto"]
+        try:
+            os.makedirs(self.dossier, exist_ok=True)
+        except OSError:
+            return []
+        self.temporaire = f"{self.chemin}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+        return [f"-XX:ArchiveClassesAtExit={self.temporaire}"]
+
+    def installer(self, reussi):
+        # Après l'exécution : l'archive écrite devient celle partagée (si AMIE3 s'est terminé normalement)
+        if self.temporaire is None or not os.path.exists(self.temporaire):
+            return
+        try:
+            if reussi:
+                os.replace(self.temporaire, self.chemin)
+            else:
+                os.remove(self.temporaire)
+        except OSError:
+            pass
+
+# <-------------------------->
+# Exécution d'AMIE3 en arrière-plan
+# <-------------------------->
+class ExecutionAmie:
+    # Lance AMIE dans un sous-processus et lit sa sortie ligne par ligne dans un thread dédié.
+    # Les rappels on_ligne(ligne) et on_fin(execution) sont appelés depuis ce thread : côté
+    # interface, ils doivent passer par un signal Qt pour revenir dans le thread principal.
+    # Les lignes déjà reçues restent disponibles dans self.lignes, y compris après une
+    # annulation ou un dépassement du délai.
+    EN_ATTENTE = "en attente"
+    EN_COURS = "en cours"
+    TERMINE = "terminé"
+    ANNULE = "annulé"
+    EXPIRE = "délai dépassé"
+    ERREUR = "erreur"
+
+    def __init__(self, commande, cwd=None, timeout=None, on_ligne=None, on_fin=None, archive_classes=None):
+        self.commande = commande
+        self.archive_classes = archive_classes  # ArchiveClasses dont les options figurent dans la commande
+        self.cwd = cwd or os.getcwd()
+        self.timeout = timeout  # En secondes ; None = pas de limite
+        self.on_ligne = on_ligne
+        self.on_fin = on_fin
+        self.lignes = []
+        self.statut = self.EN_ATTENTE
+        self.code_retour = None
+        self.erreur = None
+        self.debut = None
+        self.duree = None
+        self.premiere_ligne = None  # Secondes entre le lancement et la première ligne (démarrage du JVM)
+        self.ressources = None  # Temps CPU et mémoire maximale du processus AMIE3, une fois terminé
+        self._process = None
+        self._thread = None
+        self._minuteur = None
+        self._verrou = threading.Lock()
+        self._fini = threading.Event()
+
+    @property
+    def en_cours(self):
+        return self.statut == self.EN_COURS
+
+    def demarrer(self):
+        self.debut = time.perf_counter()
+        try:
+            # stderr est fusionné dans stdout pour ne pas bloquer AMIE sur un tube plein
+            self._process = subprocess.Popen(
+                self.commande, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                cwd=self.cwd, universal_newlines=True, bufsize=1
+            )
+        except Exception as e:
+            self.erreur = str(e)
+            self._terminer(self.ERREUR)
+            return False
+        self.statut = self.EN_COURS
+        if self.timeout:
+            self._minuteur = threading.Timer(self.timeout, self._arreter, args=(self.EXPIRE,))
+            self._minuteur.daemon = True
+            self._minuteur.start()
+        self._thread = threading.Thread(target=self._lire_sortie, daemon=True)
+        self._thread.start()
+        return True
+
+    def _lire_sortie(self):
+        try:
+            for ligne in self._process.stdout:
+                ligne = ligne.rstrip("\n")
+                if self.premiere_ligne is None:
+                    self.premiere_ligne = time.perf_counter() - self.debut
+                self.lignes.append(ligne)
+                if self.on_ligne:
+                    self.on_ligne(ligne)
+            self._process.stdout.close()
+            self.code_retour = self._attendre_processus()
+        except Exception as e:
+            self.erreur = str(e)
+        if self._minuteur:
+            self._minuteur.cancel()
+        if self.erreur:
+            statut = self.ERREUR
+        elif self.code_retour != 0 and self.statut == self.EN_COURS:
+            statut = self.ERREUR
+            self.erreur = f"AMIE3 s'est terminé avec le code {self.code_retour}"
+        else:
+            statut = self.TERMINE
+        if self.archive_classes is not None:
+            self.archive_classes.installer(statut == self.TERMINE and self.statut == self.EN_COURS)
+        self._terminer(statut)
+
+    def _attendre_processus(self):
+        # os.wait4 donne aussi le temps CPU et la mémoire maximale du JVM (POSIX uniquement)
+        if hasattr(os, "wait4"):
+            try:
+                _, etat, usage = os.wait4(self._process.pid, 0)
+                self._process.returncode = os.waitstatus_to_exitcode(etat)
+                self.ressources = {"cpu": usage.ru_utime + usage.ru_stime, "memoire_max_mo": rss_en_mo(usage.ru_maxrss)}
+                return self._process.returncode
+            except ChildProcessError:
+                pass  # Déjà attendu par poll() (arrêt)
+        return self._process.wait()
+
+    def _arreter(self, statut):
+        with self._verrou:
+            if self.statut != self.EN_COURS:
+                return
+            self.statut = statut
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+
+    def annuler(self):
+        self._arreter(self.ANNULE)
+
+    def _terminer(self, statut):
+        with self._verrou:
+            # Une annulation ou un dépassement de délai l'emporte sur la fin normale du processus
+            if self.statut in (self.EN_ATTENTE, self.EN_COURS):
+                self.statut = statut
+        self.duree = time.perf_counter() - self.debut
+        self._fini.set()
+        if self.on_fin:
+            self.on_fin(self)
+
+    def attendre(self, timeout=None):
+        return self._fini.wait(timeout)
+
+    def sortie(self):
+        return "\n".join(self.lignes)
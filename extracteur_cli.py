@@ -0,0 +1,178 @@
+import os
+import sys
+import argparse
+
+from modele import RuleExtractionModel
+from execution_amie import ExecutionAmie
+from balayage import grille_parametres, lire_valeurs
+from filtrage import ConfigurationFiltre
+
+# Mode sans interface : mêmes étapes que l'application (conversion, AMIE3, analyse, qualité,
+# sauvegarde) sans importer PyQt5, pour les nœuds de calcul et les exécutions planifiées (cron).
+#   python extracteur_cli.py ontology.owl --minc 0.1 --minpca 0.5 -o regles.txt
+#   python extracteur_cli.py ontology.owl --minc 0.1,0.3 --minpca 0.5,0.7 -o regles.txt  (balayage)
+# Codes de retour : 0 succès, 1 erreur (entrée, conversion, sauvegarde), 2 échec d'AMIE3.
+
+def lire_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction de règles d'une ontologie avec AMIE3, sans interface graphique.")
+    parser.add_argument("ontologies", nargs="*", help="Ontologies à charger (la dernière est minée, sauf avec --fusionner)")
+    parser.add_argument("--fusionner", action="store_true", help="Miner l'union sans doublon de toutes les ontologies")
+    parser.add_argument("--minc", default="0.1", help="Seuil -minc (liste séparée par des virgules pour un balayage)")
+    parser.add_argument("--minpca", default="0.5", help="Seuil -minpca (liste séparée par des virgules pour un balayage)")
+    parser.add_argument("--nc", default=str(os.cpu_count() or 1), help="Nombre de cœurs (-nc) ; pour un balayage, cœurs à répartir")
+    parser.add_argument("--const", action="store_true", help="Autoriser les constantes (-const)")
+    parser.add_argument("--balayer-const", action="store_true", help="Balayage : essayer avec et sans -const")
+    parser.add_argument("--paralleles", type=int, default=None, help="Balayage : exécutions simultanées au plus")
+    parser.add_argument("--timeout", type=float, default=None, help="Durée maximale d'une exécution, en secondes")
+    parser.add_argument("--format", choices=["turtle", "tsv"], default="turtle", help="Format de l'entrée d'AMIE3")
+    parser.add_argument("--compactage", choices=["prefixe", "entier"], default=None, help="Compactage des IRIs (format tsv)")
+    parser.add_argument("--filtrer", action="store_true", help="Appliquer le profil de filtrage clinique avant le minage")
+    parser.add_argument("--regles", help="Analyser une sortie d'AMIE3 (ou un fichier .regles) au lieu de lancer AMIE3")
+    parser.add_argument("--jar", help="Chemin de amie3.5.1.jar")
+    parser.add_argument("-o", "--sortie", help="Fichier où sauvegarder les règles (.regles : format binaire en colonnes)")
+    parser.add_argument("--compresser", action="store_true", help="Format binaire : compresser les atomes et les termes")
+    parser.add_argument("--elaguer", action="store_true",
+                        help="Écarter les règles redondantes (tautologies, doublons, spécialisations sans gain de confiance)")
+    parser.add_argument("--motifs-elagage", metavar="FICHIER", help="Écrire en TSV le motif de chaque règle écartée par --elaguer")
+    parser.add_argument("--qualite", action="store_true", help="Recalculer les métriques des règles sur l'ontologie")
+    parser.add_argument("--sans-historique", action="store_true", help="Ne pas lire ni écrire l'historique des exécutions")
+    parser.add_argument("--forcer", action="store_true", help="Relancer AMIE3 même si la configuration a déjà été minée")
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="FICHIER",
+                        help="Afficher le temps, le CPU et la mémoire de chaque étape (et les écrire en JSON dans FICHIER)")
+    parser.add_argument("-v", "--verbeux", action="store_true", help="Afficher la sortie d'AMIE3 au fil de l'eau")
+    return parser.parse_args(argv)
+
+def afficher(texte):
+    print(texte, flush=True)
+
+def preparer_entree(model, args):
+    input_owl = model.ontologies[-1]
+    model.fusionner = args.fusionner
+    model.filtre = ConfigurationFiltre.profil_clinique() if args.filtrer else None
+    model.format_entree = (args.format, args.compactage if args.format == "tsv" else None)
+    chemin = model.preparer_entree_amie(input_owl)
+    if chemin is None:
+        afficher(f"La conversion de l'ontologie {input_owl} a échoué.")
+        return None
+    stats = model.stats_fusion
+    if model.fusion_active() and stats:
+        afficher(f"Fusion de {stats['sources']} ontologies : {stats['faits']} faits distincts sur {stats['lus']} lus")
+    cache = model.cache_conversion
+    etat = "réutilisée depuis le cache" if cache.dernier_hit else "convertie"
+    afficher(f"Ontologie {etat} en {cache.derniere_duree:.2f} s : {chemin}")
+    stats = cache.derniers_details
+    if model.filtre and stats:
+        afficher(f"Filtrage : {stats['conserves']} triplets conservés sur {stats['lus']}, {stats['inferes']} inférés")
+    return chemin
+
+def executer_amie(model, args, chemin, minc, minpca):
+    if not args.forcer:
+        precedente = model.chercher_execution(minc, minpca, args.const)
+        if precedente is not None:
+            model.charger_execution(precedente["id"])
+            afficher(f"Configuration déjà minée (exécution n°{precedente['id']}) : {len(model.regles)} règles reprises de l'historique")
+            return 0
+    on_ligne = (lambda ligne: afficher(ligne)) if args.verbeux else None
+    execution = model.preparer_execution_amie(chemin, minc, minpca, args.nc, const=args.const,
+                                              timeout=args.timeout, on_ligne=on_ligne)
+    afficher("Commande : " + " ".join(execution.commande))
+    try:
+        execution.demarrer()
+        execution.attendre()
+    except KeyboardInterrupt:
+        execution.annuler()
+        execution.attendre()
+    model.analyser_sortie_amie(execution.lignes)
+    model.tracer_execution_amie(execution)
+    model.enregistrer_execution(execution)
+    afficher(f"AMIE3 : {execution.statut} en {execution.duree or 0:.1f} s, {len(model.regles)} règles")
+    if execution.statut != ExecutionAmie.TERMINE:
+        if execution.erreur:
+            afficher(f"Erreur : {execution.erreur}")
+        return 2
+    return 0
+
+def executer_balayage(model, args, chemin, valeurs_minc, valeurs_minpca):
+    valeurs_const = (False, True) if args.balayer_const else (args.const,)
+    configurations = grille_parametres(valeurs_minc, valeurs_minpca, valeurs_const)
+    balayage = model.preparer_balayage(
+        chemin, configurations, nb_coeurs=args.nc or None, max_paralleles=args.paralleles, timeout=args.timeout,
+        on_resultat=lambda r: afficher(f"minc={r.minc} minpca={r.minpca} const={'oui' if r.const else 'non'} : {r.statut}"
+                                       + (" (réutilisé)" if r.reutilise else "")),
+        reutiliser=not args.forcer
+    )
+    afficher(f"Balayage de {len(configurations)} configurations, {balayage.paralleles} à la fois (-nc {balayage.nc})")
+    try:
+        balayage.demarrer()
+        balayage.attendre()
+    except KeyboardInterrupt:
+        balayage.annuler()
+        balayage.attendre()
+    model.trace.ajouter("balayage", balayage.duree or 0.0, configurations=len(configurations))
+    afficher(balayage.tableau())
+    meilleur = balayage.meilleur()
+    if meilleur is None:
+        return 2
+    model.regles = meilleur.regles
+    afficher(f"Meilleure configuration (PCA moyenne) : minc={meilleur.minc} minpca={meilleur.minpca}")
+    return 0 if all(r.statut == ExecutionAmie.TERMINE for r in balayage.resultats) else 2
+
+def main(argv=None):
+    args = lire_arguments(argv)
+    model = RuleExtractionModel(historique=not args.sans_historique)
+    model.jar_amie = args.jar
+    for path in args.ontologies:
+        if not model.charger_ontologie(path):
+            afficher(f"Ontologie introuvable : {path}")
+            return 1
+
+    code = 0
+    if args.regles:
+        if model.extraire_regles(args.regles) is None:
+            return 1
+        afficher(f"{len(model.regles)} règles extraites de {args.regles}")
+    else:
+        if not model.ontologies:
+            afficher("Aucune ontologie ni sortie d'AMIE3 (--regles) à traiter.")
+            return 1
+        if not os.path.exists(model.chemin_jar_amie()):
+            afficher(f"AMIE3 introuvable : {model.chemin_jar_amie()} (voir --jar)")
+            return 1
+        chemin = preparer_entree(model, args)
+        if chemin is None:
+            return 1
+        valeurs_minc, valeurs_minpca = lire_valeurs(args.minc), lire_valeurs(args.minpca)
+        if len(valeurs_minc) > 1 or len(valeurs_minpca) > 1 or args.balayer_const:
+            code = executer_balayage(model, args, chemin, valeurs_minc, valeurs_minpca)
+        else:
+            code = executer_amie(model, args, chemin, valeurs_minc[0], valeurs_minpca[0])
+
+    if args.elaguer and len(model.regles):
+        elagage = model.elaguer_regles()
+        afficher(f"Élagage : {elagage.resume()}")
+        if args.motifs_elagage:
+            try:
+                elagage.sauvegarder(args.motifs_elagage)
+            except OSError as e:
+                afficher(f"Erreur lors de l'écriture des motifs d'élagage : {e}")
+                return 1
+
+    if args.qualite and model.ontologies and len(model.regles):
+        qualite = model.mesurer_qualite_regles()
+        pca = qualite["pca_confidence"]
+        afficher(f"Qualité recalculée sur {model.nom_entree()} : PCA moyenne {pca.mean():.4f}, "
+                 f"{int((qualite['positive_examples'] > 0).sum())} règles avec au moins un exemple positif")
+
+    if args.sortie:
+        if not model.sauvegarder_regles(args.sortie, compresser=args.compresser):
+            return 1
+        afficher(f"{len(model.regles)} règles sauvegardées dans {args.sortie}")
+
+    trace = model.terminer_trace(args.trace or None)
+    if args.trace is not None:
+        afficher(trace.tableau())
+        afficher(f"Trace enregistrée : {trace.chemin}")
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import mmap
+
+import numpy as np
+
+# <-------------------------->
+# Lecture paginée d'un gros fichier texte
+# <-------------------------->
+class FichierIndexe:
+    # Le fichier est projeté en mémoire (mmap) et seul le début d'une ligne sur `pas` est
+    # mémorisé : l'index reste petit même pour des fichiers de plusieurs centaines de Mo,
+    # et une ligne quelconque se retrouve en au plus `pas` recherches de fin de ligne.
+    def __init__(self, path, pas=64, taille_bloc=16 * 1024 * 1024):
+        self.path = path
+        self.pas = pas
+        self._f = open(path, "rb")
+        st = os.fstat(self._f.fileno())
+        self.taille = st.st_size
+        self.signature = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if self.taille else None
+        self.nb_lignes, self.reperes = self._indexer(taille_bloc)
+
+    def _indexer(self, taille_bloc):
+        # Repères : position du début des lignes 0, pas, 2*pas, ...
+        if not self.taille:
+            return 0, np.zeros(1, dtype=np.int64)
+        reperes = [np.zeros(1, dtype=np.int64)]
+        nb_fins = 0
+        for debut in range(0, self.taille, taille_bloc):
+            nb = min(taille_bloc, self.taille - debut)
+            bloc = np.frombuffer(self._mm, dtype=np.uint8, count=nb, offset=debut)
+            fins = np.flatnonzero(bloc == 10) + debut
+            del bloc
+            # La ligne k commence après la (k-1)-ième fin de ligne ; on garde k multiple de pas
+            premier = (-(nb_fins + 1)) % self.pas
+            reperes.append(fins[premier::self.pas] + 1)
+            nb_fins += len(fins)
+        reperes = np.concatenate(reperes)
+        # Une fin de ligne finale n'ouvre pas de nouvelle ligne
+        dernier_vide = self._mm[self.taille - 1] == 10
+        nb_lignes = nb_fins + (0 if dernier_vide else 1)
+        if reperes[-1] >= self.taille:
+            reperes = reperes[:-1]
+        return nb_lignes, reperes
+
+    def __len__(self):
+        return self.nb_lignes
+
+    def position_ligne(self, i):
+        # Position (octet) du début de la ligne i
+        i = max(0, min(i, self.nb_lignes))
+        pos = int(self.reperes[i // self.pas])
+        for _ in range(i % self.pas):
+            fin = self._mm.find(b"\n", pos)
+            if fin < 0:
+                return self.taille
+            pos = fin + 1
+        return pos
+
+    def lignes(self, debut, nb, largeur_max=10000):
+        # Lignes [debut, debut + nb), tronquées à largeur_max caractères
+        if not self.nb_lignes:
+            return []
+        debut = max(0, min(debut, self.nb_lignes - 1))
+        pos = self.position_ligne(debut)
+        resultat = []
+        for _ in range(min(nb, self.nb_lignes - debut)):
+            fin = self._mm.find(b"\n", pos)
+            if fin < 0:
+                fin = self.taille
+            brut = self._mm[pos:min(fin, pos + 4 * largeur_max)].rstrip(b"\r")
+            resultat.append(brut.decode("utf-8", errors="replace")[:largeur_max])
+            pos = fin + 1
+        return resultat
+
+    def ligne(self, i):
+        lignes = self.lignes(i, 1)
+        return lignes[0] if lignes else ""
+
+    def ligne_de_position(self, position):
+        # Numéro de la ligne contenant l'octet `position`
+        if not self.taille:
+            return 0
+        position = max(0, min(position, self.taille - 1))
+        bloc = int(np.searchsorted(self.reperes, position, side="right")) - 1
+        i, pos = bloc * self.pas, int(self.reperes[bloc])
+        while True:
+            fin = self._mm.find(b"\n", pos)
+            if fin < 0 or fin >= position:
+                return min(i, max(0, self.nb_lignes - 1))
+            i, pos = i + 1, fin + 1
+
+    def fermer(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
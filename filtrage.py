@@ -0,0 +1,246 @@
+import json
+
+from conversion import iterer_triplets, ecrire_tsv, terme_ntriples
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+OWL = "http://www.w3.org/2002/07/owl#"
+
+# IRIs en texte : elles ne deviennent des URIRef qu'au filtrage, rdflib n'est chargé qu'à ce moment
+RDF_TYPE = RDF + "type"
+RDFS_SUBCLASSOF = RDFS + "subClassOf"
+RDFS_SUBPROPERTYOF = RDFS + "subPropertyOf"
+RDFS_DOMAIN = RDFS + "domain"
+RDFS_RANGE = RDFS + "range"
+
+# Préfixes acceptés dans les champs de configuration (ex. owl:Class)
+PREFIXES_CONNUS = {
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "owl": OWL,
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "swrl": "http://www.w3.org/2003/11/swrl#",
+    "swrlb": "http://www.w3.org/2003/11/swrlb#",
+    "swrla": "http://swrl.stanford.edu/ontologies/3.3/swrla.owl#",
+    "time": "http://www.w3.org/2006/time#",
+    "llc": "http://www.semanticweb.org/despres/ontologies/2023/LLC_Onto#",
+}
+
+def developper_iri(texte):
+    texte = texte.strip()
+    if texte.startswith("<") and texte.endswith(">"):
+        return texte[1:-1]
+    prefixe, sep, local = texte.partition(":")
+    if sep and prefixe in PREFIXES_CONNUS and not local.startswith("//"):
+        return PREFIXES_CONNUS[prefixe] + local
+    return texte
+
+def abreger_iri(iri):
+    for prefixe, espace in PREFIXES_CONNUS.items():
+        if iri.startswith(espace):
+            return f"{prefixe}:{iri[len(espace):]}"
+    return iri
+
+def lire_liste(texte):
+    # "swrl:, owl:Class ; rdf:first" -> IRIs complètes
+    return [developper_iri(t) for t in texte.replace(";", ",").split(",") if t.strip()]
+
+# <-------------------------->
+# Configuration du filtrage
+# <-------------------------->
+class ConfigurationFiltre:
+    # Un triplet est retiré si l'une de ses IRI appartient à un espace de noms exclu, si son
+    # prédicat est exclu, ou si son sujet ou son objet est une instance d'un type exclu.
+    # Les listes "inclus", lorsqu'elles sont renseignées, restreignent au contraire la sortie.
+    def __init__(self, espaces_exclus=(), espaces_inclus=(), predicats_exclus=(), predicats_inclus=(),
+                 types_exclus=(), types_inclus=(), materialiser_rdfs=False):
+        self.espaces_exclus = tuple(espaces_exclus)
+        self.espaces_inclus = tuple(espaces_inclus)
+        self.predicats_exclus = frozenset(map(str, predicats_exclus))
+        self.predicats_inclus = frozenset(map(str, predicats_inclus))
+        self.types_exclus = frozenset(map(str, types_exclus))
+        self.types_inclus = frozenset(map(str, types_inclus))
+        self.materialiser_rdfs = materialiser_rdfs
+
+    @classmethod
+    def profil_clinique(cls):
+        # Retire l'encodage des règles SWRL et le schéma OWL pour ne miner que les faits patients
+        return cls(
+            espaces_exclus=[PREFIXES_CONNUS["swrl"], PREFIXES_CONNUS["swrla"], OWL],
+            predicats_exclus=[RDF + "first", RDF + "rest", RDFS + "comment", RDFS + "label"],
+            types_exclus=[OWL + "Class", OWL + "ObjectProperty", OWL + "DatatypeProperty",
+                          OWL + "AnnotationProperty", OWL + "Restriction", OWL + "Ontology", RDFS + "Datatype"],
+            materialiser_rdfs=True,
+        )
+
+    def signature(self):
+        # Clé stable pour le cache de conversion
+        return json.dumps({
+            "espaces_exclus": sorted(self.espaces_exclus),
+            "espaces_inclus": sorted(self.espaces_inclus),
+            "predicats_exclus": sorted(self.predicats_exclus),
+            "predicats_inclus": sorted(self.predicats_inclus),
+            "types_exclus": sorted(self.types_exclus),
+            "types_inclus": sorted(self.types_inclus),
+            "materialiser_rdfs": self.materialiser_rdfs,
+        }, sort_keys=True)
+
+    def besoin_schema(self):
+        return bool(self.types_exclus or self.types_inclus or self.materialiser_rdfs)
+
+# <-------------------------->
+# Filtrage en deux passes
+# <-------------------------->
+class _Schema:
+    # Ce qu'il faut retenir de la première passe : types des individus et axiomes RDFS
+    def __init__(self):
+        from rdflib import URIRef
+        self.URIRef = URIRef
+        self.rdf_type = URIRef(RDF_TYPE)
+        self.sous_classe = URIRef(RDFS_SUBCLASSOF)
+        self.sous_propriete = URIRef(RDFS_SUBPROPERTYOF)
+        self.domaine = URIRef(RDFS_DOMAIN)
+        self.image = URIRef(RDFS_RANGE)
+        self.types = {}          # individu -> ensemble de types déclarés
+        self.sous_classes = {}   # classe -> super-classes directes
+        self.sous_proprietes = {}
+        self.domaines = {}
+        self.images = {}
+
+    def ajouter(self, s, p, o):
+        if p == self.rdf_type:
+            self.types.setdefault(s, set()).add(o)
+        elif not isinstance(o, self.URIRef):
+            return
+        elif p == self.sous_classe:
+            self.sous_classes.setdefault(s, set()).add(o)
+        elif p == self.sous_propriete:
+            self.sous_proprietes.setdefault(s, set()).add(o)
+        elif p == self.domaine:
+            self.domaines.setdefault(s, set()).add(o)
+        elif p == self.image:
+            self.images.setdefault(s, set()).add(o)
+
+    def fermeture(self, relation):
+        # Fermeture transitive, calculée une fois par nœud
+        cache = {}
+        def ancetres(x):
+            if x in cache:
+                return cache[x]
+            cache[x] = set()
+            resultat, pile = set(), list(relation.get(x, ()))
+            while pile:
+                y = pile.pop()
+                if y not in resultat:
+                    resultat.add(y)
+                    pile.extend(relation.get(y, ()))
+            cache[x] = resultat
+            return resultat
+        return ancetres
+
+def _types_etendus(schema, config):
+    # Types de chaque individu, super-classes comprises si les inférences RDFS sont activées
+    if not config.materialiser_rdfs:
+        return schema.types
+    super_classes = schema.fermeture(schema.sous_classes)
+    return {x: set().union(types, *(super_classes(t) for t in types)) for x, types in schema.types.items()}
+
+def filtrer_triplets(source, config, stats=None):
+    # source : fonction renvoyant un nouvel itérateur de triplets rdflib (appelée une ou deux fois)
+    stats = stats if stats is not None else {}
+    for cle in ("lus", "conserves", "exclus_espace", "exclus_predicat", "exclus_type", "inferes"):
+        stats.setdefault(cle, 0)
+
+    # Les termes rdflib ne sont égaux qu'à des termes du même type : on compare des URIRef
+    schema = _Schema()
+    URIRef, rdf_type = schema.URIRef, schema.rdf_type
+    predicats_exclus = frozenset(map(URIRef, config.predicats_exclus))
+    predicats_inclus = frozenset(map(URIRef, config.predicats_inclus))
+    types_exclus = frozenset(map(URIRef, config.types_exclus))
+    types_inclus = frozenset(map(URIRef, config.types_inclus))
+    if config.besoin_schema():
+        for s, p, o in source():
+            schema.ajouter(s, p, o)
+    types = _types_etendus(schema, config)
+    exclus = {x for x, t in types.items() if t & types_exclus} if types_exclus else set()
+    inclus = {x for x, t in types.items() if t & types_inclus} if types_inclus else None
+
+    if config.materialiser_rdfs:
+        super_classes = schema.fermeture(schema.sous_classes)
+        super_proprietes = schema.fermeture(schema.sous_proprietes)
+        deja_types = {(x, t) for x, declares in schema.types.items() for t in declares}
+
+    def espace_exclu(terme):
+        # str.startswith : URIRef redéfinit startswith
+        return isinstance(terme, URIRef) and str.startswith(terme, config.espaces_exclus)
+
+    def conserver(s, p, o):
+        if espace_exclu(s) or espace_exclu(p) or espace_exclu(o):
+            stats["exclus_espace"] += 1
+            return False
+        if config.espaces_inclus and not (str.startswith(p, config.espaces_inclus) or
+                                          (p == rdf_type and isinstance(o, URIRef) and str.startswith(o, config.espaces_inclus))):
+            stats["exclus_espace"] += 1
+            return False
+        if p in predicats_exclus or (predicats_inclus and p not in predicats_inclus):
+            stats["exclus_predicat"] += 1
+            return False
+        # L'objet d'un rdf:type est une classe : seul le sujet compte pour ces triplets
+        objet = o if p != rdf_type else None
+        if s in exclus or objet in exclus or (inclus is not None and s not in inclus and objet not in inclus):
+            stats["exclus_type"] += 1
+            return False
+        return True
+
+    for s, p, o in source():
+        stats["lus"] += 1
+        if not conserver(s, p, o):
+            continue
+        stats["conserves"] += 1
+        yield s, p, o
+        if not config.materialiser_rdfs:
+            continue
+        # Inférences RDFS (rdfs2, rdfs3, rdfs7, rdfs9), elles-mêmes soumises au filtre
+        inferes = []
+        if p == rdf_type:
+            inferes.extend((s, rdf_type, c) for c in super_classes(o))
+        else:
+            inferes.extend((s, q, o) for q in super_proprietes(p))
+            for q in {p} | super_proprietes(p):
+                for c in schema.domaines.get(q, ()):
+                    inferes.extend([(s, rdf_type, c)] + [(s, rdf_type, d) for d in super_classes(c)])
+                if isinstance(o, URIRef):
+                    for c in schema.images.get(q, ()):
+                        inferes.extend([(o, rdf_type, c)] + [(o, rdf_type, d) for d in super_classes(c)])
+        for triplet in inferes:
+            if triplet[1] == rdf_type:
+                if (triplet[0], triplet[2]) in deja_types:
+                    continue
+                deja_types.add((triplet[0], triplet[2]))
+            if conserver(*triplet):
+                stats["inferes"] += 1
+                yield triplet
+
+def ecrire_ntriples(triplets, output_file):
+    nb = 0
+    with open(output_file, "w", encoding="utf-8") as f:
+        for s, p, o in triplets:
+            f.write(f"{terme_ntriples(s)} {terme_ntriples(p)} {terme_ntriples(o)} .\n")
+            nb += 1
+    return nb
+
+def filtrer_fichier(input_file, output_file, config, format='nt', mode=None):
+    # Lit l'ontologie en flux, applique le filtre et écrit l'entrée de minage (N-Triples ou TSV).
+    # Renvoie les statistiques du filtrage (dictionnaire), ou None en cas d'erreur.
+    try:
+        stats = {}
+        triplets = filtrer_triplets(lambda: iterer_triplets(input_file), config, stats)
+        if format == 'tsv':
+            ecrire_tsv(triplets, output_file, mode)
+        else:
+            ecrire_ntriples(triplets, output_file)
+        print(f"Fichier filtré : {input_file} → {output_file} ({stats['conserves'] + stats['inferes']} triplets)")
+        return stats
+    except Exception as e:
+        print(f"Erreur lors du filtrage : {e}")
+        return None
@@ -0,0 +1,150 @@
+import os
+import hashlib
+import tempfile
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from conversion import iterer_triplets, terme_ntriples
+
+# En dessous de cette taille totale, lancer des processus coûte plus que lire les fichiers à la suite
+SEUIL_PARALLELE = 16 * 1024 * 1024
+
+# Triplets lus par lot pour le dédoublonnage (chaque lot : 8 octets par triplet)
+TAILLE_LOT = 1 << 16
+
+# <-------------------------->
+# Ensemble compact d'empreintes 64 bits
+# <-------------------------->
+class EnsembleEmpreintes:
+    # Table à adressage ouvert (sondage linéaire) dans un tableau numpy : 16 octets par triplet
+    # distinct au pire (taux de remplissage <= 1/2), contre plusieurs centaines pour un set Python
+    # de triplets rdflib. Les insertions se font par lots, sondages vectorisés.
+    def __init__(self, capacite=1 << 16):
+        taille = 1
+        while taille < 2 * capacite:
+            taille <<= 1
+        self.table = np.zeros(taille, dtype=np.int64)  # 0 = case vide
+        self.nb = 0
+
+    def __len__(self):
+        return self.nb
+
+    def _agrandir(self, nb_a_ajouter):
+        if 2 * (self.nb + nb_a_ajouter) <= len(self.table):
+            return
+        taille = len(self.table)
+        while 2 * (self.nb + nb_a_ajouter) > taille:
+            taille <<= 1
+        anciennes = self.table[self.table != 0]
+        self.table = np.zeros(taille, dtype=np.int64)
+        self.nb = 0
+        self._inserer(anciennes)
+
+    def _inserer(self, valeurs):
+        # valeurs : sans doublon ni zéro ; renvoie le masque de celles qui n'étaient pas présentes
+        masque_table = len(self.table) - 1
+        table = self.table
+        position = valeurs & masque_table
+        nouvelles = np.zeros(len(valeurs), dtype=bool)
+        en_attente = np.arange(len(valeurs))
+        while len(en_attente):
+            case = table[position[en_attente]]
+            valeur = valeurs[en_attente]
+            presente = case == valeur
+            vide = case == 0
+            # Plusieurs valeurs peuvent viser la même case vide : une seule l'obtient, les autres continuent
+            candidates = en_attente[vide]
+            table[position[candidates]] = valeurs[candidates]
+            gagnantes = table[position[candidates]] == valeurs[candidates]
+            nouvelles[candidates[gagnantes]] = True
+            en_attente = np.concatenate([en_attente[~presente & ~vide], candidates[~gagnantes]])
+            position[en_attente] = (position[en_attente] + 1) & masque_table
+        self.nb += int(np.count_nonzero(nouvelles))
+        return nouvelles
+
+    def ajouter(self, empreintes):
+        # Ajoute un lot ; renvoie le masque des éléments du lot vus pour la première fois
+        # (pour un doublon à l'intérieur du lot, seule la première occurrence est nouvelle)
+        empreintes = np.asarray(empreintes, dtype=np.int64)
+        empreintes = np.where(empreintes == 0, 1, empreintes)
+        uniques, premieres = np.unique(empreintes, return_index=True)
+        self._agrandir(len(uniques))
+        resultat = np.zeros(len(empreintes), dtype=bool)
+        resultat[premieres[self._inserer(uniques)]] = True
+        return resultat
+
+def empreinte_ligne(ligne):
+    return int.from_bytes(hashlib.blake2b(ligne.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+# <-------------------------->
+# Lecture parallèle et fusion
+# <-------------------------->
+def _lire_ontologie(path, fragment):
+    # Exécuté dans un processus de travail : l'ontologie est lue en flux et réécrite en N-Triples
+    # (un triplet par ligne) dans `fragment`, avec l'empreinte de chaque ligne dans fragment.empreintes
+    empreintes = array("q")
+    with open(fragment, "w", encoding="utf-8") as f:
+        for s, p, o in iterer_triplets(path):
+            ligne = f"{terme_ntriples(s)} {terme_ntriples(p)} {terme_ntriples(o)} .\n"
+            f.write(ligne)
+            empreintes.append(empreinte_ligne(ligne))
+    with open(fragment + ".empreintes", "wb") as f:
+        empreintes.tofile(f)
+    return len(empreintes)
+
+def _nb_processus(nb_processus, chemins):
+    if nb_processus is None and sum(os.path.getsize(c) for c in chemins) < SEUIL_PARALLELE:
+        return 1
+    return max(1, min(len(chemins), nb_processus or os.cpu_count() or 1))
+
+def fusionner_fichiers(chemins, output_file, nb_processus=None, stats=None):
+    # Union des triplets de plusieurs ontologies, sans doublon, écrite en N-Triples dans output_file.
+    # Les ontologies sont lues en parallèle (un processus par fichier) vers des fragments temporaires,
+    # puis les fragments sont recopiés dans l'ordre des chemins en sautant les triplets déjà vus.
+    # Seules les empreintes restent en mémoire : la fusion ne construit jamais de Graph complet.
+    # Les nœuds anonymes restent distincts d'un fichier à l'autre.
+    stats = stats if stats is not None else {}
+    stats.update({"sources": len(chemins), "lus": 0, "faits": 0, "doublons": 0})
+    try:
+        dossier = os.path.dirname(os.path.abspath(output_file))
+        with tempfile.TemporaryDirectory(dir=dossier, prefix=".fusion-") as temporaire:
+            fragments = [os.path.join(temporaire, f"{k}.nt") for k in range(len(chemins))]
+            nb = _nb_processus(nb_processus, chemins)
+            if nb == 1:
+                resultats = [_lire_ontologie(c, f) for c, f in zip(chemins, fragments)]
+                pool = None
+            else:
+                # "spawn" : un fork depuis l'interface (threads Qt, lecteurs d'AMIE) n'est pas sûr
+                pool = ProcessPoolExecutor(nb, mp_context=multiprocessing.get_context("spawn"))
+                resultats = [pool.submit(_lire_ontologie, c, f) for c, f in zip(chemins, fragments)]
+            try:
+                vus = EnsembleEmpreintes()
+                with open(output_file, "w", encoding="utf-8") as sortie:
+                    for resultat, fragment in zip(resultats, fragments):
+                        # Les fragments suivants continuent d'être produits pendant la recopie
+                        if pool is not None:
+                            resultat = resultat.result()
+                        stats["lus"] += resultat
+                        empreintes = np.fromfile(fragment + ".empreintes", dtype=np.int64)
+                        with open(fragment, "r", encoding="utf-8") as f:
+                            for debut in range(0, len(empreintes), TAILLE_LOT):
+                                nouvelles = vus.ajouter(empreintes[debut:debut + TAILLE_LOT])
+                                for nouvelle in nouvelles.tolist():
+                                    ligne = f.readline()
+                                    if nouvelle:
+                                        sortie.write(ligne)
+                        os.remove(fragment)
+                        os.remove(fragment + ".empreintes")
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+        stats["faits"] = len(vus)
+        stats["doublons"] = stats["lus"] - stats["faits"]
+        print(f"Fusion de {len(chemins)} ontologies → {output_file} ({stats['faits']} faits, {stats['doublons']} doublons)")
+        return stats
+    except Exception as e:
+        print(f"Erreur lors de la fusion des ontologies : {e}")
+        return None
@@ -0,0 +1,241 @@
+import sys
+import random
+import argparse
+import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from conversion import iterer_triplets, terme_ntriples, genre_terme
+from filtrage import RDF, RDFS, OWL, RDF_TYPE, PREFIXES_CONNUS
+
+# Classe des patients dans l'ontologie de la LLC
+CLASSE_PATIENT = PREFIXES_CONNUS["llc"] + "UPNPatient"
+
+# Les individus d'un patient (prélèvements, stades, observations...) sont cherchés jusqu'à cette distance
+PROFONDEUR_MAX = 4
+
+TYPES_NUMERIQUES = {"integer", "int", "long", "short", "decimal", "float", "double", "nonNegativeInteger", "positiveInteger"}
+
+_TYPES_SCHEMA = {OWL + "Class", RDFS + "Class", OWL + "ObjectProperty", OWL + "DatatypeProperty", OWL + "AnnotationProperty",
+                 OWL + "TransitiveProperty", OWL + "FunctionalProperty", RDF + "Property", OWL + "Ontology", RDFS + "Datatype"}
+
+# <-------------------------->
+# Analyse de la cohorte d'origine
+# <-------------------------->
+class ModelePatient:
+    # Faits d'un patient regroupés par propriété : chaque valeur emporte les faits des individus
+    # qui n'appartiennent qu'à ce patient (ex. aPourPrelevement -> prelevementNFS1 -> sa date)
+    def __init__(self, iri):
+        self.iri = iri
+        self.types = []
+        self.groupes = {}  # prédicat -> [(objet, individus propres atteints depuis l'objet)]
+
+class CohorteSource:
+    def __init__(self, path, classe_patient=CLASSE_PATIENT):
+        from rdflib import URIRef
+        self.triplets = list(iterer_triplets(path))
+        rdf_type, classe = URIRef(RDF_TYPE), URIRef(classe_patient)
+        types_schema = {URIRef(t) for t in _TYPES_SCHEMA}
+        sortants = {}
+        schema = set()
+        for s, p, o in self.triplets:
+            sortants.setdefault(s, []).append((p, o))
+            if p == rdf_type:
+                schema.add(o)
+                if o in types_schema:
+                    schema.add(s)
+        self.patients = [s for s, p, o in self.triplets if p == rdf_type and o == classe]
+        if not self.patients:
+            raise ValueError(f"Aucun individu de type {classe_patient} dans {path}")
+
+        # Individus atteignables depuis chaque patient, puis ceux qui n'en ont qu'un seul
+        atteints = {}
+        for patient in self.patients:
+            vus, frontiere = {patient}, [patient]
+            for _ in range(PROFONDEUR_MAX):
+                suivants = []
+                for noeud in frontiere:
+                    for p, o in sortants.get(noeud, ()):
+                        if p != rdf_type and genre_terme(o) != "litteral" and o not in schema and o not in vus:
+                            vus.add(o)
+                            suivants.append(o)
+                frontiere = suivants
+            for noeud in vus - {patient}:
+                atteints.setdefault(noeud, set()).add(patient)
+        propres = {noeud for noeud, patients in atteints.items() if len(patients) == 1}
+
+        def sous_arbre(noeud, vus):
+            vus.append(noeud)
+            for _, o in sortants.get(noeud, ()):
+                if o in propres and o not in vus:
+                    sous_arbre(o, vus)
+            return vus
+
+        self.modeles = []
+        for patient in self.patients:
+            modele = ModelePatient(patient)
+            for p, o in sortants.get(patient, ()):
+                if p == rdf_type:
+                    modele.types.append(o)
+                else:
+                    noeuds = sous_arbre(o, []) if o in propres else []
+                    modele.groupes.setdefault(p, []).append((o, noeuds))
+            self.modeles.append(modele)
+        self.propres = propres
+        self.sortants = {noeud: sortants.get(noeud, []) for noeud in propres}
+        self.par_predicat = {}  # prédicat -> patients qui ont au moins une valeur pour lui
+        for modele in self.modeles:
+            for p in modele.groupes:
+                self.par_predicat.setdefault(p, []).append(modele)
+
+# <-------------------------->
+# Écriture en flux (RDF/XML ou N-Triples)
+# <-------------------------->
+def _coupure(iri):
+    # Espace de noms et nom local d'un prédicat, pour l'écrire comme élément XML
+    for k in range(len(iri) - 1, -1, -1):
+        if iri[k] in "#/:":
+            local = iri[k + 1:]
+            if local and (local[0].isalpha() or local[0] == "_") and all(c.isalnum() or c in "_-." for c in local):
+                return iri[:k + 1], local
+            break
+    raise ValueError(f"Prédicat impossible à écrire en RDF/XML : {iri}")
+
+class EcrivainRdfXml:
+    # Les faits d'un même sujet qui se suivent sont regroupés dans un rdf:Description
+    def __init__(self, f, predicats):
+        self.f = f
+        self.espaces = {}
+        for p in predicats:
+            espace, _ = _coupure(str(p))
+            self.espaces.setdefault(espace, f"ns{len(self.espaces)}")
+        self.sujet = None
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"')
+        for espace, prefixe in self.espaces.items():
+            f.write(f"\n   xmlns:{prefixe}={quoteattr(espace)}")
+        f.write(">\n")
+
+    def _noeud(self, attribut, terme):
+        if genre_terme(terme) == "anonyme":
+            return f'rdf:nodeID="{terme}"'
+        return f"rdf:{attribut}={quoteattr(str(terme))}"
+
+    def ecrire(self, s, p, o):
+        if s != self.sujet:
+            if self.sujet is not None:
+                self.f.write("  </rdf:Description>\n")
+            self.f.write(f"  <rdf:Description {self._noeud('about', s)}>\n")
+            self.sujet = s
+        espace, local = _coupure(str(p))
+        element = f"{self.espaces[espace]}:{local}"
+        genre = genre_terme(o)
+        if genre == "litteral":
+            attributs = f' xml:lang="{o.language}"' if o.language else (f" rdf:datatype={quoteattr(str(o.datatype))}" if o.datatype else "")
+            self.f.write(f"    <{element}{attributs}>{escape(str(o))}</{element}>\n")
+        else:
+            self.f.write(f"    <{element} {self._noeud('resource', o)}/>\n")
+
+    def fermer(self):
+        if self.sujet is not None:
+            self.f.write("  </rdf:Description>\n")
+        self.f.write("</rdf:RDF>\n")
+
+class EcrivainNTriples:
+    def __init__(self, f, predicats=None):
+        self.f = f
+
+    def ecrire(self, s, p, o):
+        self.f.write(f"{terme_ntriples(s)} {terme_ntriples(p)} {terme_ntriples(o)} .\n")
+
+    def fermer(self):
+        pass
+
+# <-------------------------->
+# Génération
+# <-------------------------->
+def _varier(terme, rng, variation):
+    # Valeurs numériques et dates légèrement modifiées, pour ne pas recopier les mêmes littéraux
+    from rdflib import Literal
+    if not variation or genre_terme(terme) != "litteral" or terme.datatype is None:
+        return terme
+    type_ = str(terme.datatype).rsplit("#", 1)[-1]
+    valeur = terme.toPython()
+    try:
+        if type_ in TYPES_NUMERIQUES and isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+            nouvelle = valeur * (1 + rng.uniform(-variation, variation))
+            return Literal(str(round(nouvelle) if isinstance(valeur, int) else round(nouvelle, 4)), datatype=terme.datatype)
+        if type_ in ("date", "dateTime") and isinstance(valeur, (datetime.date, datetime.datetime)):
+            nouvelle = valeur + datetime.timedelta(days=rng.randint(-int(365 * variation), int(365 * variation)))
+            return Literal(nouvelle.isoformat(), datatype=terme.datatype)
+    except (OverflowError, ValueError, TypeError):
+        pass
+    return terme
+
+def generer_cohorte(source, output_file, facteur=10, graine=0, variation=0.1, cohorte=None):
+    # Écrit l'ontologie d'origine puis (facteur - 1) × n nouveaux patients, n étant le nombre de
+    # patients d'origine. Chaque nouveau patient reprend les types et le nombre de valeurs par
+    # propriété d'un patient tiré au hasard, mais les valeurs (et leurs individus propres, renommés)
+    # viennent d'un autre patient tiré pour chaque propriété : les distributions observées sont
+    # conservées sans recopier les mêmes dossiers. Format selon l'extension (.nt, sinon RDF/XML).
+    from rdflib import URIRef, BNode
+    cohorte = cohorte or CohorteSource(source)
+    rng = random.Random(graine)
+    ecrivain_classe = EcrivainNTriples if output_file.endswith(".nt") else EcrivainRdfXml
+    nb_faits = 0
+    with open(output_file, "w", encoding="utf-8") as f:
+        ecrivain = ecrivain_classe(f, {p for _, p, _ in cohorte.triplets})
+        for triplet in cohorte.triplets:
+            ecrivain.ecrire(*triplet)
+        nb_faits += len(cohorte.triplets)
+        rdf_type = URIRef(RDF_TYPE)
+        nb_nouveaux = max(0, int(round((facteur - 1) * len(cohorte.modeles))))
+        for k in range(nb_nouveaux):
+            gabarit = rng.choice(cohorte.modeles)
+            suffixe = f"_g{k}"
+            patient = URIRef(str(gabarit.iri) + suffixe)
+            faits = [(patient, rdf_type, t) for t in gabarit.types]
+            renommes = {}
+            emis = set()  # un individu propre peut être atteint par plusieurs propriétés (dates reliées par time:after)
+
+            def renommer(terme):
+                if terme not in cohorte.propres:
+                    return _varier(terme, rng, variation)
+                if terme not in renommes:
+                    renommes[terme] = BNode(f"{terme}{suffixe}") if genre_terme(terme) == "anonyme" else URIRef(str(terme) + suffixe)
+                return renommes[terme]
+
+            for p, valeurs in gabarit.groupes.items():
+                donneur = rng.choice(cohorte.par_predicat[p])
+                candidats = donneur.groupes[p]
+                tirage = rng.sample(candidats, len(valeurs)) if len(candidats) >= len(valeurs) else rng.choices(candidats, k=len(valeurs))
+                for objet, noeuds in tirage:
+                    faits.append((patient, p, renommer(objet)))
+                    for noeud in noeuds:
+                        if noeud not in emis:
+                            emis.add(noeud)
+                            faits.extend((renommer(noeud), q, renommer(o)) for q, o in cohorte.sortants[noeud])
+            # Sans doublon, regroupés par sujet (un rdf:Description par individu)
+            faits = sorted(dict.fromkeys(faits), key=lambda t: str(t[0]))
+            for triplet in faits:
+                ecrivain.ecrire(*triplet)
+            nb_faits += len(faits)
+        ecrivain.fermer()
+    return {"patients": len(cohorte.modeles) + nb_nouveaux, "faits": nb_faits}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère une cohorte LLC synthétique à partir d'une ontologie existante.")
+    parser.add_argument("source", help="Ontologie d'origine (ex. ontology.owl)")
+    parser.add_argument("sortie", help="Fichier produit (.owl : RDF/XML, .nt : N-Triples)")
+    parser.add_argument("-f", "--facteur", type=float, default=10, help="Taille de la cohorte produite, en multiple de l'originale")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du tirage aléatoire")
+    parser.add_argument("--variation", type=float, default=0.1, help="Variation relative des valeurs numériques et des dates")
+    args = parser.parse_args(argv)
+    try:
+        stats = generer_cohorte(args.source, args.sortie, args.facteur, args.graine, args.variation)
+    except (OSError, ValueError) as e:
+        print(f"Erreur lors de la génération : {e}")
+        return 1
+    print(f"Cohorte générée : {args.sortie} ({stats['patients']} patients, {stats['faits']} faits)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
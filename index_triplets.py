@@ -0,0 +1,485 @@
+import os
+import json
+import mmap
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+from conversion import iterer_triplets, genre_terme
+from filtrage import filtrer_triplets
+
+# Au-delà, une jointure est jugée trop coûteuse pour être matérialisée
+LIMITE_LIGNES = 50_000_000
+
+# Format des index enregistrés sur disque (à incrémenter si la disposition des fichiers change)
+VERSION_INDEX = 1
+# Nombre d'index conservés sur disque (les moins récemment ouverts sont supprimés)
+NB_INDEX_CONSERVES = 8
+
+def texte_terme(terme):
+    # Représentation d'un terme rdflib alignée sur celle des règles d'AMIE :
+    # IRI complète, littéral "lexical" (sans type ni langue), nœud anonyme _:id
+    genre = genre_terme(terme)
+    if genre == "litteral":
+        return '"' + str(terme) + '"'
+    if genre == "anonyme":
+        return "_:" + str(terme)
+    return str(terme)
+
+def normaliser_constante(terme):
+    # "POS"^^xsd:string -> "POS" ; <http://...> -> http://...
+    if terme.startswith('"'):
+        fin = terme.rfind('"')
+        return terme[:fin + 1] if fin > 0 else terme
+    if terme.startswith("<") and terme.endswith(">"):
+        return terme[1:-1]
+    return terme
+
+# <-------------------------->
+# Index de triplets encodés en entiers
+# <-------------------------->
+class FaitsPredicat:
+    # Faits d'un prédicat, triés deux fois : par (sujet, objet) et par (objet, sujet)
+    __slots__ = ("sujets", "objets", "objets_os", "sujets_os", "_cles")
+
+    def __init__(self, sujets, objets, tries=False):
+        if not tries:
+            ordre = np.lexsort((objets, sujets))
+            sujets, objets = sujets[ordre], objets[ordre]
+        self.sujets = sujets
+        self.objets = objets
+        ordre = np.lexsort((sujets, objets))
+        self.objets_os = objets[ordre]
+        self.sujets_os = sujets[ordre]
+        self._cles = None
+
+    @classmethod
+    def depuis_colonnes(cls, sujets, objets, objets_os, sujets_os):
+        # Les deux ordres sont déjà calculés (index relu depuis le disque)
+        faits = cls.__new__(cls)
+        faits.sujets, faits.objets = sujets, objets
+        faits.objets_os, faits.sujets_os = objets_os, sujets_os
+        faits._cles = None
+        return faits
+
+    def __len__(self):
+        return len(self.sujets)
+
+    def cles(self):
+        # Paires (sujet, objet) codées sur 64 bits, triées : sert aux tests d'appartenance
+        if self._cles is None:
+            self._cles = (self.sujets.astype(np.int64) << 32) | self.objets.astype(np.int64)
+        return self._cles
+
+    def contient(self, sujets, objets):
+        cles = self.cles()
+        demandees = (np.asarray(sujets, dtype=np.int64) << 32) | np.asarray(objets, dtype=np.int64)
+        if not len(cles):
+            return np.zeros(len(demandees), dtype=bool)
+        pos = np.minimum(np.searchsorted(cles, demandees), len(cles) - 1)
+        return cles[pos] == demandees
+
+    def objets_de(self, sujet):
+        lo, hi = np.searchsorted(self.sujets, [sujet, sujet + 1])
+        return self.objets[lo:hi]
+
+    def sujets_de(self, objet):
+        lo, hi = np.searchsorted(self.objets_os, [objet, objet + 1])
+        return self.sujets_os[lo:hi]
+
+def _etendre(valeurs, cles_triees, associees):
+    # Pour chaque valeur, toutes les positions où elle apparaît dans cles_triees.
+    # Renvoie (numéro de ligne d'origine, valeur associée) pour chaque correspondance.
+    lo = np.searchsorted(cles_triees, valeurs, side="left")
+    hi = np.searchsorted(cles_triees, valeurs, side="right")
+    nb = hi - lo
+    total = int(nb.sum())
+    if total > LIMITE_LIGNES:
+        raise ValueError(f"Jointure trop volumineuse ({total} lignes)")
+    lignes = np.repeat(np.arange(len(valeurs)), nb)
+    decalage = np.repeat(lo - (np.cumsum(nb) - nb), nb)
+    return lignes, associees[decalage + np.arange(total)]
+
+class TermesDisque:
+    # Dictionnaire des termes d'un index enregistré, lu sans être chargé : les textes sont
+    # concaténés dans un fichier projeté en mémoire (termes.bin, bornes dans debuts.npy) et
+    # ordre.npy range les identifiants par texte croissant pour une recherche dichotomique.
+    # Les textes peuvent aussi être une partie d'un fichier plus grand, à partir de l'octet `base`.
+    def __init__(self, debuts, ordre, textes, base=0, fichier=None):
+        self.debuts = debuts
+        self.ordre = ordre
+        self.base = base
+        self._textes = textes
+        self._fichier = fichier
+        self._trouves = {}  # texte -> identifiant, déjà cherchés ou ajoutés depuis l'ouverture
+        self._ajoutes = []  # termes ajoutés en mémoire (le fichier n'est jamais modifié)
+        self._nb_disque = len(self.debuts) - 1
+
+    @classmethod
+    def depuis_dossier(cls, dossier):
+        debuts = np.load(os.path.join(dossier, "debuts.npy"), mmap_mode="r")
+        ordre = np.load(os.path.join(dossier, "ordre.npy"), mmap_mode="r")
+        fichier = open(os.path.join(dossier, "termes.bin"), "rb")
+        taille = os.fstat(fichier.fileno()).st_size
+        textes = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ) if taille else b""
+        return cls(debuts, ordre, textes, fichier=fichier)
+
+    def __len__(self):
+        return self._nb_disque + len(self._ajoutes)
+
+    # Mêmes opérations que la liste et le dictionnaire de IndexTriplets.id_terme
+    def append(self, terme):
+        self._ajoutes.append(terme)
+
+    def __setitem__(self, terme, ident):
+        self._trouves[terme] = ident
+
+    def _octets(self, i):
+        return self._textes[self.base + int(self.debuts[i]):self.base + int(self.debuts[i + 1])]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i >= self._nb_disque:
+            return self._ajoutes[i - self._nb_disque]
+        return self._octets(i).decode("utf-8")
+
+    def get(self, terme, defaut=None):
+        ident = self._trouves.get(terme)
+        if ident is not None:
+            return ident
+        cle = terme.encode("utf-8")
+        bas, haut = 0, self._nb_disque
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            if self._octets(int(self.ordre[milieu])) < cle:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        if bas < self._nb_disque and self._octets(int(self.ordre[bas])) == cle:
+            self._trouves[terme] = int(self.ordre[bas])
+            return self._trouves[terme]
+        return defaut
+
+    def fermer(self):
+        if self._fichier is None:
+            return
+        if isinstance(self._textes, mmap.mmap):
+            self._textes.close()
+        self._fichier.close()
+
+def dossier_index_defaut():
+    racine = os.environ.get("LLC_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "extracteur_llc")
+    return os.path.join(racine, "index")
+
+def _evincer_index(dossier, garder=NB_INDEX_CONSERVES):
+    try:
+        entrees = [os.path.join(dossier, nom) for nom in os.listdir(dossier) if not nom.startswith(".")]
+    except OSError:
+        return
+    entrees.sort(key=lambda chemin: os.path.getmtime(chemin), reverse=True)
+    for chemin in entrees[garder:]:
+        shutil.rmtree(chemin, ignore_errors=True)
+
+class IndexTriplets:
+    # Les termes sont internés une fois (identifiant int32) et les faits rangés par prédicat.
+    # Les motifs de triplets sont évalués par jointures vectorisées sur des tables de liaisons
+    # {variable: tableau d'identifiants}, sans jamais parcourir les triplets un par un en Python.
+    def __init__(self):
+        self.termes = []
+        self._ids = {}
+        self.faits = {}  # identifiant de prédicat -> FaitsPredicat
+        self.source = None
+        self.version = 0  # incrémentée à chaque ajout ou retrait de faits
+
+    def __len__(self):
+        return sum(len(f) for f in self.faits.values())
+
+    def id_terme(self, terme):
+        ident = self._ids.get(terme)
+        if ident is None:
+            ident = len(self.termes)
+            self.termes.append(terme)
+            self._ids[terme] = ident
+        return ident
+
+    def chercher_terme(self, terme):
+        return self._ids.get(normaliser_constante(terme), -1)
+
+    # Construction
+    @classmethod
+    def depuis_triplets(cls, triplets):
+        # triplets : itérable de (sujet, prédicat, objet) sous forme de textes
+        index = cls()
+        s, p, o = array("i"), array("i"), array("i")
+        ident = index.id_terme
+        for sujet, predicat, objet in triplets:
+            s.append(ident(sujet))
+            p.append(ident(predicat))
+            o.append(ident(objet))
+        index._construire(np.frombuffer(s, dtype=np.int32), np.frombuffer(p, dtype=np.int32),
+                          np.frombuffer(o, dtype=np.int32))
+        return index
+
+    @classmethod
+    def depuis_fichier(cls, path, format=None, filtre=None):
+        # Lecture en flux : seul l'index (entiers) et le dictionnaire des termes restent en mémoire.
+        # Avec un filtre (ConfigurationFiltre), ce sont les triplets donnés à AMIE qui sont indexés.
+        if filtre is None:
+            triplets = iterer_triplets(path, format)
+        else:
+            triplets = filtrer_triplets(lambda: iterer_triplets(path, format), filtre)
+        index = cls.depuis_triplets((texte_terme(s), texte_terme(p), texte_terme(o)) for s, p, o in triplets)
+        index.source = path
+        return index
+
+    @classmethod
+    def depuis_cache(cls, path, empreinte, format=None, dossier=None, filtre=None):
+        # Index enregistré sous l'empreinte de l'ontologie : construit à la première demande,
+        # puis rouvert directement depuis le disque (fichiers projetés en mémoire)
+        dossier = dossier or dossier_index_defaut()
+        chemin = os.path.join(dossier, empreinte)
+        index = cls.ouvrir(chemin)
+        if index is not None:
+            os.utime(chemin, None)
+            return index
+        index = cls.depuis_fichier(path, format, filtre)
+        try:
+            index.sauvegarder(chemin)
+            _evincer_index(dossier)
+        except OSError as e:
+            print(f"Impossible d'enregistrer l'index des triplets : {e}")
+        return index
+
+    def sauvegarder(self, chemin):
+        # Un dossier par index ; écrit à côté puis renommé, un lecteur ne voit jamais d'index partiel
+        os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+        temporaire = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(chemin)), prefix=".tmp-")
+        try:
+            textes = [t.encode("utf-8") for t in self.termes]
+            with open(os.path.join(temporaire, "termes.bin"), "wb") as f:
+                f.writelines(textes)
+            debuts = np.zeros(len(textes) + 1, dtype=np.int64)
+            np.cumsum([len(t) for t in textes], out=debuts[1:])
+            np.save(os.path.join(temporaire, "debuts.npy"), debuts)
+            np.save(os.path.join(temporaire, "ordre.npy"), np.array(sorted(range(len(textes)), key=textes.__getitem__), dtype=np.int32))
+            predicats = sorted(self.faits)
+            colonnes = {"s": "sujets", "o": "objets", "o_os": "objets_os", "s_os": "sujets_os"}
+            for fichier, attribut in colonnes.items():
+                valeurs = [getattr(self.faits[p], attribut) for p in predicats]
+                np.save(os.path.join(temporaire, fichier + ".npy"),
+                        np.concatenate(valeurs) if valeurs else np.zeros(0, dtype=np.int32))
+            np.save(os.path.join(temporaire, "predicats.npy"), np.array(predicats, dtype=np.int32))
+            np.save(os.path.join(temporaire, "tailles.npy"), np.array([len(self.faits[p]) for p in predicats], dtype=np.int64))
+            with open(os.path.join(temporaire, "index.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION_INDEX, "source": self.source, "termes": len(textes), "faits": len(self)}, f)
+            if os.path.exists(chemin):
+                shutil.rmtree(chemin, ignore_errors=True)
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                shutil.rmtree(temporaire, ignore_errors=True)
+
+    @classmethod
+    def ouvrir(cls, chemin):
+        # Index enregistré par sauvegarder(), ou None s'il est absent ou d'une autre version
+        try:
+            with open(os.path.join(chemin, "index.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != VERSION_INDEX:
+            return None
+        index = cls()
+        index.termes = index._ids = TermesDisque.depuis_dossier(chemin)
+        index.source = meta.get("source")
+        colonnes = {nom: np.load(os.path.join(chemin, nom + ".npy"), mmap_mode="r") for nom in ("s", "o", "o_os", "s_os")}
+        predicats = np.load(os.path.join(chemin, "predicats.npy"))
+        tailles = np.load(os.path.join(chemin, "tailles.npy"))
+        fins = np.cumsum(tailles)
+        for p, debut, fin in zip(predicats.tolist(), (fins - tailles).tolist(), fins.tolist()):
+            index.faits[p] = FaitsPredicat.depuis_colonnes(*(colonnes[nom][debut:fin] for nom in ("s", "o", "o_os", "s_os")))
+        return index
+
+    def _construire(self, s, p, o):
+        # Tri par (prédicat, sujet, objet), dédoublonnage puis découpage par prédicat
+        ordre = np.lexsort((o, s, p))
+        p, s, o = p[ordre], s[ordre], o[ordre]
+        if len(p):
+            nouveau = np.ones(len(p), dtype=bool)
+            nouveau[1:] = (np.diff(p) != 0) | (np.diff(s) != 0) | (np.diff(o) != 0)
+            p, s, o = p[nouveau], s[nouveau], o[nouveau]
+        self.faits = {}
+        if len(p):
+            coupures = np.flatnonzero(np.diff(p)) + 1
+            for debut, fin in zip(np.r_[0, coupures], np.r_[coupures, len(p)]):
+                self.faits[int(p[debut])] = FaitsPredicat(s[debut:fin], o[debut:fin], tries=True)
+
+    # Modification en mémoire (faits ajoutés ou exclus par l'utilisateur)
+    def _par_predicat(self, triplets, creer):
+        # {prédicat: clés (sujet << 32 | objet)} ; les termes inconnus sont créés ou ignorés
+        groupes = {}
+        for triplet in triplets:
+            if creer:
+                s, p, o = (self.id_terme(normaliser_constante(t)) for t in triplet)
+            else:
+                s, p, o = (self.chercher_terme(t) for t in triplet)
+                if min(s, p, o) < 0:
+                    continue
+            groupes.setdefault(p, []).append((s << 32) | o)
+        return {p: np.array(cles, dtype=np.int64) for p, cles in groupes.items()}
+
+    def _remplacer(self, p, cles):
+        cles = np.unique(cles)
+        if len(cles):
+            self.faits[p] = FaitsPredicat((cles >> 32).astype(np.int32), (cles & 0xFFFFFFFF).astype(np.int32), tries=True)
+        else:
+            self.faits.pop(p, None)
+
+    def faits_presents(self, triplets, presents=True):
+        # {prédicat: clés (sujet << 32 | objet) triées} des triplets déjà dans l'index, ou de ceux qui n'y
+        # sont pas encore (presents=False : leurs termes inconnus sont alors créés, comme par ajouter_faits)
+        resultat = {}
+        for p, cles in self._par_predicat(triplets, creer=not presents).items():
+            cles = np.unique(cles)
+            faits = self.faits.get(p)
+            dans_index = faits.contient(cles >> 32, cles & 0xFFFFFFFF) if faits is not None else np.zeros(len(cles), dtype=bool)
+            cles = cles[dans_index == presents]
+            if len(cles):
+                resultat[p] = cles
+        return resultat
+
+    def ajouter_faits(self, triplets):
+        # triplets : (sujet, prédicat, objet) en texte ; renvoie {prédicat: nombre de faits nouveaux}.
+        # Seuls les prédicats concernés sont reconstruits.
+        ajoutes = {}
+        for p, cles in self._par_predicat(triplets, creer=True).items():
+            faits = self.faits.get(p)
+            avant = len(faits) if faits is not None else 0
+            self._remplacer(p, np.concatenate([faits.cles(), cles]) if faits is not None else cles)
+            if len(self.faits[p]) > avant:
+                ajoutes[p] = len(self.faits[p]) - avant
+        self.version += 1
+        return ajoutes
+
+    def retirer_faits(self, triplets):
+        # Renvoie {prédicat: nombre de faits retirés}
+        retires = {}
+        for p, cles in self._par_predicat(triplets, creer=False).items():
+            faits = self.faits.get(p)
+            if faits is None:
+                continue
+            existantes = faits.cles()
+            gardees = existantes[~np.isin(existantes, cles)]
+            if len(gardees) < len(existantes):
+                retires[p] = len(existantes) - len(gardees)
+                self._remplacer(p, gardees)
+        self.version += 1
+        return retires
+
+    def taille_predicat(self, predicat):
+        faits = self.faits.get(predicat)
+        return len(faits) if faits is not None else 0
+
+    # Évaluation de motifs
+    def _taille_estimee(self, atome, liaisons):
+        # Estimation grossière du nombre de lignes produites, pour ordonner les jointures
+        s, p, o = atome
+        faits = self.faits.get(p) if not isinstance(p, str) else None
+        if faits is None or (not isinstance(s, str) and s < 0) or (not isinstance(o, str) and o < 0):
+            return 0
+        if not isinstance(s, str):
+            taille = len(faits.objets_de(s))
+        elif not isinstance(o, str):
+            taille = len(faits.sujets_de(o))
+        else:
+            taille = len(faits)
+        lies = sum(1 for t in (s, o) if isinstance(t, str) and t in liaisons)
+        return 0 if lies == 2 else taille // (10 ** lies)
+
+    def joindre(self, atomes, liaisons=None):
+        # atomes : liste de (sujet, prédicat, objet) où une variable est un texte "?x" et une
+        # constante un identifiant entier (-1 si le terme n'existe pas dans l'index).
+        # Renvoie une table de liaisons {variable: tableau}, éventuellement vide.
+        liaisons = dict(liaisons) if liaisons else {}
+        restants = list(atomes)
+        n = len(next(iter(liaisons.values()))) if liaisons else 1
+        while restants:
+            # Atome suivant : le plus sélectif parmi ceux reliés aux variables déjà liées
+            candidats = restants
+            if liaisons:
+                candidats = [a for a in restants if self._relie(a, liaisons)] or restants
+            atome = min(candidats, key=lambda a: self._taille_estimee(a, liaisons))
+            restants.remove(atome)
+            liaisons, n = self._joindre_atome(atome, liaisons, n)
+            if n == 0:
+                break
+        if n == 0:
+            variables = {t for a in atomes for t in (a[0], a[2]) if isinstance(t, str)} | set(liaisons)
+            return {v: np.zeros(0, dtype=np.int32) for v in variables}
+        return liaisons
+
+    def _relie(self, atome, liaisons):
+        variables = [t for t in (atome[0], atome[2]) if isinstance(t, str)]
+        return not variables or any(v in liaisons for v in variables)
+
+    def _joindre_atome(self, atome, liaisons, n):
+        s, p, o = atome
+        faits = self.faits.get(p) if isinstance(p, (int, np.integer)) and p >= 0 else None
+        vide = np.zeros(0, dtype=np.int32)
+        if faits is None or (not isinstance(s, str) and s < 0) or (not isinstance(o, str) and o < 0):
+            return {v: vide for v in liaisons}, 0
+        s_var, o_var = isinstance(s, str), isinstance(o, str)
+        s_lie = s_var and s in liaisons
+        o_lie = o_var and o in liaisons
+
+        def garder(masque):
+            return {v: col[masque] for v, col in liaisons.items()}, int(np.count_nonzero(masque))
+
+        def reproduire(lignes, nouvelle_var, valeurs):
+            resultat = {v: col[lignes] for v, col in liaisons.items()}
+            resultat[nouvelle_var] = valeurs
+            return resultat, len(valeurs)
+
+        if not s_var and not o_var:
+            present = bool(faits.contient([s], [o])[0])
+            return garder(np.full(n, present)) if liaisons else (liaisons, int(present))
+        if s_var and o_var and s == o:
+            # Motif réflexif ?x p ?x
+            reflexifs = faits.sujets[faits.sujets == faits.objets]
+            if s_lie:
+                return garder(np.isin(liaisons[s], reflexifs))
+            lignes, valeurs = _etendre(np.zeros(n, dtype=np.int32), np.zeros(len(reflexifs), dtype=np.int32), reflexifs)
+            return reproduire(lignes, s, valeurs)
+        if s_lie and o_lie:
+            return garder(faits.contient(liaisons[s], liaisons[o]))
+        if not s_var:
+            objets = faits.objets_de(s)
+            if o_lie:
+                return garder(np.isin(liaisons[o], objets))
+            lignes, valeurs = _etendre(np.zeros(n, dtype=np.int32), np.zeros(len(objets), dtype=np.int32), objets)
+            return reproduire(lignes, o, valeurs)
+        if not o_var:
+            sujets = faits.sujets_de(o)
+            if s_lie:
+                return garder(np.isin(liaisons[s], sujets))
+            lignes, valeurs = _etendre(np.zeros(n, dtype=np.int32), np.zeros(len(sujets), dtype=np.int32), sujets)
+            return reproduire(lignes, s, valeurs)
+        if s_lie:
+            lignes, valeurs = _etendre(liaisons[s], faits.sujets, faits.objets)
+            return reproduire(lignes, o, valeurs)
+        if o_lie:
+            lignes, valeurs = _etendre(liaisons[o], faits.objets_os, faits.sujets_os)
+            return reproduire(lignes, s, valeurs)
+        # Aucune variable liée : produit des liaisons courantes par tous les faits
+        if n * len(faits) > LIMITE_LIGNES:
+            raise ValueError(f"Jointure trop volumineuse ({n * len(faits)} lignes)")
+        lignes = np.repeat(np.arange(n), len(faits))
+        resultat = {v: col[lignes] for v, col in liaisons.items()}
+        resultat[s] = np.tile(faits.sujets, n)
+        resultat[o] = np.tile(faits.objets, n)
+        return resultat, len(lignes)
@@ -1,67 +1,24 @@
 import sys
 import os
-import subprocess
+from collections import deque
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QGroupBox, QPushButton, QLabel, QCheckBox, QLineEdit, QTextEdit, QToolButton,
-    QStackedWidget, QFileDialog, QMessageBox
+    QStackedWidget, QFileDialog, QMessageBox, QInputDialog, QPlainTextEdit, QScrollBar, QComboBox,
+    QListWidget, QListWidgetItem, QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QAbstractItemView
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QTextOption
+from PyQt5.QtCore import Qt, QObject, QTimer, QEvent, pyqtSignal, QAbstractTableModel, QModelIndex
 
-from rdflib import Graph, URIRef, Literal
-from rdflib.namespace import XSD
+from execution_amie import ExecutionAmie
+from balayage import grille_parametres, lire_valeurs
+from stockage import tableau_executions
+from recherche import nom_local
+from filtrage import ConfigurationFiltre, lire_liste, abreger_iri
+from modele import RuleExtractionModel
+from traces import TraceExecution
+from regles_amie import TableRegles
 
-# <-------------------------->
-# Fonctions de conversion d'ontologie
-# <-------------------------->
-def convert_owl_to_ttl(input_file, output_file):
-    try:
-        g = Graph()
-        g.parse(input_file, format='xml')
-        g.serialize(destination=output_file, format='turtle')
-        print(f"Fichier converti : {input_file} → {output_file}")
-        return True
-    except Exception as e:
-        print(f"Erreur lors de la conversion OWL->TTL: {e}")
-        return False
-
-# <-------------------------->
-# Modèle
-# <-------------------------->
-class RuleExtractionModel:
-    def __init__(self):
-        self.ontologies = []  # Liste des chemins vers les ontologies chargées
-        self.regles = []      # Liste des règles extraites
-    
-    def charger_ontologie(self, path):
-        if os.path.exists(path):
-            self.ontologies.append(path)
-            return True
-        return False
-    
-    def extraire_regles(self):
-        # Logique d'extraction de règles (simulation ici)
-        regle = {
-            "rule": "A(x) ∧ B(x,y) → C(y)",
-            "head_coverage": 0.75,
-            "std_confidence": 0.80,
-            "pca_confidence": 0.78,
-            "positive_examples": 120,
-            "body_size": 2
-        }
-        self.regles.append(regle)
-        return regle
-
-    def sauvegarder_regles(self, file_path):
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                for regle in self.regles:
-                    f.write(f"{regle}\n")
-            return True
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde : {e}")
-            return False
+import numpy as np
 
 # <-------------------------->
 # Pages pour le QStackedWidget
@@ -81,6 +38,103 @@ class AccueilPage(QWidget):
         layout.addWidget(self.label_info)
         self.setLayout(layout)
 
+class VisionneuseFichier(QWidget):
+    # Affichage d'un fichier volumineux : seules les lignes visibles sont lues et rendues
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fichier = None
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        navigation = QHBoxLayout()
+        self.label_position = QLabel("Aucun fichier")
+        self.lineedit_ligne = QLineEdit()
+        self.lineedit_ligne.setPlaceholderText("Aller à la ligne...")
+        self.lineedit_octet = QLineEdit()
+        self.lineedit_octet.setPlaceholderText("Aller à l'octet...")
+        navigation.addWidget(self.label_position)
+        navigation.addStretch()
+        navigation.addWidget(self.lineedit_ligne)
+        navigation.addWidget(self.lineedit_octet)
+
+        zone = QHBoxLayout()
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text_edit.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.text_edit.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.text_edit.viewport().installEventFilter(self)
+        self.text_edit.installEventFilter(self)
+        self.scrollbar = QScrollBar(Qt.Vertical)
+        zone.addWidget(self.text_edit)
+        zone.addWidget(self.scrollbar)
+
+        layout.addLayout(navigation)
+        layout.addLayout(zone)
+        self.setLayout(layout)
+
+        self.scrollbar.valueChanged.connect(self.afficher)
+        self.lineedit_ligne.returnPressed.connect(self._aller_ligne)
+        self.lineedit_octet.returnPressed.connect(self._aller_octet)
+
+    def ouvrir(self, fichier):
+        self.fichier = fichier
+        self._mettre_a_jour_plage()
+        self.scrollbar.setValue(0)
+        self.afficher()
+
+    def nb_lignes_visibles(self):
+        hauteur = self.text_edit.viewport().height()
+        return max(1, hauteur // max(1, self.text_edit.fontMetrics().lineSpacing()))
+
+    def _mettre_a_jour_plage(self):
+        nb = len(self.fichier) if self.fichier else 0
+        visibles = self.nb_lignes_visibles()
+        self.scrollbar.setRange(0, max(0, nb - visibles))
+        self.scrollbar.setPageStep(visibles)
+
+    def afficher(self, *args):
+        if self.fichier is None:
+            return
+        debut = self.scrollbar.value()
+        lignes = self.fichier.lignes(debut, self.nb_lignes_visibles())
+        defilement_h = self.text_edit.horizontalScrollBar().value()
+        self.text_edit.setPlainText("\n".join(lignes))
+        self.text_edit.horizontalScrollBar().setValue(defilement_h)
+        self.label_position.setText(
+            f"Lignes {debut + 1}-{debut + len(lignes)} / {len(self.fichier)} ({self.fichier.taille} octets)"
+        )
+
+    def aller_a_ligne(self, numero):
+        self.scrollbar.setValue(max(0, numero - 1))
+
+    def _aller_ligne(self):
+        if self.fichier and self.lineedit_ligne.text().strip().isdigit():
+            self.aller_a_ligne(int(self.lineedit_ligne.text()))
+
+    def _aller_octet(self):
+        if self.fichier and self.lineedit_octet.text().strip().isdigit():
+            self.aller_a_ligne(self.fichier.ligne_de_position(int(self.lineedit_octet.text())) + 1)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Wheel:
+            pas = -event.angleDelta().y() // 40
+            self.scrollbar.setValue(self.scrollbar.value() + pas)
+            return True
+        if event.type() == QEvent.KeyPress and event.key() in (Qt.Key_PageDown, Qt.Key_PageUp, Qt.Key_Down, Qt.Key_Up):
+            pas = {Qt.Key_PageDown: self.scrollbar.pageStep(), Qt.Key_PageUp: -self.scrollbar.pageStep(),
+                   Qt.Key_Down: 1, Qt.Key_Up: -1}[event.key()]
+            self.scrollbar.setValue(self.scrollbar.value() + pas)
+            return True
+        if event.type() in (QEvent.Resize, QEvent.FontChange):
+            QTimer.singleShot(0, self._rafraichir)
+        return super().eventFilter(obj, event)
+
+    def _rafraichir(self):
+        if self.fichier is not None:
+            self._mettre_a_jour_plage()
+            self.afficher()
+
 class GestionOntologiesPage(QWidget):
     # Page pour la gestion des ontologies (chargement, visualisation...)
     def __init__(self, parent=None):
@@ -89,20 +143,119 @@ class GestionOntologiesPage(QWidget):
         self.label = QLabel("Page : Gestion des ontologies")
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText("Ici, vous pouvez afficher et manipuler les ontologies chargées.")
-        # Désactiver le retour à la ligne automatique
-        self.text_edit.setLineWrapMode(QTextEdit.NoWrap)
-        # Configurer l'option de texte par défaut pour être sûr que le wrap est désactivé
-        option = QTextOption()
-        option.setWrapMode(QTextOption.NoWrap)
-        self.text_edit.document().setDefaultTextOption(option)
-        
-        # Afficher la barre de défilement horizontale (là où c'est nécessaire ou toujours)
-        self.text_edit.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.text_edit.setMaximumHeight(100)
+        # Le contenu des ontologies est affiché par la visionneuse, qui ne lit que les lignes visibles
+        self.visionneuse = VisionneuseFichier()
 
         layout.addWidget(self.label)
         layout.addWidget(self.text_edit)
+        layout.addWidget(self.visionneuse)
         self.setLayout(layout)
 
+# Colonnes du tableau des règles : (titre, colonne de la TableRegles ; None = texte de la règle)
+COLONNES_TABLEAU_REGLES = [
+    ("N°", None),
+    ("Règle", "rule"),
+    ("Head coverage", "head_coverage"),
+    ("Std confidence", "std_confidence"),
+    ("PCA confidence", "pca_confidence"),
+    ("Exemples positifs", "positive_examples"),
+    ("Body size", "body_size"),
+    ("PCA body size", "pca_body_size"),
+    ("Variable fonctionnelle", "functional_variable"),
+]
+
+class ModeleTableRegles(QAbstractTableModel):
+    # Vue en tableau d'une TableRegles : seules les lignes affichées sont mises en texte.
+    # self.indices donne, pour chaque ligne, le numéro de la règle (après filtrage et tri) ;
+    # filtrer et trier travaillent sur les colonnes NumPy (O(n log n) pour le tri).
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.table = TableRegles()
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.seuils = {}
+        self.tri = None  # (nom de colonne, décroissant)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.indices)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLONNES_TABLEAU_REGLES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLONNES_TABLEAU_REGLES[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.TextAlignmentRole, Qt.ToolTipRole):
+            return None
+        i = int(self.indices[index.row()])
+        nom = COLONNES_TABLEAU_REGLES[index.column()][1]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignVCenter | (Qt.AlignLeft if nom in ("rule", "functional_variable") else Qt.AlignRight)
+        if nom is None:
+            return str(i + 1)
+        if nom == "rule":
+            return self.table.texte_regle(i)
+        if role == Qt.ToolTipRole:
+            return None
+        valeur = self.table.colonne(nom)[i]
+        if nom == "functional_variable":
+            return self.table.termes[int(valeur)]
+        return f"{valeur:.4f}" if isinstance(valeur, np.floating) else str(int(valeur))
+
+    def regle(self, ligne):
+        return int(self.indices[ligne])
+
+    def ligne(self, i):
+        # Ligne où est affichée la règle i, ou -1 si elle est filtrée
+        lignes = np.flatnonzero(self.indices == i)
+        return int(lignes[0]) if len(lignes) else -1
+
+    def _calculer_indices(self):
+        indices = self.table.filtrer(**self.seuils) if self.seuils else np.arange(len(self.table))
+        if self.tri is not None:
+            nom, decroissant = self.tri
+            indices = self.table.trier(nom, decroissant, indices) if nom else (indices[::-1] if decroissant else indices)
+        return indices
+
+    def synchroniser(self, table):
+        # Nouvelle table : tout est recalculé. Même table qui a grandi (sortie d'AMIE lue au fil de
+        # l'eau) : sans filtre ni tri, les nouvelles lignes sont simplement ajoutées à la fin.
+        if table is not self.table:
+            self.beginResetModel()
+            self.table = table
+            self.indices = self._calculer_indices()
+            self.endResetModel()
+            return
+        debut = len(self.indices)
+        if not self.seuils and self.tri is None:
+            if len(table) > debut:
+                self.beginInsertRows(QModelIndex(), debut, len(table) - 1)
+                self.indices = np.arange(len(table))
+                self.endInsertRows()
+            return
+        self.layoutAboutToBeChanged.emit()
+        self.indices = self._calculer_indices()
+        self.layoutChanged.emit()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        nom = COLONNES_TABLEAU_REGLES[column][1]
+        if nom in ("rule", "functional_variable"):
+            return  # Pas de tri sur le texte : il faudrait mettre en texte toutes les règles
+        self.layoutAboutToBeChanged.emit()
+        self.tri = (nom, order == Qt.DescendingOrder)
+        self.indices = self._calculer_indices()
+        self.layoutChanged.emit()
+
+    def filtrer(self, **seuils):
+        # Mêmes seuils que TableRegles.filtrer : minimum, ou (minimum, maximum)
+        self.beginResetModel()
+        self.seuils = {nom: seuil for nom, seuil in seuils.items() if seuil not in (None, (None, None))}
+        self.indices = self._calculer_indices()
+        self.endResetModel()
+
 class ExtractionReglesPage(QWidget):
     # Page pour extraire, lister, visualiser, sauvegarder des règles
     def __init__(self, parent=None):
@@ -111,8 +264,42 @@ class ExtractionReglesPage(QWidget):
         self.label = QLabel("Page : Extraction et gestion des règles")
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText("Ici, vous pouvez lancer l'extraction, visualiser et sauvegarder les règles.")
+        # Filtres du tableau des règles (vide = pas de seuil)
+        filtres_layout = QHBoxLayout()
+        self.lineedit_min_hc = QLineEdit()
+        self.lineedit_min_std = QLineEdit()
+        self.lineedit_min_pca = QLineEdit()
+        self.lineedit_max_corps = QLineEdit()
+        for label, lineedit in (("Head coverage ≥", self.lineedit_min_hc), ("Std conf. ≥", self.lineedit_min_std),
+                                ("PCA conf. ≥", self.lineedit_min_pca), ("Body size ≤", self.lineedit_max_corps)):
+            lineedit.setMaximumWidth(70)
+            filtres_layout.addWidget(QLabel(label))
+            filtres_layout.addWidget(lineedit)
+        self.btn_filtrer_regles = QPushButton("Filtrer")
+        self.btn_elaguer_regles = QPushButton("Élaguer les redondances")
+        self.label_nb_regles = QLabel("")
+        filtres_layout.addWidget(self.btn_filtrer_regles)
+        filtres_layout.addWidget(self.btn_elaguer_regles)
+        filtres_layout.addStretch()
+        filtres_layout.addWidget(self.label_nb_regles)
+        # Tableau des règles : seules les lignes visibles sont lues, même pour des millions de règles
+        self.modele_regles = ModeleTableRegles(self)
+        self.table_regles = QTableView()
+        self.table_regles.setModel(self.modele_regles)
+        self.table_regles.setSortingEnabled(True)
+        self.table_regles.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_regles.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_regles.verticalHeader().setVisible(False)
+        self.table_regles.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_regles.verticalHeader().setDefaultSectionSize(22)
+        self.table_regles.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table_regles.setColumnWidth(0, 60)
+        self.table_regles.setColumnWidth(1, 480)
+        self.text_edit.setMaximumHeight(180)
         layout.addWidget(self.label)
         layout.addWidget(self.text_edit)
+        layout.addLayout(filtres_layout)
+        layout.addWidget(self.table_regles)
         self.setLayout(layout)
 
 class QualiteValidationPage(QWidget):
@@ -133,9 +320,38 @@ class AnalyseDonneesPage(QWidget):
         super().__init__(parent)
         layout = QVBoxLayout()
         self.label = QLabel("Page : Analyse et interrogation des données")
+        # Requête SPARQL simple : motifs de triplets, préfixes usuels (rdf, rdfs, owl, llc...) déjà déclarés
+        self.editeur_requete = QPlainTextEdit()
+        self.editeur_requete.setPlaceholderText("SELECT ?patient ?maladie WHERE { ?patient a llc:UPNPatient ; llc:aPourMaladie ?maladie }")
+        self.editeur_requete.setMaximumHeight(120)
+        boutons_layout = QHBoxLayout()
+        self.btn_executer_requete = QPushButton("Exécuter la requête")
+        self.btn_page_precedente = QPushButton("< Page précédente")
+        self.btn_page_suivante = QPushButton("Page suivante >")
+        self.label_page = QLabel("")
+        for widget in (self.btn_executer_requete, self.btn_page_precedente, self.btn_page_suivante, self.label_page):
+            boutons_layout.addWidget(widget)
+        self.table_resultats = QTableWidget()
+        self.table_resultats.setEditTriggers(QTableWidget.NoEditTriggers)
+        # Faits ajoutés ou exclus, un par ligne : les métriques des règles concernées sont recalculées
+        self.editeur_faits = QPlainTextEdit()
+        self.editeur_faits.setPlaceholderText("llc:patient1 llc:aPourMaladie llc:LLC")
+        self.editeur_faits.setMaximumHeight(80)
+        faits_layout = QHBoxLayout()
+        self.btn_ajouter_faits = QPushButton("Ajouter ces faits")
+        self.btn_exclure_faits = QPushButton("Exclure ces faits")
+        self.btn_retablir_faits = QPushButton("Rétablir les données d'origine")
+        for bouton in (self.btn_ajouter_faits, self.btn_exclure_faits, self.btn_retablir_faits):
+            faits_layout.addWidget(bouton)
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText("Ici, vous pouvez interroger et analyser les données.")
+        self.text_edit.setMaximumHeight(150)
         layout.addWidget(self.label)
+        layout.addWidget(self.editeur_requete)
+        layout.addLayout(boutons_layout)
+        layout.addWidget(self.table_resultats)
+        layout.addWidget(self.editeur_faits)
+        layout.addLayout(faits_layout)
         layout.addWidget(self.text_edit)
         self.setLayout(layout)
 
@@ -145,12 +361,60 @@ class ComparaisonPage(QWidget):
         super().__init__(parent)
         layout = QVBoxLayout()
         self.label = QLabel("Page : Comparaison des résultats")
+        boutons_layout = QHBoxLayout()
+        self.btn_ajouter_fichier = QPushButton("Ajouter un fichier de règles")
+        self.btn_ajouter_execution = QPushButton("Ajouter une exécution enregistrée")
+        self.btn_ajouter_courantes = QPushButton("Ajouter les règles courantes")
+        self.btn_comparer = QPushButton("Comparer")
+        self.btn_vider = QPushButton("Vider la sélection")
+        for bouton in (self.btn_ajouter_fichier, self.btn_ajouter_execution, self.btn_ajouter_courantes,
+                       self.btn_comparer, self.btn_vider):
+            boutons_layout.addWidget(bouton)
+        self.label_ensembles = QLabel("Aucun ensemble de règles sélectionné.")
+        self.label_ensembles.setWordWrap(True)
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText("Ici, vous pouvez comparer différents résultats d'extraction.")
         layout.addWidget(self.label)
+        layout.addLayout(boutons_layout)
+        layout.addWidget(self.label_ensembles)
         layout.addWidget(self.text_edit)
         self.setLayout(layout)
 
+class RecherchePage(QWidget):
+    # Page des résultats de la barre de recherche
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        self.label = QLabel("Page : Recherche")
+        self.liste_resultats = QListWidget()
+        layout.addWidget(self.label)
+        layout.addWidget(self.liste_resultats)
+        self.setLayout(layout)
+
+class PerformancesPage(QWidget):
+    # Page des performances : durée, CPU et mémoire de chaque étape de la dernière exécution
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        self.label = QLabel("Page : Performances par étape")
+        boutons_layout = QHBoxLayout()
+        self.btn_derniere_trace = QPushButton("Dernière exécution")
+        self.btn_trace_en_cours = QPushButton("Étapes depuis la dernière exécution")
+        self.btn_ouvrir_trace = QPushButton("Ouvrir une trace")
+        for bouton in (self.btn_derniere_trace, self.btn_trace_en_cours, self.btn_ouvrir_trace):
+            boutons_layout.addWidget(bouton)
+        self.label_trace = QLabel("Aucune trace.")
+        self.label_trace.setWordWrap(True)
+        self.table_etapes = QTableWidget(0, 6)
+        self.table_etapes.setHorizontalHeaderLabels(["Étape", "Durée (s)", "% du total", "CPU (s)", "Pic mémoire (Mo)", "Détails"])
+        self.table_etapes.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table_etapes.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.label)
+        layout.addLayout(boutons_layout)
+        layout.addWidget(self.label_trace)
+        layout.addWidget(self.table_etapes)
+        self.setLayout(layout)
+
 # <-------------------------->
 # Vue
 # <-------------------------->
@@ -188,10 +452,12 @@ class RuleExtractionView(QMainWindow):
         self.btn_lister_regles = QPushButton("Lister les règles")
         self.btn_visualiser_regles = QPushButton("Visualiser les règles")
         self.btn_sauvegarder_regles = QPushButton("Sauvegarder les règles extraites")
+        self.btn_historique_executions = QPushButton("Historique des exécutions")
         regles_layout.addWidget(self.btn_extraire_regles)
         regles_layout.addWidget(self.btn_lister_regles)
         regles_layout.addWidget(self.btn_visualiser_regles)
         regles_layout.addWidget(self.btn_sauvegarder_regles)
+        regles_layout.addWidget(self.btn_historique_executions)
         group_regles.setLayout(regles_layout)
         
         # Qualité et validation des règles
@@ -228,6 +494,11 @@ class RuleExtractionView(QMainWindow):
         amie3_layout = QVBoxLayout()
         self.btn_lancer_amie3 = QPushButton("Lancer AMIE3")
         amie3_layout.addWidget(self.btn_lancer_amie3)
+        self.btn_annuler_amie3 = QPushButton("Arrêter AMIE3")
+        self.btn_annuler_amie3.setEnabled(False)
+        amie3_layout.addWidget(self.btn_annuler_amie3)
+        self.btn_performances = QPushButton("Performances par étape")
+        amie3_layout.addWidget(self.btn_performances)
         # Champs pour -minc (standard confidence)
         self.label_minc = QLabel("Min standard confidence (-minc):")
         self.lineedit_minc = QLineEdit("0.0")  # Valeur par défaut
@@ -246,10 +517,69 @@ class RuleExtractionView(QMainWindow):
         amie3_layout.addWidget(self.label_nc)
         amie3_layout.addWidget(self.lineedit_nc)
 
+        # Délai maximal d'exécution (vide = aucune limite)
+        self.label_timeout = QLabel("Délai maximal en secondes (vide = aucun):")
+        self.lineedit_timeout = QLineEdit("")
+        amie3_layout.addWidget(self.label_timeout)
+        amie3_layout.addWidget(self.lineedit_timeout)
+
         # Option -const
         self.checkbox_const = QCheckBox("Activer -const")
         amie3_layout.addWidget(self.checkbox_const)
+
+        # Une configuration déjà minée sur la même entrée est relue depuis l'historique
+        self.checkbox_reutiliser = QCheckBox("Réutiliser les résultats enregistrés")
+        self.checkbox_reutiliser.setChecked(True)
+        amie3_layout.addWidget(self.checkbox_reutiliser)
+
+        # Format du fichier d'entrée d'AMIE
+        self.label_format_entree = QLabel("Format d'entrée:")
+        self.combo_format_entree = QComboBox()
+        self.combo_format_entree.addItem("Turtle (rdflib)", ("turtle", None))
+        self.combo_format_entree.addItem("TSV en flux", ("tsv", None))
+        self.combo_format_entree.addItem("TSV, IRIs préfixées", ("tsv", "prefixe"))
+        self.combo_format_entree.addItem("TSV, identifiants entiers", ("tsv", "entier"))
+        amie3_layout.addWidget(self.label_format_entree)
+        amie3_layout.addWidget(self.combo_format_entree)
+
+        # Les ontologies de chaque site sont fusionnées (sans doublon) en une seule entrée
+        self.checkbox_fusionner = QCheckBox("Miner l'union de toutes les ontologies chargées")
+        amie3_layout.addWidget(self.checkbox_fusionner)
+
+        # Balayage : -minc et -minpca acceptent des listes (ex. 0.1, 0.3, 0.5), -nc devient le nombre total de cœurs
+        self.btn_balayage_amie3 = QPushButton("Balayage de paramètres")
+        self.btn_balayage_amie3.setToolTip("Lance AMIE3 pour chaque combinaison des valeurs de -minc et -minpca séparées par des virgules")
+        amie3_layout.addWidget(self.btn_balayage_amie3)
+        self.checkbox_balayer_const = QCheckBox("Balayer -const (avec et sans)")
+        amie3_layout.addWidget(self.checkbox_balayer_const)
+        self.label_paralleles = QLabel("Exécutions simultanées (vide = auto):")
+        self.lineedit_paralleles = QLineEdit("")
+        amie3_layout.addWidget(self.label_paralleles)
+        amie3_layout.addWidget(self.lineedit_paralleles)
         group_amie3.setLayout(amie3_layout)
+
+        # Filtrage des triplets avant le minage
+        group_filtrage = QGroupBox("Filtrage avant minage")
+        filtrage_layout = QVBoxLayout()
+        profil = ConfigurationFiltre.profil_clinique()
+        self.checkbox_filtrage = QCheckBox("Filtrer les triplets structurels (SWRL/OWL)")
+        self.label_espaces_exclus = QLabel("Espaces de noms exclus:")
+        self.lineedit_espaces_exclus = QLineEdit(", ".join(abreger_iri(x) for x in profil.espaces_exclus))
+        self.label_predicats_exclus = QLabel("Prédicats exclus:")
+        self.lineedit_predicats_exclus = QLineEdit(", ".join(sorted(abreger_iri(str(x)) for x in profil.predicats_exclus)))
+        self.label_types_exclus = QLabel("Types exclus:")
+        self.lineedit_types_exclus = QLineEdit(", ".join(sorted(abreger_iri(str(x)) for x in profil.types_exclus)))
+        self.checkbox_rdfs = QCheckBox("Matérialiser les inférences RDFS")
+        self.checkbox_rdfs.setChecked(profil.materialiser_rdfs)
+        filtrage_layout.addWidget(self.checkbox_filtrage)
+        filtrage_layout.addWidget(self.label_espaces_exclus)
+        filtrage_layout.addWidget(self.lineedit_espaces_exclus)
+        filtrage_layout.addWidget(self.label_predicats_exclus)
+        filtrage_layout.addWidget(self.lineedit_predicats_exclus)
+        filtrage_layout.addWidget(self.label_types_exclus)
+        filtrage_layout.addWidget(self.lineedit_types_exclus)
+        filtrage_layout.addWidget(self.checkbox_rdfs)
+        group_filtrage.setLayout(filtrage_layout)
         
         self.left_panel.addWidget(group_ontologies)
         self.left_panel.addWidget(group_regles)
@@ -257,6 +587,7 @@ class RuleExtractionView(QMainWindow):
         self.left_panel.addWidget(group_analyse)
         self.left_panel.addWidget(group_comparaison)
         self.left_panel.addWidget(group_amie3)
+        self.left_panel.addWidget(group_filtrage)
         self.left_panel.addStretch()
         
         # <-------------------------->
@@ -294,6 +625,8 @@ class RuleExtractionView(QMainWindow):
         self.page_qualite = QualiteValidationPage()          # index 3
         self.page_analyse = AnalyseDonneesPage()             # index 4
         self.page_comparaison = ComparaisonPage()            # index 5
+        self.page_recherche = RecherchePage()                # index 6
+        self.page_performances = PerformancesPage()          # index 7
         
         self.stacked_widget.addWidget(self.page_accueil)
         self.stacked_widget.addWidget(self.page_gestion_onto)
@@ -301,6 +634,8 @@ class RuleExtractionView(QMainWindow):
         self.stacked_widget.addWidget(self.page_qualite)
         self.stacked_widget.addWidget(self.page_analyse)
         self.stacked_widget.addWidget(self.page_comparaison)
+        self.stacked_widget.addWidget(self.page_recherche)
+        self.stacked_widget.addWidget(self.page_performances)
         
         self.central_layout.addWidget(self.label_titre)
         self.central_layout.addLayout(tools_layout)
@@ -313,10 +648,38 @@ class RuleExtractionView(QMainWindow):
 # <-------------------------->
 # Contrôleur
 # <-------------------------->
+# Lignes de résultat d'une requête affichées à la fois
+TAILLE_PAGE_REQUETE = 100
+
+class SignauxExecution(QObject):
+    # Ramène la fin d'une exécution AMIE3 (thread de lecture) dans le thread de l'interface
+    execution_terminee = pyqtSignal(object)
+    configuration_terminee = pyqtSignal(object)
+    balayage_termine = pyqtSignal(object)
+
 class RuleExtractionController:
     def __init__(self, model, view):
         self.model = model
         self.view = view
+        self.execution = None
+        self.balayage = None
+        self._nb_configurations_recues = 0
+        # Les lignes d'AMIE arrivent depuis le thread de lecture et sont affichées par lots
+        self._lignes_en_attente = deque()
+        self._minuteur_sortie = QTimer()
+        self._minuteur_sortie.setInterval(100)
+        self._minuteur_sortie.timeout.connect(self._vider_sortie_amie)
+        self._signaux_execution = SignauxExecution()
+        self._signaux_execution.execution_terminee.connect(self._fin_amie3)
+        self._signaux_execution.configuration_terminee.connect(self._fin_configuration)
+        self._signaux_execution.balayage_termine.connect(self._fin_balayage)
+        # La recherche est lancée quand la saisie marque une pause
+        self._minuteur_recherche = QTimer()
+        self._minuteur_recherche.setSingleShot(True)
+        self._minuteur_recherche.setInterval(250)
+        self._minuteur_recherche.timeout.connect(self.do_rechercher)
+        self.resultat_requete = None
+        self._page_requete = 0
         self._connect_signals()
     
     def _connect_signals(self):
@@ -329,6 +692,13 @@ class RuleExtractionController:
         self.view.btn_lister_regles.clicked.connect(self.do_lister_regles)
         self.view.btn_visualiser_regles.clicked.connect(self.do_visualiser_regles)
         self.view.btn_sauvegarder_regles.clicked.connect(self.do_sauvegarder_regles)
+        self.view.btn_historique_executions.clicked.connect(self.do_historique_executions)
+        page = self.view.page_extraction_regles
+        page.btn_filtrer_regles.clicked.connect(self.do_filtrer_regles)
+        page.btn_elaguer_regles.clicked.connect(self.do_elaguer_regles)
+        for lineedit in (page.lineedit_min_hc, page.lineedit_min_std, page.lineedit_min_pca, page.lineedit_max_corps):
+            lineedit.returnPressed.connect(self.do_filtrer_regles)
+        page.table_regles.activated.connect(lambda index: self._afficher_details_regles([index.row()]))
 
         # Qualité / Validation
         self.view.btn_mesurer_qualite_regle.clicked.connect(self.do_mesurer_qualite_regle)
@@ -337,15 +707,39 @@ class RuleExtractionController:
 
         # Analyse des données
         self.view.btn_interroger_donnees.clicked.connect(lambda: self.afficher_page(4))
-        self.view.btn_tester_hypothese.clicked.connect(lambda: self.afficher_page(4))
-        self.view.btn_marquer_donnees.clicked.connect(lambda: self.afficher_page(4))
+        self.view.page_analyse.btn_executer_requete.clicked.connect(self.do_executer_requete)
+        self.view.page_analyse.btn_page_precedente.clicked.connect(lambda: self._afficher_page_requete(self._page_requete - 1))
+        self.view.page_analyse.btn_page_suivante.clicked.connect(lambda: self._afficher_page_requete(self._page_requete + 1))
+        self.view.btn_tester_hypothese.clicked.connect(self.do_tester_hypothese)
+        self.view.btn_marquer_donnees.clicked.connect(self.do_marquer_donnees)
+        self.view.page_analyse.btn_ajouter_faits.clicked.connect(lambda: self._modifier_faits(exclure=False))
+        self.view.page_analyse.btn_exclure_faits.clicked.connect(lambda: self._modifier_faits(exclure=True))
+        self.view.page_analyse.btn_retablir_faits.clicked.connect(self.do_retablir_donnees)
 
         # Comparaison
-        self.view.btn_comparer_resultats.clicked.connect(lambda: self.afficher_page(5))
+        self.view.btn_comparer_resultats.clicked.connect(self.do_comparer_resultats)
+        self.view.page_comparaison.btn_ajouter_fichier.clicked.connect(self.do_ajouter_fichier_comparaison)
+        self.view.page_comparaison.btn_ajouter_execution.clicked.connect(self.do_ajouter_execution_comparaison)
+        self.view.page_comparaison.btn_ajouter_courantes.clicked.connect(self.do_ajouter_regles_courantes)
+        self.view.page_comparaison.btn_comparer.clicked.connect(self.do_lancer_comparaison)
+        self.view.page_comparaison.btn_vider.clicked.connect(self.do_vider_comparaison)
         
         # Bouton AMIE3
         self.view.btn_lancer_amie3.clicked.connect(self.do_lancer_amie3)
+        self.view.btn_annuler_amie3.clicked.connect(self.do_annuler_amie3)
+        self.view.btn_balayage_amie3.clicked.connect(self.do_lancer_balayage)
+
+        # Performances
+        self.view.btn_performances.clicked.connect(self.do_performances)
+        self.view.page_performances.btn_derniere_trace.clicked.connect(lambda: self._afficher_trace(self.model.derniere_trace))
+        self.view.page_performances.btn_trace_en_cours.clicked.connect(lambda: self._afficher_trace(self.model.trace))
+        self.view.page_performances.btn_ouvrir_trace.clicked.connect(self.do_ouvrir_trace)
         
+        # Recherche
+        self.view.lineedit_recherche.textChanged.connect(lambda _: self._minuteur_recherche.start())
+        self.view.lineedit_recherche.returnPressed.connect(self.do_rechercher)
+        self.view.page_recherche.liste_resultats.itemActivated.connect(self.do_ouvrir_resultat)
+
         # Boutons de zoom
         self.view.btn_zoom_in.clicked.connect(self.zoom_in)
         self.view.btn_zoom_out.clicked.connect(self.zoom_out)
@@ -365,10 +759,8 @@ class RuleExtractionController:
         if self.model.ontologies:
             dernier = self.model.ontologies[-1]
             try:
-                with open(dernier, "r", encoding="utf-8") as f:
-                    contenu = f.read()
-                self.view.page_gestion_onto.text_edit.setPlainText(contenu)
                 self.afficher_page(1)
+                self.view.page_gestion_onto.visionneuse.ouvrir(self.model.fichier_indexe(dernier))
             except Exception as e:
                 QMessageBox.warning(self.view, "Erreur", f"Impossible de lire le fichier : {e}")
         else:
@@ -376,108 +768,639 @@ class RuleExtractionController:
 
     # Fonctions d'extraction et de gestion des règles
     def do_extraire_regles(self):
-        regle = self.model.extraire_regles()
-        self.view.page_extraction_regles.text_edit.append("Règle extraite :")
-        self.view.page_extraction_regles.text_edit.append(
-            f"Rule: {regle['rule']}\n"
-            f"Head Coverage: {regle['head_coverage']}\n"
-            f"Std Confidence: {regle['std_confidence']}\n"
-            f"PCA Confidence: {regle['pca_confidence']}\n"
-            f"Positive Examples: {regle['positive_examples']}\n"
-            f"Body Size: {regle['body_size']}\n"
+        file_path, _ = QFileDialog.getOpenFileName(
+            self.view, "Extraire les règles d'une sortie d'AMIE3", "", "Text Files (*.txt);;Règles binaires (*.regles);;Tous les fichiers (*)"
         )
+        if not file_path:
+            return
+        regles = self.model.extraire_regles(file_path)
+        if regles is None:
+            QMessageBox.warning(self.view, "Erreur", "Le fichier sélectionné n'a pas pu être lu.")
+            return
+        stats = self.model.parseur_amie.stats
+        self.view.page_extraction_regles.text_edit.append(f"{len(regles)} règles extraites de {file_path}")
+        if "nb_faits" in stats:
+            self.view.page_extraction_regles.text_edit.append(f"Base de connaissances : {stats['nb_faits']} faits")
+        self._rafraichir_regles()
+        self.afficher_page(2)
     
     def do_lister_regles(self):
-        self.view.page_extraction_regles.text_edit.append("Liste des règles extraites :")
-        if not self.model.regles:
-            self.view.page_extraction_regles.text_edit.append("Aucune règle extraite.")
-        else:
-            for idx, regle in enumerate(self.model.regles, start=1):
-                self.view.page_extraction_regles.text_edit.append(f"{idx}. {regle['rule']}")
+        # Toutes les règles, sans filtre, dans le tableau
+        page = self.view.page_extraction_regles
+        self.afficher_page(2)
+        if not len(self.model.regles):
+            page.text_edit.append("Aucune règle extraite.")
+            return
+        for lineedit in (page.lineedit_min_hc, page.lineedit_min_std, page.lineedit_min_pca, page.lineedit_max_corps):
+            lineedit.clear()
+        page.modele_regles.filtrer()
+        self._rafraichir_regles()
+        page.text_edit.append(f"{len(self.model.regles)} règles extraites dans le tableau (cliquez un en-tête pour trier).")
     
     def do_visualiser_regles(self):
-        self.view.page_extraction_regles.text_edit.append("Détails des règles extraites :")
-        for regle in self.model.regles:
-            self.view.page_extraction_regles.text_edit.append(str(regle))
+        # Détails des règles sélectionnées dans le tableau
+        page = self.view.page_extraction_regles
+        self.afficher_page(2)
+        self._rafraichir_regles()
+        lignes = sorted(index.row() for index in page.table_regles.selectionModel().selectedRows())
+        if not lignes:
+            page.text_edit.append("Sélectionnez une ou plusieurs règles dans le tableau pour voir leurs détails.")
+            return
+        self._afficher_details_regles(lignes)
+
+    def _afficher_details_regles(self, lignes):
+        modele = self.view.page_extraction_regles.modele_regles
+        with self.model.trace.mesurer("affichage", regles=len(lignes)):
+            self.view.page_extraction_regles.text_edit.append(
+                "\n".join(f"Règle {modele.regle(l) + 1} : {modele.table.regle(modele.regle(l))}" for l in lignes)
+            )
+
+    def _rafraichir_regles(self):
+        # Le tableau suit self.model.regles (table remplacée ou règles ajoutées au fil de l'eau)
+        page = self.view.page_extraction_regles
+        with self.model.trace.mesurer("affichage"):
+            page.modele_regles.synchroniser(self.model.regles)
+        page.label_nb_regles.setText(f"{page.modele_regles.rowCount()} règles affichées sur {len(self.model.regles)}")
 
+    def do_filtrer_regles(self):
+        page = self.view.page_extraction_regles
+        try:
+            lire = lambda lineedit: float(lineedit.text().replace(",", ".")) if lineedit.text().strip() else None
+            seuils = {
+                "head_coverage": lire(page.lineedit_min_hc),
+                "std_confidence": lire(page.lineedit_min_std),
+                "pca_confidence": lire(page.lineedit_min_pca),
+                "body_size": (None, lire(page.lineedit_max_corps)),
+            }
+        except ValueError:
+            page.label_nb_regles.setText("Seuils invalides : les valeurs doivent être numériques.")
+            return
+        with self.model.trace.mesurer("affichage"):
+            page.modele_regles.filtrer(**seuils)
+        self._rafraichir_regles()
+
+    def do_elaguer_regles(self):
+        # Écarte les tautologies, doublons et spécialisations sans gain ; le motif des premières est affiché
+        page = self.view.page_extraction_regles
+        if (self.execution and self.execution.en_cours) or (self.balayage and self.balayage.en_cours):
+            page.text_edit.append("Attendez la fin d'AMIE3 avant d'élaguer les règles.")
+            return
+        if not len(self.model.regles):
+            page.text_edit.append("Aucune règle à élaguer.")
+            return
+        elagage = self.model.elaguer_regles()
+        self._rafraichir_regles()
+        page.text_edit.append("Élagage : " + elagage.rapport())
     
     def do_sauvegarder_regles(self):
-        file_path, _ = QFileDialog.getSaveFileName(
-            self.view, "Sauvegarder les règles extraites", "", "Text Files (*.txt);;Tous les fichiers (*)"
+        file_path, filtre = QFileDialog.getSaveFileName(
+            self.view, "Sauvegarder les règles extraites", "",
+            "Text Files (*.txt);;Règles binaires (*.regles);;Règles binaires compressées (*.regles);;Tous les fichiers (*)"
         )
         if file_path:
-            if self.model.sauvegarder_regles(file_path):
+            # Le format binaire se relit instantanément (projection en mémoire), même pour des millions de règles
+            binaire = filtre.startswith("Règles binaires") or file_path.endswith(".regles")
+            if binaire and not file_path.endswith(".regles"):
+                file_path += ".regles"
+            if self.model.sauvegarder_regles(file_path, binaire=binaire, compresser="compressées" in filtre):
                 QMessageBox.information(self.view, "Sauvegarde", "Les règles ont été sauvegardées avec succès.")
             else:
                 QMessageBox.warning(self.view, "Erreur", "Une erreur est survenue lors de la sauvegarde.")
 
-    # Fonctions de qualité et validation (simulation)
+    def do_historique_executions(self):
+        executions = self.model.historique_executions()
+        texte = self.view.page_extraction_regles.text_edit
+        self.afficher_page(2)
+        if not executions:
+            texte.append("Aucune exécution enregistrée pour cette ontologie.")
+            return
+        texte.append("Exécutions enregistrées :")
+        texte.append(tableau_executions(executions))
+        choix = [f"n° {e['id']} : -minc {e['minc']:g} -minpca {e['minpca']:g}{' -const' if e['const'] else ''}, "
+                 f"{e['nb_regles']} règles ({e['statut']})" for e in executions]
+        element, ok = QInputDialog.getItem(self.view, "Historique des exécutions", "Charger les règles de l'exécution :", choix, 0, False)
+        if not ok:
+            return
+        execution = executions[choix.index(element)]
+        self.model.charger_execution(execution["id"])
+        self._rafraichir_regles()
+        texte.append(f"{len(self.model.regles)} règles chargées depuis l'exécution n° {execution['id']}.")
+
+    # Fonctions de qualité et validation
+    def _verifier_qualite(self):
+        if not self.model.ontologies:
+            QMessageBox.information(self.view, "Information", "Aucune ontologie n'a été chargée.")
+            return False
+        if not len(self.model.regles):
+            QMessageBox.information(self.view, "Information", "Aucune règle extraite.")
+            return False
+        return True
+
     def do_mesurer_qualite_regle(self):
+        if not self._verifier_qualite():
+            return
+        numero, ok = QInputDialog.getInt(self.view, "Mesurer la qualité", "Numéro de la règle :", 1, 1, len(self.model.regles))
+        if not ok:
+            return
+        try:
+            mesures = self.model.mesurer_qualite_regle(numero - 1)
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible de mesurer la qualité : {e}")
+            return
         self.view.page_qualite.text_edit.append("Mesure de qualité pour la règle sélectionnée :")
-        self.view.page_qualite.text_edit.append("Support : 0.65, Confiance : 0.80")
+        self.view.page_qualite.text_edit.append(self.model.regles.texte_regle(numero - 1))
+        self.view.page_qualite.text_edit.append(
+            f"Support : {mesures['positive_examples']}, Head coverage : {mesures['head_coverage']:.4f}, "
+            f"Confiance : {mesures['std_confidence']:.4f}, Confiance PCA : {mesures['pca_confidence']:.4f}"
+        )
+        self.afficher_page(3)
     
     def do_mesurer_qualite_regles(self):
-        self.view.page_qualite.text_edit.append("Mesure de qualité pour l'ensemble des règles :")
-        self.view.page_qualite.text_edit.append("Moyenne Support : 0.60, Moyenne Confiance : 0.78")
+        if not self._verifier_qualite():
+            return
+        try:
+            qualite = self.model.mesurer_qualite_regles()
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible de mesurer la qualité : {e}")
+            return
+        self.view.page_qualite.text_edit.append(f"Mesure de qualité pour l'ensemble des règles ({len(self.model.regles)}) :")
+        self.view.page_qualite.text_edit.append(
+            f"Moyenne Support : {qualite['positive_examples'].mean():.1f}, "
+            f"Moyenne Head coverage : {qualite['head_coverage'].mean():.4f}, "
+            f"Moyenne Confiance : {qualite['std_confidence'].mean():.4f}, "
+            f"Moyenne Confiance PCA : {qualite['pca_confidence'].mean():.4f}"
+        )
+        self.afficher_page(3)
     
     def do_valider_regle(self):
         self.view.page_qualite.text_edit.append("La règle a été validée avec succès.")
 
     # Fonction pour lancer AMIE3
-    def do_lancer_amie3(self):
+    def _preparer_entree(self):
         # Vérifier qu'une ontologie a été chargée
         if not self.model.ontologies:
             self.view.page_extraction_regles.text_edit.append("Aucune ontologie chargée. Veuillez charger une ontologie d'abord.")
-            return
+            return None
         
         # Récupérer le dernier fichier d'ontologie chargé (.owl)
         input_owl = self.model.ontologies[-1]
-        # Définir le chemin pour le fichier TTL
-        ttl_path = os.path.join(os.getcwd(), "ontology.ttl")
-        
-        self.view.page_extraction_regles.text_edit.append(f"Conversion de l'ontologie {input_owl} en Turtle...") # Faudra rajouter pour les fichiers nt et ttl sans conversion
-        if not convert_owl_to_ttl(input_owl, ttl_path):
-            self.view.page_extraction_regles.text_edit.append("La conversion de l'ontologie en TTL a échoué.")
+        self.model.filtre = self._configuration_filtre()
+        self.model.format_entree = self.view.combo_format_entree.currentData()
+        self.model.fusionner = self.view.checkbox_fusionner.isChecked()
+        etape = "Conversion et filtrage" if self.model.filtre else "Conversion"
+        if self.model.fusion_active():
+            self.view.page_extraction_regles.text_edit.append(f"Fusion des {len(self.model.ontologies)} ontologies chargées...")
+        else:
+            self.view.page_extraction_regles.text_edit.append(f"{etape} de l'ontologie {input_owl}...") # Faudra rajouter pour les fichiers nt et ttl sans conversion
+        ttl_path = self.model.preparer_entree_amie(input_owl)
+        if ttl_path is None:
+            if self.model.fusion_active() and self.model.entree_fusionnee is None:
+                echec = "La fusion des ontologies a échoué."
+            else:
+                format = "TSV" if self.model.format_entree[0] == "tsv" else ("N-Triples" if self.model.filtre else "Turtle")
+                echec = f"{etape} de l'ontologie vers {format} : échec."
+            self.view.page_extraction_regles.text_edit.append(echec)
+            return None
+        stats = self.model.stats_fusion
+        if self.model.fusion_active() and stats:
+            self.view.page_extraction_regles.text_edit.append(
+                f"Fusion : {stats['faits']} faits distincts sur {stats['lus']} lus ({stats['doublons']} doublons)"
+            )
+        cache = self.model.cache_conversion
+        etat = "réutilisée depuis le cache" if cache.dernier_hit else "convertie"
+        self.view.page_extraction_regles.text_edit.append(f"Ontologie {etat} en {cache.derniere_duree:.2f} s : {ttl_path}")
+        stats = cache.derniers_details
+        if self.model.filtre and stats:
+            self.view.page_extraction_regles.text_edit.append(
+                f"Filtrage : {stats['conserves']} triplets conservés sur {stats['lus']}, {stats['inferes']} inférés "
+                f"(exclus : {stats['exclus_espace']} par espace de noms, {stats['exclus_predicat']} par prédicat, "
+                f"{stats['exclus_type']} par type)"
+            )
+        self.view.page_extraction_regles.text_edit.append(cache.statistiques())
+
+        # Chemin du fichier amie3.jar
+        if not os.path.exists(self.model.chemin_jar_amie()):
+            self.view.page_extraction_regles.text_edit.append("Fichier amie3.5.1.jar introuvable.")
+            return None
+        return ttl_path
+
+    def _lire_timeout(self):
+        timeout_txt = self.view.lineedit_timeout.text().strip()
+        try:
+            return True, float(timeout_txt) if timeout_txt else None
+        except ValueError:
+            self.view.page_extraction_regles.text_edit.append(f"Délai invalide : {timeout_txt}")
+            return False, None
+
+    def do_lancer_amie3(self):
+        ok, timeout = self._lire_timeout()
+        if not ok:
             return
-        
-        
+        ttl_path = self._preparer_entree()
+        if ttl_path is None:
+            return
+
         # Récupérer les paramètres saisis par l'utilisateur
         minc = self.view.lineedit_minc.text().strip()
         minpca = self.view.lineedit_minpca.text().strip()
         nc = self.view.lineedit_nc.text().strip()
+        const = self.view.checkbox_const.isChecked()
 
-        # Chemin du fichier amie3.jar
-        jar_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "amie3.5.1.jar")
-        if not os.path.exists(jar_path):
-            self.view.page_extraction_regles.text_edit.append("Fichier amie3.5.1.jar introuvable.")
+        if self.view.checkbox_reutiliser.isChecked():
+            try:
+                precedente = self.model.chercher_execution(minc, minpca, const)
+            except ValueError:
+                precedente = None  # Valeurs non numériques : AMIE3 signalera l'erreur
+            if precedente is not None:
+                self.model.charger_execution(precedente["id"])
+                self._rafraichir_regles()
+                self.view.page_extraction_regles.text_edit.append(
+                    f"Configuration déjà minée (exécution n° {precedente['id']} en {precedente['duree']:.1f} s) : "
+                    f"{len(self.model.regles)} règles relues depuis l'historique, AMIE3 n'est pas relancé."
+                )
+                self.afficher_page(2)
+                return
+
+        self.execution = self.model.preparer_execution_amie(
+            ttl_path, minc, minpca, nc,
+            const=const,
+            timeout=timeout,
+            on_ligne=self._lignes_en_attente.append,
+            on_fin=self._signaux_execution.execution_terminee.emit
+        )
+        self._rafraichir_regles()
+        self.view.page_extraction_regles.text_edit.append("Lancement d'AMIE3...")
+        self.view.page_extraction_regles.text_edit.append("Journal d'AMIE3 (les règles s'ajoutent au tableau) :")
+        self.afficher_page(2)
+        if self.execution.demarrer():
+            self._activer_boutons_amie3(False)
+            self._minuteur_sortie.start()
+
+    def do_lancer_balayage(self):
+        ok, timeout = self._lire_timeout()
+        if not ok:
             return
-        
-        # Construire la commande
-        command = [
-            "java", "-jar", jar_path,
-            "-minc", minc,
-            "-minpca", minpca,
-            "-nc", nc,
-            ttl_path
-        ]
-        
-        if self.view.checkbox_const.isChecked():
-            command.insert(3, "-const")
+        try:
+            valeurs_minc = [str(float(v)) for v in lire_valeurs(self.view.lineedit_minc.text())]
+            valeurs_minpca = [str(float(v)) for v in lire_valeurs(self.view.lineedit_minpca.text())]
+            nb_coeurs = int(self.view.lineedit_nc.text().strip() or 0) or None
+            paralleles = int(self.view.lineedit_paralleles.text().strip() or 0) or None
+        except ValueError:
+            self.view.page_extraction_regles.text_edit.append("Paramètres de balayage invalides : les valeurs doivent être numériques.")
+            return
+        if not valeurs_minc or not valeurs_minpca:
+            self.view.page_extraction_regles.text_edit.append("Indiquez au moins une valeur pour -minc et pour -minpca.")
+            return
+        valeurs_const = (False, True) if self.view.checkbox_balayer_const.isChecked() else (self.view.checkbox_const.isChecked(),)
+        ttl_path = self._preparer_entree()
+        if ttl_path is None:
+            return
+
+        self.balayage = self.model.preparer_balayage(
+            ttl_path, grille_parametres(valeurs_minc, valeurs_minpca, valeurs_const),
+            nb_coeurs=nb_coeurs, max_paralleles=paralleles, timeout=timeout,
+            on_resultat=self._signaux_execution.configuration_terminee.emit,
+            on_fin=self._signaux_execution.balayage_termine.emit
+        )
+        self.view.page_extraction_regles.text_edit.append(
+            f"Balayage de {len(self.balayage.resultats)} configurations : {self.balayage.paralleles} exécutions simultanées, "
+            f"-nc {self.balayage.nc} chacune..."
+        )
+        self.afficher_page(2)
+        self._activer_boutons_amie3(False)
+        self._nb_configurations_recues = 0
+        self.balayage.demarrer()
+
+    def _activer_boutons_amie3(self, actif):
+        self.view.btn_lancer_amie3.setEnabled(actif)
+        self.view.btn_balayage_amie3.setEnabled(actif)
+        self.view.btn_annuler_amie3.setEnabled(not actif)
+
+    def _configuration_filtre(self):
+        if not self.view.checkbox_filtrage.isChecked():
+            return None
+        return ConfigurationFiltre(
+            espaces_exclus=lire_liste(self.view.lineedit_espaces_exclus.text()),
+            predicats_exclus=lire_liste(self.view.lineedit_predicats_exclus.text()),
+            types_exclus=lire_liste(self.view.lineedit_types_exclus.text()),
+            materialiser_rdfs=self.view.checkbox_rdfs.isChecked()
+        )
+
+    def do_annuler_amie3(self):
+        if self.execution and self.execution.en_cours:
+            self.execution.annuler()
+        if self.balayage and self.balayage.en_cours:
+            self.balayage.annuler()
+
+    def _vider_sortie_amie(self):
+        if not self._lignes_en_attente:
+            return
+        lignes = []
+        while self._lignes_en_attente:
+            lignes.append(self._lignes_en_attente.popleft())
+        self.model.analyser_sortie_amie(lignes)
+        self.model.recherche.synchroniser_regles(self.model.regles)
+        # Les règles vont dans le tableau ; seul le journal d'AMIE est ajouté au texte
+        journal = [ligne for ligne in lignes if "=>" not in ligne]
+        with self.model.trace.mesurer("affichage") as etape:
+            if journal:
+                self.view.page_extraction_regles.text_edit.append("\n".join(journal))
+            etape.compteurs["lignes"] = etape.compteurs.get("lignes", 0) + len(lignes)
+        self._rafraichir_regles()
+
+    def _fin_amie3(self, execution):
+        self._minuteur_sortie.stop()
+        self._vider_sortie_amie()
+        self._activer_boutons_amie3(True)
+        texte = self.view.page_extraction_regles.text_edit
+        texte.append(f"{len(self.model.regles)} règles analysées.")
+        self.model.tracer_execution_amie(execution)
+        if execution.statut != ExecutionAmie.ANNULE:
+            numero = self.model.enregistrer_execution(execution)
+            if numero is not None:
+                texte.append(f"Exécution enregistrée dans l'historique (n° {numero}).")
+        self._terminer_trace()
+        if execution.statut == ExecutionAmie.TERMINE:
+            texte.append(f"AMIE3 terminé en {execution.duree:.1f} s.")
+        elif execution.statut == ExecutionAmie.ANNULE:
+            texte.append(f"Exécution d'AMIE3 arrêtée après {execution.duree:.1f} s, {len(execution.lignes)} lignes conservées.")
+        elif execution.statut == ExecutionAmie.EXPIRE:
+            texte.append(f"L'exécution d'AMIE3 a dépassé le temps imparti ({execution.timeout:g} s), {len(execution.lignes)} lignes conservées.")
+        else:
+            texte.append(f"Erreur lors du lancement d'AMIE3: {execution.erreur}")
+
+    def _fin_configuration(self, resultat):
+        self._nb_configurations_recues += 1
+        etat = "réutilisée" if resultat.reutilise else resultat.statut
+        message = (f"[{self._nb_configurations_recues}/{len(self.balayage.resultats)}] -minc {resultat.minc} -minpca {resultat.minpca}"
+                   f"{' -const' if resultat.const else ''} : {etat}, {len(resultat.regles or ())} règles")
+        if resultat.erreur:
+            message += f" ({resultat.erreur})"
+        self.view.page_extraction_regles.text_edit.append(message)
+
+    def _fin_balayage(self, balayage):
+        self._activer_boutons_amie3(True)
+        texte = self.view.page_extraction_regles.text_edit
+        texte.append(f"Balayage terminé en {balayage.duree:.1f} s :")
+        texte.append(balayage.tableau())
+        self.model.trace.ajouter("balayage", balayage.duree or 0.0, configurations=len(balayage.resultats))
+        self._terminer_trace()
+        meilleur = balayage.meilleur()
+        if meilleur is not None:
+            # Les règles de la meilleure configuration deviennent les règles courantes
+            self.model.regles = meilleur.regles
+            self.model.sortie_amie = meilleur.lignes
+            self._rafraichir_regles()
+            texte.append(f"Règles retenues : -minc {meilleur.minc} -minpca {meilleur.minpca}"
+                         f"{' -const' if meilleur.const else ''} (meilleure confiance PCA moyenne)")
+
+    # Performances
+    def _terminer_trace(self):
+        trace = self.model.terminer_trace()
+        if trace.chemin:
+            self.view.page_extraction_regles.text_edit.append(f"Trace des performances : {trace.chemin}")
+        self._afficher_trace(trace)
+
+    def do_performances(self):
+        self.afficher_page(7)
+        self._afficher_trace(self.model.derniere_trace or self.model.trace)
+
+    def do_ouvrir_trace(self):
+        file_path, _ = QFileDialog.getOpenFileName(self.view, "Ouvrir une trace", "", "Traces JSON (*.json);;Tous les fichiers (*)")
+        if not file_path:
+            return
+        try:
+            self._afficher_trace(TraceExecution.charger(file_path))
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible de lire la trace : {e}")
+
+    def _afficher_trace(self, trace):
+        page = self.view.page_performances
+        table = page.table_etapes
+        if trace is None or not len(trace):
+            page.label_trace.setText("Aucune étape mesurée.")
+            table.setRowCount(0)
+            return
+        infos = ", ".join(f"{k} : {v}" for k, v in trace.infos.items() if v is not None)
+        page.label_trace.setText(f"Trace du {trace.debut} — {trace.duree_totale():.2f} s au total"
+                                 + (f" ({infos})" if infos else "") + (f"\n{trace.chemin}" if trace.chemin else ""))
+        lignes = trace.lignes()
+        table.setRowCount(len(lignes))
+        for ligne, (nom, duree, part, cpu, memoire, details) in enumerate(lignes):
+            valeurs = [nom, f"{duree:.3f}", f"{part:.1f}", "-" if cpu is None else f"{cpu:.3f}",
+                       "-" if memoire is None else f"{memoire:.1f}", details]
+            for colonne, valeur in enumerate(valeurs):
+                table.setItem(ligne, colonne, QTableWidgetItem(valeur))
+        table.resizeColumnsToContents()
+
+    # Comparaison
+    def do_comparer_resultats(self):
+        self.afficher_page(5)
+        executions = self.model.historique_executions(toutes=True)
+        texte = self.view.page_comparaison.text_edit
+        if not executions:
+            texte.append("Aucune exécution enregistrée.")
+            return
+        texte.append(f"Exécutions enregistrées ({self.model.stockage.path}) :")
+        texte.append(tableau_executions(executions))
+
+    def _afficher_ensembles(self):
+        ensembles = self.model.ensembles_comparaison
+        label = self.view.page_comparaison.label_ensembles
+        if not ensembles:
+            label.setText("Aucun ensemble de règles sélectionné.")
+            return
+        label.setText("\n".join(f"{k + 1}. {nom} : {len(table)} règles{' (référence)' if k == 0 else ''}"
+                                for k, (nom, table, _) in enumerate(ensembles)))
+
+    def do_ajouter_fichier_comparaison(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self.view, "Ajouter un ensemble de règles", "", "Text Files (*.txt);;Règles binaires (*.regles);;Tous les fichiers (*)"
+        )
+        if not file_path:
+            return
+        if self.model.ajouter_fichier_comparaison(file_path) is None:
+            QMessageBox.warning(self.view, "Erreur", "Le fichier sélectionné n'a pas pu être lu.")
+        self._afficher_ensembles()
+
+    def do_ajouter_execution_comparaison(self):
+        executions = self.model.historique_executions(toutes=True)
+        if not executions:
+            QMessageBox.information(self.view, "Information", "Aucune exécution enregistrée.")
+            return
+        choix = [f"n° {e['id']} : -minc {e['minc']:g} -minpca {e['minpca']:g}{' -const' if e['const'] else ''}, "
+                 f"{e['nb_regles']} règles ({os.path.basename(e['ontologie'] or '')})" for e in executions]
+        element, ok = QInputDialog.getItem(self.view, "Comparaison", "Exécution à comparer :", choix, 0, False)
+        if ok:
+            self.model.ajouter_execution_comparaison(executions[choix.index(element)])
+            self._afficher_ensembles()
 
+    def do_ajouter_regles_courantes(self):
+        if not len(self.model.regles):
+            QMessageBox.information(self.view, "Information", "Aucune règle extraite.")
+            return
+        self.model.ajouter_ensemble_comparaison(f"règles courantes ({len(self.model.ensembles_comparaison) + 1})", self.model.regles)
+        self._afficher_ensembles()
+
+    def do_lancer_comparaison(self):
+        if len(self.model.ensembles_comparaison) < 2:
+            QMessageBox.information(self.view, "Information", "Sélectionnez au moins deux ensembles de règles.")
+            return
+        comparaison = self.model.comparer_ensembles()
+        self.view.page_comparaison.text_edit.append(comparaison.rapport())
+
+    def do_vider_comparaison(self):
+        self.model.ensembles_comparaison = []
+        self._afficher_ensembles()
+
+    # Interrogation des données
+    def do_executer_requete(self):
+        page = self.view.page_analyse
+        requete = page.editeur_requete.toPlainText().strip()
+        if not requete:
+            return
         try:
-            self.view.page_extraction_regles.text_edit.append("Lancement d'AMIE3...")
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=os.getcwd(), universal_newlines=True)
-            stdout, stderr = process.communicate(timeout=120)
-            output = stdout
+            resultat = self.model.interroger(requete)
+        except ValueError as e:
+            QMessageBox.warning(self.view, "Requête", str(e))
+            return
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible d'interroger l'ontologie : {e}")
+            return
+        self.resultat_requete = resultat
+        etat = "résultat en cache" if self.model.requetes.dernier_hit else f"{resultat.duree * 1000:.1f} ms"
+        page.text_edit.append(f"{len(resultat)} résultats ({etat})")
+        self._afficher_page_requete(0)
 
-            self.view.page_extraction_regles.text_edit.append("Résultats d'AMIE3 :")
-            self.view.page_extraction_regles.text_edit.append(output)
-            self.afficher_page(2)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            self.view.page_extraction_regles.text_edit.append("L'exécution d'AMIE3 a dépassé le temps imparti.")
+    def _afficher_page_requete(self, numero):
+        resultat = self.resultat_requete
+        if resultat is None:
+            return
+        page = self.view.page_analyse
+        numero = max(0, min(numero, resultat.nb_pages(TAILLE_PAGE_REQUETE) - 1))
+        self._page_requete = numero
+        lignes = resultat.page(numero, TAILLE_PAGE_REQUETE)
+        table = page.table_resultats
+        table.clear()
+        table.setColumnCount(len(resultat.variables))
+        table.setHorizontalHeaderLabels(resultat.variables)
+        table.setRowCount(len(lignes))
+        for i, ligne in enumerate(lignes):
+            for j, terme in enumerate(ligne):
+                table.setItem(i, j, QTableWidgetItem(abreger_iri(terme)))
+        table.resizeColumnsToContents()
+        debut = numero * TAILLE_PAGE_REQUETE
+        page.label_page.setText(f"Lignes {debut + 1 if lignes else 0}–{debut + len(lignes)} sur {len(resultat)}")
+        page.btn_page_precedente.setEnabled(numero > 0)
+        page.btn_page_suivante.setEnabled(numero < resultat.nb_pages(TAILLE_PAGE_REQUETE) - 1)
+
+    def do_marquer_donnees(self):
+        self.afficher_page(4)
+        self.view.page_analyse.editeur_faits.setFocus()
+
+    def _modifier_faits(self, exclure):
+        page = self.view.page_analyse
+        texte = page.editeur_faits.toPlainText()
+        if not texte.strip():
+            return
+        try:
+            rapport = self.model.modifier_faits(texte, exclure=exclure)
+        except ValueError as e:
+            QMessageBox.warning(self.view, "Faits", str(e))
+            return
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible de modifier les données : {e}")
+            return
+        regles = self.model.regles
+        changees = rapport["changees"]
+        page.text_edit.append(
+            f"{rapport['faits_ajoutes']} faits ajoutés, {rapport['faits_retires']} exclus : "
+            f"{len(rapport['mises_a_jour'])} règles mises à jour sur {len(regles)} en {rapport['duree'] * 1000:.1f} ms, "
+            f"{len(changees)} modifiées"
+        )
+        # Les plus fortes variations de confiance PCA d'abord
+        pca, hc = self.model.qualite["pca_confidence"], self.model.qualite["head_coverage"]
+        avant = rapport["avant"]
+        ordre = sorted(range(len(changees)), key=lambda k: -abs(pca[changees[k]] - avant["pca_confidence"][k]))[:20]
+        for k in ordre:
+            i = int(changees[k])
+            page.text_edit.append(f"  PCA {avant['pca_confidence'][k]:.4f} → {pca[i]:.4f}, HC {avant['head_coverage'][k]:.4f} → {hc[i]:.4f}  "
+                                  f"{regles.texte_regle(i)}")
+        if len(changees) > 20:
+            page.text_edit.append(f"  ... et {len(changees) - 20} autres")
+        # Les résultats affichés d'une requête ne correspondent plus aux données
+        if self.resultat_requete is not None and page.editeur_requete.toPlainText().strip():
+            self.do_executer_requete()
+
+    def do_retablir_donnees(self):
+        self.model.retablir_donnees()
+        self.view.page_analyse.text_edit.append("Données d'origine rétablies (faits ajoutés et exclusions oubliés).")
+
+    def do_tester_hypothese(self):
+        self.afficher_page(4)
+        if not self.model.ontologies:
+            QMessageBox.information(self.view, "Information", "Aucune ontologie n'a été chargée.")
+            return
+        texte, ok = QInputDialog.getText(
+            self.view, "Tester une hypothèse", "Règle (format AMIE, ex. ?a  llc:aPourMaladie  ?b   => ?a  rdf:type  llc:UPNPatient) :"
+        )
+        if not ok or not texte.strip():
+            return
+        try:
+            mesures = self.model.tester_hypothese(texte.strip())
+        except Exception as e:
+            QMessageBox.warning(self.view, "Erreur", f"Impossible d'évaluer l'hypothèse : {e}")
+            return
+        self.view.page_analyse.text_edit.append(f"Hypothèse : {texte.strip()}")
+        self.view.page_analyse.text_edit.append(
+            f"Support : {mesures['positive_examples']}, Head coverage : {mesures['head_coverage']:.4f}, "
+            f"Confiance : {mesures['std_confidence']:.4f}, Confiance PCA : {mesures['pca_confidence']:.4f}"
+        )
+
+    # Recherche
+    def do_rechercher(self):
+        self._minuteur_recherche.stop()
+        requete = self.view.lineedit_recherche.text().strip()
+        liste = self.view.page_recherche.liste_resultats
+        liste.clear()
+        if not requete:
+            return
+        try:
+            resultats = self.model.rechercher(requete)
         except Exception as e:
-            self.view.page_extraction_regles.text_edit.append(f"Erreur lors du lancement d'AMIE3: {e}")
+            liste.addItem(f"Erreur lors de la recherche : {e}")
+            return
+        regles = self.model.regles
+        for genre, i, score in resultats:
+            if genre == "règle":
+                texte = f"Règle {i + 1} (PCA {regles.colonne('pca_confidence')[i]:.3f}) : {regles.texte_regle(i)}"
+            else:
+                iri, type_entite, libelle = self.model.recherche.entites[i]
+                texte = f"{type_entite.capitalize()} : {libelle or nom_local(iri)} <{iri}>"
+            item = QListWidgetItem(texte)
+            item.setData(Qt.UserRole, (genre, i))
+            liste.addItem(item)
+        if not resultats:
+            liste.addItem(f"Aucun résultat pour « {requete} ».")
+        self.view.page_recherche.label.setText(f"Page : Recherche ({len(resultats)} résultats pour « {requete} »)")
+        self.afficher_page(6)
+
+    def do_ouvrir_resultat(self, item):
+        donnees = item.data(Qt.UserRole)
+        if not donnees:
+            return
+        genre, i = donnees
+        if genre == "règle" and i < len(self.model.regles):
+            page = self.view.page_extraction_regles
+            self._rafraichir_regles()
+            ligne = page.modele_regles.ligne(i)
+            if ligne < 0:
+                # Règle masquée par les filtres du tableau
+                page.text_edit.append(f"Règle {i + 1} : {self.model.regles.regle(i)}")
+            else:
+                page.table_regles.selectRow(ligne)
+                page.table_regles.scrollTo(page.modele_regles.index(ligne, 0))
+            self.afficher_page(2)
 
     # Navigation entre pages
     def afficher_page(self, index):
@@ -487,7 +1410,7 @@ class RuleExtractionController:
     def zoom_in(self):
         current_page = self.view.stacked_widget.currentWidget()
         if current_page:
-            for child in current_page.findChildren(QTextEdit):
+            for child in current_page.findChildren((QTextEdit, QPlainTextEdit)):
                 font = child.font()
                 font.setPointSize(font.pointSize() + 1)
                 child.setFont(font)
@@ -495,7 +1418,7 @@ class RuleExtractionController:
     def zoom_out(self):
         current_page = self.view.stacked_widget.currentWidget()
         if current_page:
-            for child in current_page.findChildren(QTextEdit):
+            for child in current_page.findChildren((QTextEdit, QPlainTextEdit)):
                 font = child.font()
                 new_size = max(1, font.pointSize() - 1)
                 font.setPointSize(new_size)
@@ -504,7 +1427,7 @@ class RuleExtractionController:
     def reset_view(self):
         current_page = self.view.stacked_widget.currentWidget()
         if current_page:
-            for child in current_page.findChildren(QTextEdit):
+            for child in current_page.findChildren((QTextEdit, QPlainTextEdit)):
                 font = child.font()
                 font.setPointSize(10)
                 child.setFont(font)
@@ -0,0 +1,455 @@
+import os
+import hashlib
+
+from conversion import ConversionCache, convertir_en_tsv, DictionnaireTermes
+from execution_amie import ExecutionAmie, ArchiveClasses, construire_commande
+from balayage import BalayageAmie, ResultatConfiguration
+from stockage import StockageExecutions
+from comparaison import ComparaisonRegles, charger_ensemble, empreintes_table
+from recherche import IndexRecherche
+from requetes import ServiceRequetes
+from regles_amie import TableRegles, ParseurAmie, lire_sortie_amie
+from index_triplets import IndexTriplets
+from qualite import EvaluateurQualite
+from qualite_incrementale import QualiteIncrementale, lire_faits
+from fichier_indexe import FichierIndexe
+from filtrage import filtrer_fichier, PREFIXES_CONNUS
+from fusion import fusionner_fichiers
+from traces import TraceExecution, tracer_execution_amie
+from regles_binaires import EXTENSION_BINAIRE, est_fichier_binaire, ecrire_regles_binaire, charger_regles_binaire
+from elagage import elaguer_regles
+
+# Aucune dépendance à Qt : le modèle sert aussi à l'outil en ligne de commande (extracteur_cli.py).
+# rdflib n'est chargé que par les étapes qui lisent l'ontologie (conversion, filtrage, index).
+
+# <-------------------------->
+# Modèle
+# <-------------------------->
+class RuleExtractionModel:
+    def __init__(self, historique=True):
+        self.ontologies = []  # Liste des chemins vers les ontologies chargées
+        self.regles = TableRegles()  # Règles extraites, stockées en colonnes
+        self.parseur_amie = ParseurAmie(self.regles)
+        self.cache_conversion = ConversionCache()  # Ontologies déjà converties, par empreinte de contenu
+        self.sortie_amie = []  # Lignes produites par la dernière exécution d'AMIE3 (même partielle)
+        self.index_triplets = None  # Triplets de la dernière ontologie, encodés en entiers
+        self._empreinte_index = None
+        self.requetes = ServiceRequetes()  # Requêtes sur l'index des triplets, avec leurs résultats en cache
+        self.qualite = None  # Métriques recalculées pour self.regles
+        self.elagage = None  # Dernier élagage des règles redondantes (motif de chaque règle écartée)
+        self.qualite_incrementale = None  # Métriques tenues à jour quand des faits sont ajoutés ou exclus
+        self.fichiers_indexes = {}  # Chemin -> FichierIndexe, pour la visualisation
+        self.filtre = None  # ConfigurationFiltre appliquée avant le minage (None = pas de filtrage)
+        self.filtre_entree = None  # Filtre de la dernière entrée préparée pour AMIE, suivi par l'index des triplets
+        self.format_entree = ("turtle", None)  # Format du fichier donné à AMIE et compactage des IRIs
+        self.dictionnaire_termes = None  # Décodage des jetons de l'entrée TSV compactée
+        self.cle_entree = None  # Identifie le contenu du dernier fichier préparé pour AMIE
+        self.resultats_balayage = {}  # cle_entree -> {(minc, minpca, const): ResultatConfiguration}
+        self.empreinte_ontologie = None
+        self._parametres_execution = None
+        self.ensembles_comparaison = []  # (nom, TableRegles, empreintes canoniques) à comparer
+        self.recherche = IndexRecherche()  # Index inversé des règles et des entités de l'ontologie
+        self._empreinte_recherche = None
+        self.fusionner = False  # Miner l'union de toutes les ontologies chargées plutôt que la dernière
+        self.entree_fusionnee = None  # Union des ontologies (N-Triples), produite par fusionner_ontologies
+        self.stats_fusion = {}
+        self._empreinte_fusion = None
+        self.jar_amie = None  # Chemin de amie3.5.1.jar (None = à côté des sources)
+        self.trace = TraceExecution()  # Mesures des étapes depuis la dernière trace enregistrée
+        self.derniere_trace = None
+        self.stockage = None  # Historique des exécutions et de leurs règles
+        if historique:
+            try:
+                self.stockage = StockageExecutions()
+            except Exception as e:
+                print(f"Historique des exécutions indisponible : {e}")
+    
+    def charger_ontologie(self, path):
+        if os.path.exists(path):
+            with self.trace.mesurer("chargement") as etape:
+                self.ontologies.append(path)
+                etape.compteurs["ontologies"] = len(self.ontologies)
+                etape.compteurs["octets"] = etape.compteurs.get("octets", 0) + os.path.getsize(path)
+            return True
+        return False
+
+    # Traces de performance
+    def terminer_trace(self, chemin=None):
+        # Enregistre la trace courante (dans le cache, sauf chemin donné) et en commence une nouvelle
+        trace = self.trace
+        trace.infos.setdefault("ontologie", self.nom_entree())
+        trace.infos.setdefault("format_entree", list(self.format_entree))
+        trace.infos.setdefault("filtrage", self.filtre is not None)
+        if self._parametres_execution:
+            minc, minpca, const, nc = self._parametres_execution
+            trace.infos.setdefault("amie", {"minc": minc, "minpca": minpca, "const": const, "nc": nc})
+        try:
+            trace.sauvegarder(chemin)
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement de la trace : {e}")
+        self.derniere_trace = trace
+        self.trace = TraceExecution()
+        return trace
+    
+    def convertir_ontologie(self, path, format='turtle'):
+        # Conversion OWL -> format d'entrée d'AMIE, réutilisée tant que le fichier source ne change pas
+        return self.cache_conversion.convertir(path, format=format)
+
+    def fusion_active(self):
+        return self.fusionner and len(self.ontologies) > 1
+
+    def fusionner_ontologies(self):
+        # Union sans doublon des ontologies chargées, en N-Triples, mise en cache sous l'empreinte
+        # de la liste des sources (l'ordre compte : il fixe celui des triplets)
+        cache = self.cache_conversion
+        sources = list(self.ontologies)
+        empreinte = hashlib.sha256("|".join(cache.empreinte_source(p) for p in sources).encode("utf-8")).hexdigest()
+        if empreinte == self._empreinte_fusion and self.entree_fusionnee and os.path.exists(self.entree_fusionnee):
+            return self.entree_fusionnee, empreinte
+        with self.trace.mesurer("fusion") as etape:
+            chemin = cache.convertir(
+                sources[0], format='nt', convertisseur=lambda src, dst: fusionner_fichiers(sources, dst),
+                variante="fusion", empreinte=empreinte
+            )
+            self.stats_fusion = cache.derniers_details if chemin else {}
+            etape.compteurs.update(self.stats_fusion, cache=cache.dernier_hit)
+        self.entree_fusionnee = chemin
+        self._empreinte_fusion = empreinte if chemin else None
+        return chemin, empreinte
+
+    def source_ontologie(self):
+        # (chemin, empreinte) de l'ontologie minée, avant filtrage : l'union des ontologies ou la dernière chargée
+        if self.fusion_active():
+            return self.fusionner_ontologies()
+        path = self.ontologies[-1]
+        return path, self.cache_conversion.empreinte_source(path)
+
+    def preparer_entree_amie(self, path):
+        # Fichier donné à AMIE : l'ontologie convertie, éventuellement filtrée (les deux sont mis en cache)
+        format, mode = self.format_entree
+        filtre = self.filtre
+        self.filtre_entree = filtre
+        self.dictionnaire_termes = None
+        if self.fusion_active():
+            path, empreinte = self.fusionner_ontologies()
+            if path is None:
+                return None
+            self.empreinte_ontologie = empreinte
+            if format == 'turtle' and filtre is None:
+                # AMIE lit directement l'union en N-Triples
+                self.cle_entree = self.cache_conversion.cle(empreinte, 'nt', "fusion")
+                return path
+        else:
+            empreinte = self.cache_conversion.empreinte_source(path)
+        self.empreinte_ontologie = empreinte
+        cache = self.cache_conversion
+        with self.trace.mesurer("filtrage" if filtre else "conversion") as etape:
+            chemin = self._convertir_entree(path, empreinte, format, mode, filtre)
+            etape.compteurs.update(cache.derniers_details if chemin else {}, format=format, cache=cache.dernier_hit)
+            if chemin:
+                etape.compteurs["octets"] = os.path.getsize(chemin)
+        return chemin
+
+    def _convertir_entree(self, path, empreinte, format, mode, filtre):
+        if format == 'turtle' and filtre is None:
+            self.cle_entree = self.cache_conversion.cle(empreinte, format)
+            return self.cache_conversion.convertir(path, format=format, empreinte=empreinte)
+        format = 'tsv' if format == 'tsv' else 'nt'
+        if filtre is None:
+            convertisseur = lambda src, dst: convertir_en_tsv(src, dst, mode)
+        else:
+            convertisseur = lambda src, dst: filtrer_fichier(src, dst, filtre, format, mode)
+        variante = f"{mode}|{filtre.signature() if filtre else ''}"
+        self.cle_entree = self.cache_conversion.cle(empreinte, format, variante)
+        chemin = self.cache_conversion.convertir(
+            path, format=format, convertisseur=convertisseur, variante=variante, empreinte=empreinte
+        )
+        if chemin and format == 'tsv' and mode:
+            self.dictionnaire_termes = DictionnaireTermes(chemin + ".dict")
+        return chemin
+
+    def chemin_jar_amie(self):
+        if self.jar_amie:
+            return self.jar_amie
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "amie3.5.1.jar")
+
+    def preparer_execution_amie(self, input_path, minc, minpca, nc, const=False, timeout=None, on_ligne=None, on_fin=None):
+        archive = ArchiveClasses(self.chemin_jar_amie())
+        commande = construire_commande(self.chemin_jar_amie(), input_path, minc, minpca, nc, const=const,
+                                       options_jvm=archive.options_jvm())
+        execution = ExecutionAmie(commande, cwd=os.getcwd(), timeout=timeout, on_ligne=on_ligne, on_fin=on_fin,
+                                  archive_classes=archive)
+        self._parametres_execution = (minc, minpca, const, nc)
+        # La liste est partagée avec l'exécution : les résultats partiels restent accessibles
+        self.sortie_amie = execution.lignes
+        # Avec une entrée TSV compactée, les règles sont décodées au fil de l'analyse
+        self.regles = self.nouvelle_table_regles()
+        self.parseur_amie = ParseurAmie(self.regles)
+        return execution
+
+    def nouvelle_table_regles(self):
+        table = TableRegles()
+        if self.dictionnaire_termes is not None:
+            table.decodeur = self.dictionnaire_termes.decoder
+            table.prefixes.update(self.dictionnaire_termes.prefixes)
+        return table
+
+    def preparer_balayage(self, input_path, configurations, nb_coeurs=None, max_paralleles=None, timeout=None,
+                          on_resultat=None, on_fin=None, reutiliser=True):
+        # Les configurations déjà terminées sur la même entrée (ontologie, format, filtre) ne sont pas relancées
+        termines = self.resultats_balayage.setdefault(self.cle_entree or os.path.abspath(input_path), {})
+        if not reutiliser:
+            termines.clear()
+        for minc, minpca, const in configurations:
+            if reutiliser and (minc, minpca, const) not in termines:
+                resultat = self.resultat_enregistre(minc, minpca, const)
+                if resultat is not None:
+                    termines[resultat.cle] = resultat
+
+        def enregistrer(resultat):
+            if resultat.statut == ExecutionAmie.TERMINE:
+                termines[resultat.cle] = resultat
+            if not resultat.reutilise and resultat.statut != ExecutionAmie.ANNULE:
+                self._enregistrer(resultat.regles, resultat.minc, resultat.minpca, resultat.const, resultat.nc, resultat.commande,
+                                  resultat.statut, resultat.duree, resultat.stats, resultat.lignes)
+            if on_resultat:
+                on_resultat(resultat)
+
+        return BalayageAmie(
+            self.chemin_jar_amie(), input_path, configurations, nb_coeurs=nb_coeurs, max_paralleles=max_paralleles,
+            timeout=timeout, termines=dict(termines) if reutiliser else None, nouvelle_table=self.nouvelle_table_regles,
+            on_resultat=enregistrer, on_fin=on_fin
+        )
+
+    def analyser_sortie_amie(self, lignes):
+        # Range les nouvelles règles dans la table ; renvoie les indices des règles ajoutées
+        with self.trace.mesurer("analyse_regles") as etape:
+            ajoutees = self.parseur_amie.alimenter_lignes(lignes)
+            etape.compteurs["regles"] = len(self.regles)
+        return ajoutees
+
+    def tracer_execution_amie(self, execution):
+        tracer_execution_amie(self.trace, execution, self.parseur_amie.stats)
+
+    def elaguer_regles(self, mesure="pca_confidence"):
+        # Remplace les règles courantes par les règles non redondantes (l'historique garde la sortie complète)
+        with self.trace.mesurer("elagage", regles=len(self.regles)) as etape:
+            self.elagage = elaguer_regles(self.regles, mesure)
+            self.regles = self.elagage.table_reduite()
+            etape.compteurs["conservees"] = len(self.regles)
+        self.qualite = None
+        return self.elagage
+
+    # Historique des exécutions
+    def _enregistrer(self, regles, minc, minpca, const, nc, commande, statut, duree, stats, lignes):
+        if self.stockage is None or self.cle_entree is None:
+            return None
+        try:
+            return self.stockage.enregistrer(
+                regles, self.empreinte_ontologie, self.cle_entree, minc, minpca, const, nc, commande=commande,
+                statut=statut, duree=duree, stats=stats, lignes=lignes,
+                ontologie=self.nom_entree()
+            )
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement de l'exécution : {e}")
+            return None
+
+    def nom_entree(self):
+        if self.fusion_active():
+            return " + ".join(self.ontologies)
+        return self.ontologies[-1] if self.ontologies else None
+
+    def enregistrer_execution(self, execution):
+        minc, minpca, const, nc = self._parametres_execution
+        return self._enregistrer(self.regles, minc, minpca, const, nc, execution.commande, execution.statut,
+                                 execution.duree, self.parseur_amie.stats, execution.lignes)
+
+    def chercher_execution(self, minc, minpca, const=False):
+        # Dernière exécution terminée de cette configuration sur l'entrée préparée, ou None
+        if self.stockage is None or self.cle_entree is None:
+            return None
+        return self.stockage.chercher(self.cle_entree, minc, minpca, const)
+
+    def charger_execution(self, execution_id):
+        # Les règles et la sortie d'une exécution passée deviennent les règles courantes
+        regles = self.stockage.charger_regles(execution_id)
+        if regles is None:
+            return None
+        self.regles = regles
+        self.parseur_amie = ParseurAmie(self.regles)
+        self.sortie_amie = self.stockage.sortie(execution_id)
+        return self.regles
+
+    def resultat_enregistre(self, minc, minpca, const=False):
+        execution = self.chercher_execution(minc, minpca, const)
+        if execution is None:
+            return None
+        resultat = ResultatConfiguration(minc, minpca, const)
+        resultat.nc = execution["nc"]
+        resultat.statut = execution["statut"]
+        resultat.duree = execution["duree"]
+        resultat.regles = self.stockage.charger_regles(execution["id"])
+        resultat.lignes = self.stockage.sortie(execution["id"])
+        return resultat
+
+    def historique_executions(self, toutes=False):
+        if self.stockage is None:
+            return []
+        empreinte = None
+        if not toutes and self.ontologies:
+            empreinte = self.source_ontologie()[1]
+        return self.stockage.executions(empreinte)
+
+    # Comparaison d'ensembles de règles
+    def ajouter_ensemble_comparaison(self, nom, table):
+        # Les empreintes sont calculées à l'ajout, une fois par ensemble
+        self.ensembles_comparaison.append((nom, table, empreintes_table(table)))
+
+    def ajouter_fichier_comparaison(self, path):
+        try:
+            table = charger_ensemble(path)
+        except Exception as e:
+            print(f"Erreur lors de la lecture des règles : {e}")
+            return None
+        self.ajouter_ensemble_comparaison(os.path.basename(path), table)
+        return table
+
+    def ajouter_execution_comparaison(self, execution):
+        table = self.stockage.charger_regles(execution["id"])
+        if table is not None:
+            self.ajouter_ensemble_comparaison(
+                f"exécution n° {execution['id']} (-minc {execution['minc']:g} -minpca {execution['minpca']:g}"
+                f"{' -const' if execution['const'] else ''})", table
+            )
+        return table
+
+    def comparer_ensembles(self):
+        return ComparaisonRegles([(nom, table) for nom, table, _ in self.ensembles_comparaison],
+                                 [h for _, _, h in self.ensembles_comparaison])
+
+    # Recherche
+    def rechercher(self, requete, limite=100):
+        # Les nouvelles règles et une ontologie qui a changé sont indexées avant de répondre
+        self.recherche.synchroniser_regles(self.regles)
+        if self.ontologies:
+            path, empreinte = self.source_ontologie()
+            if path is not None and empreinte != self._empreinte_recherche:
+                try:
+                    self.recherche.indexer_ontologie(path)
+                except Exception as e:
+                    print(f"Erreur lors de l'indexation de l'ontologie : {e}")
+                self._empreinte_recherche = empreinte
+        return self.recherche.rechercher(requete, limite)
+
+    def extraire_regles(self, path):
+        # Lecture d'une sortie d'AMIE sauvegardée (ex. regles_extraites.txt), ou d'un fichier binaire
+        # de règles (projeté en mémoire : les colonnes ne sont lues qu'à la demande)
+        try:
+            with self.trace.mesurer("analyse_regles") as etape:
+                if est_fichier_binaire(path):
+                    self.parseur_amie = ParseurAmie(charger_regles_binaire(path))
+                else:
+                    self.parseur_amie = lire_sortie_amie(path)
+                etape.compteurs["regles"] = len(self.parseur_amie.table)
+        except Exception as e:
+            print(f"Erreur lors de la lecture des règles : {e}")
+            return None
+        self.regles = self.parseur_amie.table
+        return self.regles
+
+    def fichier_indexe(self, path):
+        # L'index des lignes est construit une fois par fichier, puis réutilisé tant qu'il ne change pas
+        fichier = self.fichiers_indexes.get(path)
+        st = os.stat(path)
+        if fichier is None or fichier.signature != (os.path.abspath(path), st.st_size, st.st_mtime_ns):
+            if fichier is not None:
+                fichier.fermer()
+            fichier = FichierIndexe(path)
+            self.fichiers_indexes[path] = fichier
+        return fichier
+
+    def index_ontologie(self):
+        # L'index n'est reconstruit que si les triplets minés (dernière ontologie ou union) ont changé ;
+        # il est enregistré sur disque et rouvert tel quel aux sessions suivantes. Si l'entrée d'AMIE
+        # était filtrée (faits exclus, inférences RDFS ajoutées), l'index contient les mêmes triplets
+        # filtrés, sous une empreinte propre au filtre : les métriques recalculées restent comparables.
+        if not self.ontologies:
+            return None
+        path, empreinte = self.source_ontologie()
+        if path is None:
+            return None
+        filtre = self.filtre_entree
+        if filtre is not None:
+            empreinte = self.cache_conversion.cle(empreinte, "index", filtre.signature())
+        if self.index_triplets is None or self._empreinte_index != empreinte:
+            self.index_triplets = IndexTriplets.depuis_cache(path, empreinte, filtre=filtre)
+            self._empreinte_index = empreinte
+        return self.index_triplets
+
+    def interroger(self, requete):
+        # Requête SPARQL simple (motifs de triplets) sur l'ontologie ; lève ValueError si elle est invalide
+        index = self.index_ontologie()
+        if index is None:
+            raise ValueError("Aucune ontologie chargée.")
+        self.requetes.lier(index, (self._empreinte_index, index.version))
+        return self.requetes.executer(requete)
+
+    # Faits ajoutés ou exclus (en mémoire : l'ontologie et son index enregistré ne changent pas)
+    def _maintenance_qualite(self):
+        index = self.index_ontologie()
+        if index is None:
+            raise ValueError("Aucune ontologie chargée.")
+        moteur = self.qualite_incrementale
+        if moteur is None or moteur.index is not index or moteur.table is not self.regles:
+            moteur = QualiteIncrementale(index, self.regles)
+            self.qualite_incrementale = moteur
+        return moteur
+
+    def modifier_faits(self, texte, exclure=False):
+        # Un fait par ligne ; seuls les effectifs des règles concernées sont mis à jour. Renvoie le rapport.
+        faits = lire_faits(texte, self.regles.prefixes)
+        moteur = self._maintenance_qualite()
+        rapport = moteur.appliquer(retraits=faits) if exclure else moteur.appliquer(ajouts=faits)
+        self.qualite = moteur.metriques
+        return rapport
+
+    def retablir_donnees(self):
+        # Oublie les faits ajoutés ou exclus : l'index est relu depuis le disque
+        self.index_triplets = None
+        self._empreinte_index = None
+        self.qualite_incrementale = None
+
+    def tester_hypothese(self, texte):
+        # Métriques d'une règle saisie au format d'AMIE, sur les données courantes
+        index = self.index_ontologie()
+        if index is None:
+            raise ValueError("Aucune ontologie chargée.")
+        return EvaluateurQualite(index).evaluer_texte(texte, dict(PREFIXES_CONNUS, **self.regles.prefixes))
+
+    def mesurer_qualite_regle(self, i):
+        return EvaluateurQualite(self.index_ontologie()).evaluer_regle(self.regles, i)
+
+    def mesurer_qualite_regles(self):
+        with self.trace.mesurer("index") as etape:
+            index = self.index_ontologie()
+            etape.compteurs["faits"] = len(index) if index is not None else 0
+        with self.trace.mesurer("qualite", regles=len(self.regles)):
+            self.qualite = EvaluateurQualite(index).evaluer_table(self.regles)
+        return self.qualite
+
+    def sauvegarder_regles(self, file_path, binaire=None, compresser=False):
+        # Format binaire en colonnes pour l'extension .regles (ou binaire=True), sinon texte (un dictionnaire par ligne)
+        if binaire is None:
+            binaire = file_path.endswith(EXTENSION_BINAIRE)
+        try:
+            with self.trace.mesurer("sauvegarde", regles=len(self.regles), binaire=binaire):
+                if binaire:
+                    ecrire_regles_binaire(self.regles, file_path, compresser=compresser)
+                else:
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        for regle in self.regles:
+                            f.write(f"{regle}\n")
+            return True
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde : {e}")
+            return False
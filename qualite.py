@@ -0,0 +1,139 @@
+import numpy as np
+
+from index_triplets import IndexTriplets
+from regles_amie import decouper_regle, est_variable, COLONNES_METRIQUES
+
+# <-------------------------->
+# Mesure de la qualité des règles sur un index de triplets
+# <-------------------------->
+def _paires_distinctes(liaisons, variables):
+    # Couples distincts de valeurs des variables de tête, codés sur 64 bits
+    if not variables:
+        return np.zeros(1 if liaisons is not None else 0, dtype=np.int64)
+    x = liaisons[variables[0]].astype(np.int64) << 32
+    if len(variables) > 1:
+        x |= liaisons[variables[1]].astype(np.int64)
+    return np.unique(x)
+
+def _decoder(paires, variables):
+    if not variables:
+        return {}
+    liaisons = {variables[0]: (paires >> 32).astype(np.int32)}
+    if len(variables) > 1:
+        liaisons[variables[1]] = (paires & 0xFFFFFFFF).astype(np.int32)
+    return liaisons
+
+class EvaluateurQualite:
+    # Calcule support, head coverage, confiance standard et confiance PCA (définitions d'AMIE)
+    # à partir de l'index, sans relancer AMIE. Les corps de règles identiques (fréquents :
+    # AMIE combine un même corps avec plusieurs têtes) ne sont évalués qu'une fois par lot.
+    def __init__(self, index):
+        self.index = index
+        self._corps_evalues = {}
+
+    def atome_index(self, atome, developper=None):
+        # Passage d'un atome textuel (termes AMIE) à un atome d'identifiants de l'index
+        resultat = []
+        for terme in atome:
+            if est_variable(terme):
+                resultat.append(terme)
+            else:
+                terme = developper(terme) if developper else terme
+                resultat.append(self.index.chercher_terme(terme))
+        return tuple(resultat)
+
+    def _corps(self, corps, variables):
+        cle = (tuple(corps), tuple(variables))
+        paires = self._corps_evalues.get(cle)
+        if paires is None:
+            liaisons = self.index.joindre(corps)
+            if any(v not in liaisons for v in variables):
+                # Variable de tête absente du corps : la règle n'est pas fermée
+                paires = np.zeros(0, dtype=np.int64)
+            else:
+                paires = _paires_distinctes(liaisons, variables)
+            self._corps_evalues[cle] = paires
+        return paires
+
+    def evaluer(self, corps, tete, variable_fonctionnelle=None):
+        # corps, tete : atomes d'identifiants (cf. atome_index)
+        s, p, o = tete
+        variables = [t for t in (s, o) if isinstance(t, str)]
+        variables = list(dict.fromkeys(variables))
+        paires_corps = self._corps(corps, variables)
+        taille_corps = len(paires_corps)
+
+        liaisons = _decoder(paires_corps, variables)
+        support = 0
+        if taille_corps:
+            tete_valide = self.index.joindre([tete], liaisons)
+            support = len(_paires_distinctes(tete_valide, variables)) if variables else taille_corps
+
+        # Confiance PCA : on ne compte que les paires du corps dont la variable fonctionnelle
+        # possède au moins un fait pour le prédicat de tête
+        if variable_fonctionnelle not in variables:
+            variable_fonctionnelle = variables[0] if variables else None
+        taille_pca = taille_corps
+        if taille_corps and variable_fonctionnelle is not None:
+            faits = self.index.faits.get(p) if isinstance(p, (int, np.integer)) and p >= 0 else None
+            if faits is None:
+                taille_pca = 0
+            else:
+                valeurs = liaisons[variable_fonctionnelle]
+                connus = faits.sujets if variable_fonctionnelle == s else faits.objets_os
+                taille_pca = int(np.count_nonzero(np.isin(valeurs, connus)))
+
+        taille_tete = self.index.taille_predicat(p) if isinstance(p, (int, np.integer)) and p >= 0 else 0
+        return {
+            "positive_examples": support,
+            "head_coverage": support / taille_tete if taille_tete else 0.0,
+            "std_confidence": support / taille_corps if taille_corps else 0.0,
+            "pca_confidence": support / taille_pca if taille_pca else 0.0,
+            "body_size": taille_corps,
+            "pca_body_size": taille_pca,
+        }
+
+    def evaluer_texte(self, texte, prefixes=None, variable_fonctionnelle=None):
+        # Règle au format AMIE, ex. "?a  p7:aPourMaladie  ?b   => ?a  p2:type  p7:UPNPatient"
+        corps, tete = decouper_regle(texte)
+        developper = _developpeur(prefixes or {})
+        return self.evaluer([self.atome_index(a, developper) for a in corps],
+                            self.atome_index(tete, developper), variable_fonctionnelle)
+
+    def evaluer_regle(self, table, i):
+        correspondance = self._correspondance(table)
+        return self._evaluer_indice(table, correspondance, i)
+
+    def evaluer_table(self, table, indices=None):
+        # Réévalue un ensemble de règles ; renvoie une colonne par métrique
+        self._corps_evalues = {}
+        correspondance = self._correspondance(table)
+        indices = np.arange(len(table)) if indices is None else np.asarray(indices)
+        resultats = {nom: np.zeros(len(indices), dtype=dtype) for nom, dtype in COLONNES_METRIQUES}
+        for k, i in enumerate(indices):
+            for nom, valeur in self._evaluer_indice(table, correspondance, i).items():
+                resultats[nom][k] = valeur
+        self._corps_evalues = {}
+        return resultats
+
+    def _correspondance(self, table):
+        # Identifiant de l'index pour chaque terme de la table (variables conservées en texte)
+        developper = table.developper_terme
+        return [t if est_variable(t) else self.index.chercher_terme(developper(t)) for t in table.termes]
+
+    def _evaluer_indice(self, table, correspondance, i):
+        corps = [tuple(correspondance[t] for t in atome) for atome in table.corps(i)]
+        tete = tuple(correspondance[t] for t in table.tete(i))
+        variable = table.termes[table.colonne("functional_variable")[i]]
+        return self.evaluer(corps, tete, variable or None)
+
+def _developpeur(prefixes):
+    def developper(terme):
+        prefixe, sep, local = terme.partition(":")
+        if sep and prefixe in prefixes:
+            return prefixes[prefixe] + local
+        return terme
+    return developper
+
+def charger_index(path):
+    return IndexTriplets.depuis_fichier(path)
@@ -0,0 +1,350 @@
+import time
+
+import numpy as np
+
+from regles_amie import est_variable, COLONNES_METRIQUES
+from filtrage import PREFIXES_CONNUS, RDF_TYPE
+from index_triplets import normaliser_constante
+from requetes import decouper_requete
+
+def lire_faits(texte, prefixes=None):
+    # Un fait par ligne : "llc:patient1 llc:aPourMaladie llc:LLC", <iri>, "littéral", "a" pour rdf:type.
+    # Renvoie des triplets de textes tels que rangés dans l'index ; lève ValueError sinon.
+    prefixes = dict(PREFIXES_CONNUS, **(prefixes or {}))
+    faits = []
+    for numero, ligne in enumerate(texte.splitlines(), start=1):
+        jetons = [j for j in decouper_requete(ligne) if j != "."]
+        if not jetons:
+            continue
+        if len(jetons) != 3:
+            raise ValueError(f"Ligne {numero} : sujet, prédicat et objet attendus")
+        fait = []
+        for k, jeton in enumerate(jetons):
+            if jeton[:1] in "?$":
+                raise ValueError(f"Ligne {numero} : pas de variable dans un fait ({jeton})")
+            if jeton == "a" and k == 1:
+                fait.append(RDF_TYPE)
+                continue
+            prefixe, sep, local = jeton.partition(":")
+            if sep and prefixe in prefixes and not jeton.startswith(("<", '"')):
+                jeton = prefixes[prefixe] + local
+            fait.append(normaliser_constante(jeton))
+        faits.append(tuple(fait))
+    return faits
+
+# <-------------------------->
+# Maintenance incrémentale des métriques
+# <-------------------------->
+def _est_variable(terme):
+    return isinstance(terme, str)
+
+def _coder(liaisons, variables, n):
+    # Valeurs des variables de tête de chaque liaison, codées sur 64 bits (avec répétitions)
+    if not variables:
+        return np.zeros(n, dtype=np.int64)
+    x = liaisons[variables[0]].astype(np.int64) << 32
+    if len(variables) > 1:
+        x |= liaisons[variables[1]].astype(np.int64)
+    return x
+
+def _valeurs(paires, variables, variable):
+    # Valeurs de `variable` (l'une des variables de tête) dans des paires codées
+    return (paires >> 32) if variable == variables[0] else (paires & 0xFFFFFFFF)
+
+def _liaisons_faits(atome, cles):
+    # Liaisons des variables de `atome` avec les faits `cles` de son prédicat qui lui correspondent
+    s, _, o = atome
+    sujets, objets = (cles >> 32).astype(np.int32), (cles & 0xFFFFFFFF).astype(np.int32)
+    masque = np.ones(len(cles), dtype=bool)
+    if not _est_variable(s):
+        masque &= sujets == s
+    if not _est_variable(o):
+        masque &= objets == o
+    if _est_variable(s) and s == o:
+        masque &= sujets == objets
+    liaisons = {}
+    if _est_variable(s):
+        liaisons[s] = sujets[masque]
+    if _est_variable(o):
+        liaisons[o] = objets[masque]
+    return liaisons, int(np.count_nonzero(masque))
+
+class QualiteIncrementale:
+    # Garde pour chaque règle ses effectifs (support, taille du corps, taille du corps PCA) et, pour
+    # chaque paire de valeurs des variables de tête, le nombre de liaisons du corps qui y mènent.
+    # Quand des faits sont ajoutés ou retirés de l'index, seules les liaisons qui passent par ces faits
+    # sont calculées (jointure du reste du corps depuis chaque fait), et leur contribution est ajoutée
+    # ou retranchée : une paire entre dans le corps (ou en sort) quand son nombre de liaisons quitte
+    # (ou atteint) zéro. Un fait de tête ne change que le support et la taille du corps PCA des paires
+    # déjà présentes ; les règles de même prédicat de tête voient seulement leur head coverage
+    # recalculée avec le nouveau nombre de faits, sans jointure.
+    def __init__(self, index, table):
+        self.index = index
+        self.table = table
+        self.derniere_duree = 0.0
+        developper = table.developper_terme
+        textes = [None if est_variable(t) else normaliser_constante(developper(t)) for t in table.termes]
+        self._termes = [t if texte is None else texte for t, texte in zip(table.termes, textes)]
+        self._atomes = {}  # (prédicat, sujet | None, objet | None) -> règles dont un atome du corps correspond
+        self._tetes = {}   # prédicat de tête -> règles
+        for i in range(len(table)):
+            for s, p, o in table.corps(i):
+                self._atomes.setdefault((textes[p], textes[s], textes[o]), set()).add(i)
+            self._tetes.setdefault(textes[table.tete(i)[1]], set()).add(i)
+        self._initialiser()
+
+    def _initialiser(self):
+        table, n = self.table, len(self.table)
+        self.version = self.index.version
+        self._ids = [t if est_variable(t) else self.index.chercher_terme(t) for t in self._termes]
+        fonctionnelles = table.colonne("functional_variable")
+        self._regles = []  # (corps, tête, variables de tête, variable fonctionnelle, règle fermée) ; atomes en termes de la table
+        self._paires = []  # paires (triées) des variables de tête présentes dans le corps
+        self._comptes = []  # nombre de liaisons du corps par paire
+        self.metriques = {nom: np.zeros(n, dtype=dtype) for nom, dtype in COLONNES_METRIQUES}
+        self.support = self.metriques["positive_examples"]
+        self.taille_corps = self.metriques["body_size"]
+        self.taille_pca = self.metriques["pca_body_size"]
+        vide = np.zeros(0, dtype=np.int64)
+        deja_joints = {}  # corps identiques (AMIE combine un même corps avec plusieurs têtes)
+        for i in range(n):
+            s, p, o = table.tete(i)
+            variables = list(dict.fromkeys(self._termes[t] for t in (s, o) if est_variable(self._termes[t])))
+            fonctionnelle = table.termes[fonctionnelles[i]] or None
+            if fonctionnelle not in variables:
+                fonctionnelle = variables[0] if variables else None
+            corps_termes = tuple(tuple(a) for a in table.corps(i).tolist())
+            variables_corps = {self._termes[t] for a in corps_termes for t in (a[0], a[2]) if est_variable(self._termes[t])}
+            fermee = bool(variables_corps) and all(v in variables_corps for v in variables)
+            self._regles.append((corps_termes, (s, p, o), variables, fonctionnelle, fermee))
+            paires, comptes = vide, vide
+            if fermee:
+                cle = (corps_termes, tuple(variables))
+                if cle not in deja_joints:
+                    liaisons = self.index.joindre(self._corps(i))
+                    codes = _coder(liaisons, variables, len(next(iter(liaisons.values()))))
+                    deja_joints[cle] = np.unique(codes, return_counts=True)
+                paires, comptes = deja_joints[cle]
+            self._paires.append(paires)
+            self._comptes.append(comptes.astype(np.int64))
+            self.taille_corps[i] = len(paires)
+            self.support[i] = int(np.count_nonzero(self._tete_vraie(i, paires)))
+            self.taille_pca[i] = int(np.count_nonzero(self._fonctionnelle_connue(i, paires)))
+        self._calculer_ratios(np.arange(n))
+
+    # Règles en identifiants de l'index (les constantes absentes valent -1 jusqu'à l'ajout d'un fait qui les contient)
+    def _atome(self, atome):
+        return tuple(self._ids[t] for t in atome)
+
+    def _corps(self, i):
+        return [self._atome(a) for a in self._regles[i][0]]
+
+    def _tete(self, i):
+        return self._atome(self._regles[i][1])
+
+    def _tete_vraie(self, i, paires):
+        # Pour chaque paire, la tête instanciée figure-t-elle dans l'index ?
+        s, p, o = self._tete(i)
+        variables = self._regles[i][2]
+        faits = self.index.faits.get(p) if p >= 0 else None
+        if faits is None or (not _est_variable(s) and s < 0) or (not _est_variable(o) and o < 0):
+            return np.zeros(len(paires), dtype=bool)
+        sujets = _valeurs(paires, variables, s) if _est_variable(s) else np.full(len(paires), s, dtype=np.int64)
+        objets = _valeurs(paires, variables, o) if _est_variable(o) else np.full(len(paires), o, dtype=np.int64)
+        return faits.contient(sujets, objets)
+
+    def _fonctionnelle_connue(self, i, paires):
+        # Pour chaque paire, la variable fonctionnelle a-t-elle au moins un fait du prédicat de tête ? (PCA)
+        s, p, o = self._tete(i)
+        variables, fonctionnelle = self._regles[i][2], self._regles[i][3]
+        if fonctionnelle is None:
+            return np.ones(len(paires), dtype=bool)
+        faits = self.index.faits.get(p) if p >= 0 else None
+        if faits is None:
+            return np.zeros(len(paires), dtype=bool)
+        connus = faits.sujets if fonctionnelle == s else faits.objets_os
+        return np.isin(_valeurs(paires, variables, fonctionnelle), connus)
+
+    def _calculer_ratios(self, indices):
+        for i in indices:
+            p = self._tete(i)[1]
+            taille_tete = self.index.taille_predicat(p) if p >= 0 else 0
+            support = self.support[i]
+            self.metriques["head_coverage"][i] = support / taille_tete if taille_tete else 0.0
+            self.metriques["std_confidence"][i] = support / self.taille_corps[i] if self.taille_corps[i] else 0.0
+            self.metriques["pca_confidence"][i] = support / self.taille_pca[i] if self.taille_pca[i] else 0.0
+
+    # Contributions des faits modifiés
+    def _liaisons_delta(self, i, delta):
+        # Paires (avec répétitions) des liaisons du corps qui passent par au moins un fait de `delta`
+        # ({prédicat: clés}), sur l'index courant. Une liaison qui passe par plusieurs de ces faits n'est
+        # comptée que pour le premier atome qui en utilise un.
+        corps, variables = self._corps(i), self._regles[i][2]
+        codes = []
+        for k, atome in enumerate(corps):
+            cles = delta.get(atome[1])
+            if cles is None:
+                continue
+            depart, nb = _liaisons_faits(atome, cles)
+            if not nb:
+                continue
+            liaisons = self.index.joindre(corps[:k] + corps[k + 1:], depart)
+            n = len(next(iter(liaisons.values())))
+            garder = np.ones(n, dtype=bool)
+            for s, p, o in corps[:k]:
+                if p in delta and n:
+                    sujets = liaisons[s] if _est_variable(s) else np.full(n, s, dtype=np.int32)
+                    objets = liaisons[o] if _est_variable(o) else np.full(n, o, dtype=np.int32)
+                    garder &= ~np.isin((sujets.astype(np.int64) << 32) | objets.astype(np.int64), delta[p])
+            codes.append(_coder({v: col[garder] for v, col in liaisons.items()}, variables, int(np.count_nonzero(garder))))
+        return np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+
+    def _maj_corps(self, i, delta, signe):
+        # Ajoute (signe = 1) ou retranche (signe = -1) les liaisons passant par `delta` ; renvoie les
+        # paires entrées dans le corps et celles qui en sont sorties
+        codes = self._liaisons_delta(i, delta)
+        paires, comptes = self._paires[i], self._comptes[i]
+        if not len(codes):
+            return codes, codes
+        nouvelles, nb = np.unique(codes, return_counts=True)
+        pos = np.searchsorted(paires, nouvelles)
+        presentes = np.zeros(len(nouvelles), dtype=bool)
+        avant = np.zeros(len(nouvelles), dtype=np.int64)
+        if len(paires):
+            proches = np.minimum(pos, len(paires) - 1)
+            presentes = paires[proches] == nouvelles
+            avant[presentes] = comptes[proches[presentes]]
+        apres = avant + signe * nb
+        comptes = comptes.copy()
+        comptes[pos[presentes]] = apres[presentes]
+        absentes = ~presentes
+        paires = np.insert(paires, pos[absentes], nouvelles[absentes])
+        comptes = np.insert(comptes, pos[absentes], apres[absentes])
+        garder = comptes > 0
+        self._paires[i], self._comptes[i] = paires[garder], comptes[garder]
+        return nouvelles[(avant == 0) & (apres > 0)], nouvelles[(avant > 0) & (apres <= 0)]
+
+    def _maj_tete(self, i, delta, signe, basculees):
+        # Faits du prédicat de tête ajoutés ou retirés : support des paires du corps qu'ils instancient,
+        # et taille PCA des paires dont la variable fonctionnelle gagne son premier fait ou perd le dernier
+        s, p, o = self._tete(i)
+        cles = delta.get(p)
+        if cles is None:
+            return
+        variables, fonctionnelle = self._regles[i][2], self._regles[i][3]
+        paires = self._paires[i]
+        liaisons, nb = _liaisons_faits((s, p, o), cles)
+        if nb:
+            self.support[i] += signe * int(np.count_nonzero(np.isin(_coder(liaisons, variables, nb), paires)))
+        if fonctionnelle is not None:
+            valeurs = basculees[(p, fonctionnelle == s)]
+            if len(valeurs):
+                self.taille_pca[i] += signe * int(np.count_nonzero(np.isin(_valeurs(paires, variables, fonctionnelle), valeurs)))
+
+    def _basculees(self, delta, ajout):
+        # (prédicat, côté sujet) -> valeurs qui n'avaient aucun fait du prédicat avant un ajout, ou n'en
+        # ont plus aucun après un retrait (l'index est alors déjà à jour)
+        resultat = {}
+        for p, cles in delta.items():
+            faits = self.index.faits.get(p)
+            for cote_sujet in (True, False):
+                valeurs, nb = np.unique((cles >> 32) if cote_sujet else (cles & 0xFFFFFFFF), return_counts=True)
+                existantes = np.zeros(len(valeurs), dtype=np.int64)
+                if faits is not None:
+                    tries = faits.sujets if cote_sujet else faits.objets_os
+                    existantes = np.searchsorted(tries, valeurs, side="right") - np.searchsorted(tries, valeurs)
+                resultat[(p, cote_sujet)] = valeurs[existantes == nb] if ajout else valeurs[existantes == 0]
+        return resultat
+
+    def _regles_corps(self, delta):
+        regles = set()
+        for p, cles in delta.items():
+            texte_p = self.index.termes[p]
+            for cle in cles.tolist():
+                s, o = self.index.termes[cle >> 32], self.index.termes[cle & 0xFFFFFFFF]
+                for motif in ((texte_p, None, None), (texte_p, s, None), (texte_p, None, o), (texte_p, s, o)):
+                    regles.update(self._atomes.get(motif, ()))
+        return regles
+
+    def _regles_fermees(self, regles):
+        # Une règle dont une variable de tête manque au corps garde des métriques nulles
+        return [i for i in sorted(regles) if self._regles[i][4]]
+
+    def _regles_tete(self, delta):
+        regles = set()
+        for p in delta:
+            regles.update(self._tetes.get(self.index.termes[p], ()))
+        return regles
+
+    def _phase_corps(self, regles, delta, signe):
+        for i in regles:
+            entrees, sorties = self._maj_corps(i, delta, signe)
+            changees = entrees if signe > 0 else sorties
+            if len(changees):
+                # Paires évaluées sur l'index courant : après un ajout, avant un retrait
+                self.taille_corps[i] += signe * len(changees)
+                self.support[i] += signe * int(np.count_nonzero(self._tete_vraie(i, changees)))
+                self.taille_pca[i] += signe * int(np.count_nonzero(self._fonctionnelle_connue(i, changees)))
+
+    def _phase_tete(self, regles, delta, signe):
+        basculees = self._basculees(delta, ajout=signe > 0)
+        for i in regles:
+            self._maj_tete(i, delta, signe, basculees)
+
+    def _triplets(self, delta):
+        termes = self.index.termes
+        return [(termes[cle >> 32], termes[p], termes[cle & 0xFFFFFFFF]) for p, cles in delta.items() for cle in cles.tolist()]
+
+    def regles_concernees(self, faits):
+        # Règles dont la valeur d'une métrique peut changer si ces faits apparaissent ou disparaissent
+        regles = set()
+        for s, p, o in faits:
+            for cle in ((p, None, None), (p, s, None), (p, None, o), (p, s, o)):
+                regles.update(self._atomes.get(cle, ()))
+            regles.update(self._tetes.get(p, ()))
+        return np.array(sorted(regles), dtype=np.int64)
+
+    def appliquer(self, ajouts=(), retraits=()):
+        # Modifie l'index et met à jour les effectifs des règles concernées ; renvoie un rapport
+        debut = time.perf_counter()
+        if self.index.version != self.version:
+            self._initialiser()  # Index modifié en dehors de ce moteur
+        avant = {nom: valeurs.copy() for nom, valeurs in self.metriques.items()}
+        touchees = set()
+        # Retraits (seuls les faits présents comptent) : les liaisons sortantes sont calculées tant que
+        # l'index contient encore les faits, puis les faits de tête s'appliquent au corps restant
+        retires = self.index.faits_presents(retraits) if retraits else {}
+        if retires:
+            corps, tetes = self._regles_fermees(self._regles_corps(retires)), self._regles_fermees(self._regles_tete(retires))
+            self._phase_corps(corps, retires, -1)
+            self.index.retirer_faits(self._triplets(retires))
+            self._phase_tete(tetes, retires, -1)
+            touchees.update(corps, tetes)
+        # Ajouts (seuls les faits absents comptent) : les faits de tête s'appliquent au corps d'avant,
+        # puis les paires entrées dans le corps sont évaluées sur les données nouvelles
+        ajoutes = self.index.faits_presents(ajouts, presents=False) if ajouts else {}
+        if ajoutes:
+            self.index.ajouter_faits(self._triplets(ajoutes))
+            # Constantes des règles absentes jusqu'ici de l'index
+            self._ids = [ident if isinstance(ident, str) or ident >= 0 else self.index.chercher_terme(t)
+                         for t, ident in zip(self._termes, self._ids)]
+            corps, tetes = self._regles_fermees(self._regles_corps(ajoutes)), self._regles_fermees(self._regles_tete(ajoutes))
+            self._phase_tete(tetes, ajoutes, 1)
+            self._phase_corps(corps, ajoutes, 1)
+            touchees.update(corps, tetes)
+        self.version = self.index.version
+        indices = np.array(sorted(touchees), dtype=np.int64)
+        self._calculer_ratios(indices)
+        changees = np.zeros(len(indices), dtype=bool)
+        for nom, valeurs in self.metriques.items():
+            changees |= avant[nom][indices] != valeurs[indices]
+        changees = indices[changees]
+        self.derniere_duree = time.perf_counter() - debut
+        return {
+            "faits_ajoutes": sum(len(cles) for cles in ajoutes.values()),
+            "faits_retires": sum(len(cles) for cles in retires.values()),
+            "mises_a_jour": indices,
+            "changees": changees,
+            "avant": {nom: valeurs[changees] for nom, valeurs in avant.items()},
+            "duree": self.derniere_duree,
+        }
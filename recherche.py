@@ -0,0 +1,166 @@
+import re
+import math
+import bisect
+from array import array
+
+import numpy as np
+
+from conversion import iterer_triplets
+from filtrage import RDF_TYPE, RDF, RDFS, OWL
+
+# Au-delà, un terme de requête trop court (ex. "a") ne parcourt que les jetons les plus proches
+LIMITE_JETONS_PREFIXE = 2000
+
+_MOT = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+GENRES_ENTITES = {
+    OWL + "Class": "classe",
+    RDFS + "Class": "classe",
+    OWL + "ObjectProperty": "propriété",
+    OWL + "DatatypeProperty": "propriété",
+    OWL + "AnnotationProperty": "propriété",
+    RDF + "Property": "propriété",
+    OWL + "NamedIndividual": "individu",
+}
+RDFS_LABEL = RDFS + "label"
+
+def nom_local(terme):
+    # http://...#aPourMaladie, p7:aPourMaladie -> aPourMaladie ; "POS"^^xsd:string -> POS
+    if terme.startswith('"'):
+        return terme[1:terme.rfind('"')] if terme.rfind('"') > 0 else terme[1:]
+    terme = terme.strip("<>")
+    for separateur in ("#", "/", ":"):
+        if separateur in terme:
+            terme = terme.rsplit(separateur, 1)[1] or terme
+    return terme
+
+def jetons(texte):
+    # Jetons d'un nom : le nom entier et ses mots (aPourMaladie -> apourmaladie, pour, maladie, a)
+    if not texte or texte.startswith("?"):
+        return set()
+    local = nom_local(texte)
+    mots = {m.lower() for m in _MOT.findall(local)}
+    mots.update(m.lower() for m in re.split(r"[\s_\-.]+", local) if m)
+    return mots
+
+def termes_requete(requete):
+    return [t for t in (m.lower().strip("?\"<>") for m in re.split(r"[\s,;]+", requete)) if t]
+
+# <-------------------------->
+# Index inversé
+# <-------------------------->
+class IndexInverse:
+    # jeton -> documents qui le contiennent (numéros croissants, sans doublon). Le vocabulaire est
+    # tenu trié pour retrouver en O(log n) les jetons commençant par un terme en cours de saisie.
+    def __init__(self):
+        self.postings = {}
+        self.vocabulaire = []
+        self.nb_documents = 0
+
+    def ajouter(self, document, jetons_document):
+        for jeton in jetons_document:
+            liste = self.postings.get(jeton)
+            if liste is None:
+                liste = self.postings[jeton] = array("i")
+                bisect.insort(self.vocabulaire, jeton)
+            liste.append(document)
+        self.nb_documents = max(self.nb_documents, document + 1)
+
+    def correspondances(self, terme):
+        debut = bisect.bisect_left(self.vocabulaire, terme)
+        fin = bisect.bisect_left(self.vocabulaire, terme + "\uffff", debut)
+        return self.vocabulaire[debut:min(fin, debut + LIMITE_JETONS_PREFIXE)]
+
+    def scores(self, termes):
+        # Score de chaque document : somme sur les termes de l'idf des jetons correspondants
+        # (correspondance exacte comptée double). Un document doit correspondre à tous les termes.
+        n = self.nb_documents
+        total = np.zeros(n, dtype=np.float64)
+        retenus = np.ones(n, dtype=bool)
+        for terme in termes:
+            score = np.zeros(n, dtype=np.float64)
+            for jeton in self.correspondances(terme):
+                documents = np.frombuffer(self.postings[jeton], dtype=np.int32)
+                poids = math.log(1 + n / len(documents)) * (2 if jeton == terme else 1)
+                score[documents] = np.maximum(score[documents], poids)
+            retenus &= score > 0
+            total += score
+        total[~retenus] = 0
+        return total
+
+# <-------------------------->
+# Recherche dans les règles et l'ontologie
+# <-------------------------->
+class IndexRecherche:
+    # Les règles sont indexées au fil de leur arrivée (synchroniser_regles), les entités de
+    # l'ontologie (classes, propriétés, individus et leurs libellés) en une lecture en flux.
+    def __init__(self):
+        self.regles = None
+        self.index_regles = IndexInverse()
+        self.nb_regles_indexees = 0
+        self._jetons_termes = []  # identifiant de terme de la table -> jetons
+        self.entites = []  # (iri, genre, libellé)
+        self.index_entites = IndexInverse()
+        self.source_entites = None
+
+    def synchroniser_regles(self, table):
+        # Indexe les règles ajoutées depuis le dernier appel ; repart de zéro si la table a changé
+        if table is not self.regles:
+            self.regles = table
+            self.index_regles = IndexInverse()
+            self.nb_regles_indexees = 0
+            self._jetons_termes = []
+        debut_regle = self.nb_regles_indexees
+        if debut_regle >= len(table):
+            return range(debut_regle, debut_regle)
+        for terme in table.termes[len(self._jetons_termes):]:
+            self._jetons_termes.append(jetons(terme))
+        debut = table.debut_atomes
+        atomes = table.atomes
+        for i in range(debut_regle, len(table)):
+            ids = set(atomes[debut[i]:debut[i + 1]].ravel().tolist())
+            self.index_regles.ajouter(i, set().union(*(self._jetons_termes[t] for t in ids)))
+        self.nb_regles_indexees = self.index_regles.nb_documents = len(table)
+        return range(debut_regle, len(table))
+
+    def indexer_ontologie(self, path, format=None):
+        from rdflib import URIRef, Literal
+        rdf_type, rdfs_label = URIRef(RDF_TYPE), URIRef(RDFS_LABEL)
+        genres_entites = {URIRef(iri): genre for iri, genre in GENRES_ENTITES.items()}
+        genres, libelles = {}, {}
+        for s, p, o in iterer_triplets(path, format):
+            if p == rdf_type and o in genres_entites:
+                genres.setdefault(s, genres_entites[o])
+            elif p == rdfs_label and isinstance(o, Literal):
+                libelles.setdefault(s, str(o))
+        self.entites = []
+        self.index_entites = IndexInverse()
+        for iri, genre in genres.items():
+            if not isinstance(iri, URIRef):
+                continue
+            libelle = libelles.get(iri, "")
+            self.index_entites.ajouter(len(self.entites), jetons(str(iri)) | jetons(libelle))
+            self.entites.append((str(iri), genre, libelle))
+        self.source_entites = path
+        return len(self.entites)
+
+    def rechercher(self, requete, limite=50):
+        # Résultats classés : ("règle", indice, score) ou ("entité", indice, score)
+        termes = termes_requete(requete)
+        if not termes:
+            return []
+        resultats = []
+        if self.regles is not None and self.nb_regles_indexees:
+            scores = self.index_regles.scores(termes)
+            trouves = np.flatnonzero(scores)
+            # À score égal, les règles de meilleure confiance PCA d'abord
+            pca = self.regles.colonne("pca_confidence")[trouves]
+            ordre = np.lexsort((-pca, -scores[trouves]))[:limite]
+            resultats.extend(("règle", int(trouves[k]), float(scores[trouves[k]])) for k in ordre)
+        if self.entites:
+            scores = self.index_entites.scores(termes)
+            trouves = np.flatnonzero(scores)
+            ordre = np.argsort(-scores[trouves], kind="stable")[:limite]
+            resultats.extend(("entité", int(trouves[k]), float(scores[trouves[k]])) for k in ordre)
+        resultats.sort(key=lambda r: -r[2])
+        return resultats[:limite]
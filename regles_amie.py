@@ -0,0 +1,294 @@
+import re
+
+import numpy as np
+
+# <-------------------------->
+# Table de règles en colonnes
+# <-------------------------->
+# Métriques numériques d'AMIE, dans l'ordre de ses colonnes de sortie
+COLONNES_METRIQUES = [
+    ("head_coverage", np.float64),
+    ("std_confidence", np.float64),
+    ("pca_confidence", np.float64),
+    ("positive_examples", np.int64),
+    ("body_size", np.int64),
+    ("pca_body_size", np.int64),
+]
+
+# En-têtes AMIE correspondants
+ENTETES_AMIE = {
+    "Rule": "rule",
+    "Head Coverage": "head_coverage",
+    "Std Confidence": "std_confidence",
+    "PCA Confidence": "pca_confidence",
+    "Positive Examples": "positive_examples",
+    "Body size": "body_size",
+    "PCA Body size": "pca_body_size",
+    "Functional variable": "functional_variable",
+}
+
+ORDRE_AMIE_DEFAUT = ["rule", "head_coverage", "std_confidence", "pca_confidence",
+                     "positive_examples", "body_size", "pca_body_size", "functional_variable"]
+
+# Un terme de règle : littéral entre guillemets (éventuellement typé ou avec langue) ou jeton sans espace
+_TERME = re.compile(r'"(?:[^"\\]|\\.)*"(?:\^\^\S+|@[\w-]+)?|\S+')
+
+def decouper_regle(texte):
+    # "?a  p  ?b  ?b  q  C   => ?a  r  ?b" -> ([(?a, p, ?b), (?b, q, C)], (?a, r, ?b))
+    termes = _TERME.findall(texte)
+    if "=>" not in termes:
+        raise ValueError(f"Règle sans implication : {texte}")
+    pos = termes.index("=>")
+    corps, tete = termes[:pos], termes[pos + 1:]
+    if len(corps) % 3 or len(tete) != 3:
+        raise ValueError(f"Règle mal formée : {texte}")
+    atomes = [tuple(corps[i:i + 3]) for i in range(0, len(corps), 3)]
+    return atomes, tuple(tete)
+
+def est_variable(terme):
+    return terme.startswith("?")
+
+class TableRegles:
+    # Les métriques sont stockées dans des tableaux NumPy (une colonne par métrique) et le texte
+    # des règles sous forme d'atomes (sujet, prédicat, objet) d'identifiants de termes internés.
+    # Les atomes de la règle i occupent atomes[debut[i]:debut[i+1]] : le corps puis la tête.
+    def __init__(self, capacite=1024):
+        self.termes = []        # identifiant -> texte du terme
+        self._ids_termes = {}   # texte du terme -> identifiant
+        self.prefixes = {}      # préfixe AMIE (p7) -> IRI de l'espace de noms
+        self.decodeur = None    # jeton de l'entrée TSV compactée -> terme lisible
+        self.n = 0
+        self.n_atomes = 0
+        self._colonnes = {nom: np.zeros(capacite, dtype=dtype) for nom, dtype in COLONNES_METRIQUES}
+        self._variable_fonctionnelle = np.zeros(capacite, dtype=np.int32)
+        self._debut = np.zeros(capacite + 1, dtype=np.int64)
+        self._atomes = np.zeros((capacite * 3, 3), dtype=np.int32)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.regle(i)
+
+    # Termes
+    def id_terme(self, terme):
+        ident = self._ids_termes.get(terme)
+        if ident is None:
+            ident = len(self.termes)
+            self.termes.append(terme)
+            self._ids_termes[terme] = ident
+        return ident
+
+    def chercher_terme(self, terme):
+        return self._ids_termes.get(terme, -1)
+
+    def developper_terme(self, terme):
+        # p7:fp -> http://...LLC_Onto#fp si le préfixe est connu
+        if not est_variable(terme) and not terme.startswith('"'):
+            prefixe, sep, local = terme.partition(":")
+            if sep and prefixe in self.prefixes:
+                return self.prefixes[prefixe] + local
+        return terme
+
+    # Ajout
+    def _agrandir(self, n_regles, n_atomes):
+        if n_regles > len(self._variable_fonctionnelle):
+            capacite = max(n_regles, 2 * len(self._variable_fonctionnelle))
+            for nom, col in self._colonnes.items():
+                self._colonnes[nom] = np.resize(col, capacite)
+            self._variable_fonctionnelle = np.resize(self._variable_fonctionnelle, capacite)
+            self._debut = np.resize(self._debut, capacite + 1)
+        if n_atomes > len(self._atomes):
+            capacite = max(n_atomes, 2 * len(self._atomes))
+            atomes = np.zeros((capacite, 3), dtype=np.int32)
+            atomes[:self.n_atomes] = self._atomes[:self.n_atomes]
+            self._atomes = atomes
+
+    def ajouter(self, corps, tete, metriques, variable_fonctionnelle=""):
+        atomes = list(corps) + [tete]
+        self._agrandir(self.n + 1, self.n_atomes + len(atomes))
+        i = self.n
+        for nom, _ in COLONNES_METRIQUES:
+            self._colonnes[nom][i] = metriques.get(nom, 0)
+        self._variable_fonctionnelle[i] = self.id_terme(variable_fonctionnelle)
+        decodeur = self.decodeur or (lambda t: t)
+        for k, atome in enumerate(atomes):
+            self._atomes[self.n_atomes + k] = [self.id_terme(decodeur(t)) for t in atome]
+        self.n_atomes += len(atomes)
+        self._debut[i + 1] = self.n_atomes
+        self.n += 1
+        return i
+
+    def ajouter_texte(self, texte, metriques, variable_fonctionnelle=""):
+        corps, tete = decouper_regle(texte)
+        return self.ajouter(corps, tete, metriques, variable_fonctionnelle)
+
+    # Accès en colonnes
+    def colonne(self, nom):
+        if nom == "functional_variable":
+            return self._variable_fonctionnelle[:self.n]
+        return self._colonnes[nom][:self.n]
+
+    @property
+    def debut_atomes(self):
+        return self._debut[:self.n + 1]
+
+    @property
+    def atomes(self):
+        return self._atomes[:self.n_atomes]
+
+    def atomes_regle(self, i):
+        return self._atomes[self._debut[i]:self._debut[i + 1]]
+
+    def tete(self, i):
+        return self._atomes[self._debut[i + 1] - 1]
+
+    def corps(self, i):
+        return self._atomes[self._debut[i]:self._debut[i + 1] - 1]
+
+    def texte_atome(self, atome):
+        return "  ".join(self.termes[t] for t in atome)
+
+    def texte_regle(self, i):
+        corps = "  ".join(self.texte_atome(a) for a in self.corps(i))
+        return f"{corps}   => {self.texte_atome(self.tete(i))}"
+
+    def regle(self, i):
+        regle = {"rule": self.texte_regle(i)}
+        for nom, dtype in COLONNES_METRIQUES:
+            valeur = self._colonnes[nom][i]
+            regle[nom] = float(valeur) if dtype is np.float64 else int(valeur)
+        regle["functional_variable"] = self.termes[self._variable_fonctionnelle[i]]
+        return regle
+
+    # Tri et filtrage
+    def trier(self, nom, decroissant=True, indices=None):
+        valeurs = self.colonne(nom)
+        if indices is not None:
+            valeurs = valeurs[indices]
+        ordre = np.argsort(-valeurs if decroissant else valeurs, kind="stable")
+        return ordre if indices is None else np.asarray(indices)[ordre]
+
+    def filtrer(self, **seuils):
+        # filtrer(pca_confidence=0.5, body_size=(None, 2)) : bornes min, ou (min, max)
+        masque = np.ones(self.n, dtype=bool)
+        for nom, seuil in seuils.items():
+            bas, haut = seuil if isinstance(seuil, tuple) else (seuil, None)
+            valeurs = self.colonne(nom)
+            if bas is not None:
+                masque &= valeurs >= bas
+            if haut is not None:
+                masque &= valeurs <= haut
+        return np.flatnonzero(masque)
+
+    def sous_table(self, indices):
+        # Nouvelle table avec les règles choisies, dans l'ordre donné. Le dictionnaire des termes est
+        # partagé (les identifiants restent valables) ; les colonnes et les atomes sont recopiés.
+        indices = np.asarray(indices, dtype=np.int64)
+        table = TableRegles(capacite=max(len(indices), 1))
+        table.termes, table._ids_termes = self.termes, self._ids_termes
+        table.prefixes.update(self.prefixes)
+        table.decodeur = self.decodeur
+        for nom, _ in COLONNES_METRIQUES:
+            table._colonnes[nom][:len(indices)] = self.colonne(nom)[indices]
+        table._variable_fonctionnelle[:len(indices)] = self.colonne("functional_variable")[indices]
+        debut = self.debut_atomes
+        longueurs = debut[indices + 1] - debut[indices]
+        np.cumsum(longueurs, out=table._debut[1:len(indices) + 1])
+        n_atomes = int(longueurs.sum())
+        # Position source de chaque atome recopié : début de sa règle + rang dans la règle
+        rang = np.arange(n_atomes) - np.repeat(table._debut[:len(indices)], longueurs)
+        table._atomes = np.ascontiguousarray(self.atomes[np.repeat(debut[indices], longueurs) + rang], dtype=np.int32)
+        table.n, table.n_atomes = len(indices), n_atomes
+        return table
+
+    def ids_predicats(self):
+        # Identifiant du prédicat de chaque atome
+        return self.atomes[:, 1]
+
+    def predicats_tete(self):
+        return self._atomes[self._debut[1:self.n + 1] - 1, 1]
+
+# <-------------------------->
+# Lecture incrémentale de la sortie d'AMIE
+# <-------------------------->
+_PREFIXE = re.compile(r"^([A-Za-z][\w.-]*):([a-z][\w+.-]*:\S*)$")
+_CHARGEMENT = re.compile(r"Loaded (\d+) facts in ([\d.]+) s using (-?\d+) MB")
+_MINAGE = re.compile(r"Mining done in ([\d.]+) s")
+_TOTAL = re.compile(r"Total time ([\d.]+) s")
+_NB_REGLES = re.compile(r"^(\d+) rules mined\.")
+
+class ParseurAmie:
+    # Analyse la sortie d'AMIE ligne par ligne, au fil de l'exécution ou depuis un fichier,
+    # et range les règles dans une TableRegles. Les lignes de journal sont ignorées, sauf
+    # les statistiques de chargement et de minage qui sont conservées dans self.stats.
+    def __init__(self, table=None):
+        self.table = table if table is not None else TableRegles()
+        self.stats = {}
+        self.colonnes = list(ORDRE_AMIE_DEFAUT)
+        self.erreurs = 0
+
+    def alimenter(self, ligne):
+        ligne = ligne.rstrip("\r\n")
+        if "\t" in ligne:
+            champs = ligne.split("\t")
+            if champs[0].rstrip().endswith("Rule") and "=>" not in champs[0]:
+                # En-tête : AMIE l'écrit parfois à la suite de "Starting the mining phase..."
+                champs[0] = "Rule"
+                self.colonnes = [ENTETES_AMIE.get(c.strip(), c.strip()) for c in champs]
+                return None
+            if "=>" in champs[0]:
+                return self._ajouter_regle(champs)
+            return None
+        self._analyser_journal(ligne)
+        return None
+
+    def alimenter_lignes(self, lignes):
+        debut = self.table.n
+        for ligne in lignes:
+            self.alimenter(ligne)
+        return range(debut, self.table.n)
+
+    def _ajouter_regle(self, champs):
+        valeurs = dict(zip(self.colonnes, champs))
+        metriques = {}
+        try:
+            for nom, dtype in COLONNES_METRIQUES:
+                if nom in valeurs:
+                    metriques[nom] = float(valeurs[nom]) if dtype is np.float64 else int(valeurs[nom])
+            return self.table.ajouter_texte(valeurs["rule"], metriques, valeurs.get("functional_variable", "").strip())
+        except ValueError:
+            self.erreurs += 1
+            return None
+
+    def _analyser_journal(self, ligne):
+        ligne = ligne.strip()
+        m = _PREFIXE.match(ligne)
+        if m:
+            self.table.prefixes[m.group(1)] = m.group(2)
+            return
+        m = _CHARGEMENT.search(ligne)
+        if m:
+            self.stats["nb_faits"] = int(m.group(1))
+            self.stats["temps_chargement"] = float(m.group(2))
+            self.stats["memoire_chargement_mo"] = int(m.group(3))
+            return
+        m = _MINAGE.search(ligne)
+        if m:
+            self.stats["temps_minage"] = float(m.group(1))
+            return
+        m = _TOTAL.search(ligne)
+        if m:
+            self.stats["temps_total"] = float(m.group(1))
+            return
+        m = _NB_REGLES.match(ligne)
+        if m:
+            self.stats["nb_regles"] = int(m.group(1))
+
+def lire_sortie_amie(path):
+    parseur = ParseurAmie()
+    with open(path, "r", encoding="utf-8") as f:
+        for ligne in f:
+            parseur.alimenter(ligne)
+    return parseur
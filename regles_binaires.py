@@ -0,0 +1,157 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import tempfile
+
+import numpy as np
+
+from regles_amie import TableRegles, COLONNES_METRIQUES
+from index_triplets import TermesDisque
+
+# <-------------------------->
+# Format binaire en colonnes d'un ensemble de règles
+# <-------------------------->
+# Disposition du fichier (.regles) :
+#   MAGIE (8 octets) | taille de l'en-tête (uint64, petit-boutiste) | en-tête JSON | sections
+# L'en-tête donne, pour chaque section, son décalage (aligné sur ALIGNEMENT octets), sa taille, son
+# type NumPy, sa forme et sa compression éventuelle. Sections : une colonne par métrique, la variable
+# fonctionnelle, les bornes des atomes de chaque règle, les atomes (sujet, prédicat, objet) en
+# identifiants de termes, et le dictionnaire des termes (textes concaténés, bornes, ordre alphabétique).
+MAGIE = b"LLCRGL\x00\x01"
+VERSION_FORMAT = 1
+ALIGNEMENT = 64
+EXTENSION_BINAIRE = ".regles"
+
+# Sections compressibles : les colonnes de métriques ne le sont jamais, pour rester projetées en
+# mémoire (filtrer ou trier par confiance ne lit qu'elles)
+SECTIONS_COMPRESSIBLES = ("atomes", "termes", "termes_debuts", "termes_ordre")
+
+def est_fichier_binaire(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIE)) == MAGIE
+    except OSError:
+        return False
+
+def _sections(table):
+    textes = [table.termes[i].encode("utf-8") for i in range(len(table.termes))]
+    debuts = np.zeros(len(textes) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in textes], out=debuts[1:])
+    sections = [(nom, np.ascontiguousarray(table.colonne(nom), dtype=dtype)) for nom, dtype in COLONNES_METRIQUES]
+    sections += [
+        ("functional_variable", np.ascontiguousarray(table.colonne("functional_variable"), dtype=np.int32)),
+        ("debut", np.ascontiguousarray(table.debut_atomes, dtype=np.int64)),
+        ("atomes", np.ascontiguousarray(table.atomes, dtype=np.int32)),
+        ("termes_debuts", debuts),
+        ("termes_ordre", np.array(sorted(range(len(textes)), key=textes.__getitem__), dtype=np.int32)),
+        ("termes", np.frombuffer(b"".join(textes), dtype=np.uint8)),
+    ]
+    return sections
+
+def ecrire_regles_binaire(table, path, compresser=False):
+    # Écrit la table dans un fichier temporaire renommé à la fin : un lecteur ne voit jamais de fichier partiel
+    donnees, entete = [], {"version": VERSION_FORMAT, "regles": len(table), "atomes": len(table.atomes),
+                           "termes": len(table.termes), "prefixes": table.prefixes, "sections": {}}
+    for nom, valeurs in _sections(table):
+        octets = valeurs.tobytes()
+        compression = None
+        if compresser and nom in SECTIONS_COMPRESSIBLES and octets:
+            octets = zlib.compress(octets, 6)
+            compression = "zlib"
+        entete["sections"][nom] = {"dtype": valeurs.dtype.str, "forme": list(valeurs.shape), "taille": len(octets),
+                                   "compression": compression}
+        donnees.append((nom, octets))
+    # Les décalages dépendent de la taille de l'en-tête, qui dépend des décalages : place réservée
+    # pour l'en-tête agrandie jusqu'à ce qu'il y tienne
+    reserve = len(json.dumps(entete).encode("utf-8"))
+    while True:
+        position = _aligner(len(MAGIE) + 8 + reserve)
+        for nom, octets in donnees:
+            entete["sections"][nom]["decalage"] = position
+            position = _aligner(position + len(octets))
+        texte_entete = json.dumps(entete).encode("utf-8")
+        if len(texte_entete) <= reserve:
+            break
+        reserve = len(texte_entete) + ALIGNEMENT
+    dossier = os.path.dirname(os.path.abspath(path))
+    fd, temporaire = tempfile.mkstemp(dir=dossier, prefix=".tmp-", suffix=EXTENSION_BINAIRE)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIE)
+            f.write(struct.pack("<Q", len(texte_entete)))
+            f.write(texte_entete)
+            for nom, octets in donnees:
+                f.seek(entete["sections"][nom]["decalage"])
+                f.write(octets)
+            f.truncate(position)
+        os.replace(temporaire, path)
+    finally:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+    return position
+
+def _aligner(position):
+    return (position + ALIGNEMENT - 1) // ALIGNEMENT * ALIGNEMENT
+
+# <-------------------------->
+# Lecture projetée en mémoire
+# <-------------------------->
+class TableReglesProjetee(TableRegles):
+    # TableRegles dont les colonnes sont des vues sur le fichier projeté en mémoire : l'ouverture
+    # ne lit que l'en-tête, et seules les pages des colonnes effectivement consultées sont lues
+    # (filtrer(pca_confidence=0.9) ne touche ni aux atomes ni aux textes). Les sections compressées
+    # sont décompressées à l'ouverture. Des règles peuvent être ajoutées : les colonnes sont alors
+    # recopiées en mémoire, le fichier n'est jamais modifié.
+    def __init__(self, path):
+        super().__init__(capacite=0)
+        self.path = path
+        self._fichier = open(path, "rb")
+        try:
+            taille = os.fstat(self._fichier.fileno()).st_size
+            self._projection = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ) if taille else b""
+            if self._projection[:len(MAGIE)] != MAGIE:
+                raise ValueError(f"{path} n'est pas un fichier de règles binaire")
+            (longueur,) = struct.unpack("<Q", self._projection[len(MAGIE):len(MAGIE) + 8])
+            entete = json.loads(bytes(self._projection[len(MAGIE) + 8:len(MAGIE) + 8 + longueur]).decode("utf-8"))
+            if entete.get("version") != VERSION_FORMAT:
+                raise ValueError(f"Version de format non prise en charge : {entete.get('version')}")
+        except Exception:
+            self.fermer()
+            raise
+        self.entete = entete
+        self.prefixes.update(entete["prefixes"])
+        self.n = entete["regles"]
+        self.n_atomes = entete["atomes"]
+        sections = entete["sections"]
+        self._colonnes = {nom: self._section(sections[nom]) for nom, _ in COLONNES_METRIQUES}
+        self._variable_fonctionnelle = self._section(sections["functional_variable"])
+        self._debut = self._section(sections["debut"])
+        self._atomes = self._section(sections["atomes"])
+        termes = sections["termes"]
+        if termes["compression"]:
+            textes, base = zlib.decompress(self._octets(termes)), 0
+        else:
+            textes, base = self._projection, termes["decalage"]
+        self.termes = self._ids_termes = TermesDisque(
+            self._section(sections["termes_debuts"]), self._section(sections["termes_ordre"]), textes, base=base
+        )
+
+    def _octets(self, section):
+        return self._projection[section["decalage"]:section["decalage"] + section["taille"]]
+
+    def _section(self, section):
+        dtype, forme = np.dtype(section["dtype"]), tuple(section["forme"])
+        if section["compression"]:
+            return np.frombuffer(zlib.decompress(self._octets(section)), dtype=dtype).reshape(forme)
+        if not section["taille"]:
+            return np.zeros(forme, dtype=dtype)
+        return np.ndarray(forme, dtype=dtype, buffer=self._projection, offset=section["decalage"])
+
+    def fermer(self):
+        # Les vues NumPy gardent la projection ouverte tant qu'elles existent
+        self._fichier.close()
+
+def charger_regles_binaire(path):
+    return TableReglesProjetee(path)
@@ -0,0 +1,263 @@
+import re
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from filtrage import PREFIXES_CONNUS, RDF_TYPE
+from index_triplets import normaliser_constante
+
+# Requêtes préparées et résultats gardés en mémoire (les plus anciens sont oubliés)
+TAILLE_CACHE_REQUETES = 256
+
+_JETON = re.compile(r'\s*(<[^>\s]*>|"(?:[^"\\]|\\.)*"(?:@[\w-]+|\^\^\S+)?|#[^\n]*|[?$]\w+|[{}.;,*]|[^\s{}.;,#]+(?:\.[^\s{}.;,#]+)*)')
+
+def decouper_requete(texte):
+    # Jetons d'une requête ; les commentaires (# jusqu'à la fin de la ligne) sont ignorés
+    jetons = []
+    position = 0
+    while position < len(texte):
+        m = _JETON.match(texte, position)
+        if m is None:
+            if texte[position:].strip():
+                raise ValueError(f"Requête illisible près de : {texte[position:position + 30]!r}")
+            break
+        if not m.group(1).startswith("#"):
+            jetons.append(m.group(1))
+        position = m.end()
+    return jetons
+
+# <-------------------------->
+# Requêtes préparées
+# <-------------------------->
+class RequetePreparee:
+    # Sous-ensemble de SPARQL : PREFIX, SELECT [DISTINCT] ?x ... | *, WHERE { motifs de triplets
+    # séparés par "." avec les raccourcis ";" et "," }, LIMIT, OFFSET. Sans SELECT, le texte est
+    # lu comme une suite de motifs et toutes les variables sont renvoyées.
+    def __init__(self, texte):
+        self.texte = texte
+        self.prefixes = dict(PREFIXES_CONNUS)
+        self.variables = []
+        self.distinct = False
+        self.limite = None
+        self.decalage = 0
+        self.motifs = []  # (sujet, prédicat, objet) : "?x" ou texte d'un terme de l'index
+        self._analyser(decouper_requete(texte))
+        variables_motifs = []
+        for motif in self.motifs:
+            for terme in motif:
+                if terme.startswith("?") and terme not in variables_motifs:
+                    variables_motifs.append(terme)
+        if not variables_motifs:
+            raise ValueError("La requête doit contenir au moins une variable.")
+        inconnues = [v for v in self.variables if v not in variables_motifs]
+        if inconnues:
+            raise ValueError(f"Variables absentes des motifs : {', '.join(inconnues)}")
+        self.variables = self.variables or variables_motifs
+
+    @property
+    def cle(self):
+        return (tuple(self.motifs), tuple(self.variables), self.distinct, self.limite, self.decalage)
+
+    def _analyser(self, jetons):
+        k = 0
+        while k < len(jetons) and jetons[k].upper() == "PREFIX":
+            if k + 2 >= len(jetons) or not jetons[k + 1].endswith(":") or not jetons[k + 2].startswith("<"):
+                raise ValueError("Déclaration PREFIX attendue : PREFIX nom: <iri>")
+            self.prefixes[jetons[k + 1][:-1]] = jetons[k + 2][1:-1]
+            k += 3
+        if k < len(jetons) and jetons[k].upper() == "SELECT":
+            k += 1
+            if k < len(jetons) and jetons[k].upper() == "DISTINCT":
+                self.distinct = True
+                k += 1
+            while k < len(jetons) and jetons[k] not in ("{",) and jetons[k].upper() != "WHERE":
+                if jetons[k] != "*":
+                    if not jetons[k][:1] in "?$":
+                        raise ValueError(f"Variable attendue après SELECT : {jetons[k]}")
+                    self.variables.append("?" + jetons[k][1:])
+                k += 1
+            if k < len(jetons) and jetons[k].upper() == "WHERE":
+                k += 1
+            if k >= len(jetons) or jetons[k] != "{":
+                raise ValueError("Bloc WHERE { ... } attendu")
+            fin = jetons.index("}", k) if "}" in jetons[k:] else -1
+            if fin < 0:
+                raise ValueError("Accolade fermante manquante")
+            self._motifs(jetons[k + 1:fin])
+            self._modificateurs(jetons[fin + 1:])
+        else:
+            self._motifs(jetons[k:])
+
+    def _modificateurs(self, jetons):
+        k = 0
+        while k < len(jetons):
+            mot = jetons[k].upper()
+            if mot in ("LIMIT", "OFFSET") and k + 1 < len(jetons) and jetons[k + 1].isdigit():
+                if mot == "LIMIT":
+                    self.limite = int(jetons[k + 1])
+                else:
+                    self.decalage = int(jetons[k + 1])
+                k += 2
+            else:
+                raise ValueError(f"Non pris en charge : {jetons[k]}")
+
+    def _motifs(self, jetons):
+        termes = []
+        sujet = predicat = None
+        precedent = "."  # séparateur qui a terminé le motif précédent
+        for jeton in jetons + ["."]:
+            if jeton not in (".", ";", ","):
+                if jeton.upper() in ("FILTER", "OPTIONAL", "UNION", "MINUS", "GRAPH", "BIND", "VALUES"):
+                    raise ValueError(f"Non pris en charge : {jeton}")
+                en_predicat = len(termes) == (1 if precedent == "." else 0) and precedent != ","
+                termes.append(self._terme(jeton, en_predicat))
+                continue
+            if not termes:
+                # "; ." en fin de bloc est accepté
+                if jeton == ".":
+                    precedent = "."
+                continue
+            if len(termes) == 3 and precedent == ".":
+                sujet, predicat, objet = termes
+            elif len(termes) == 2 and precedent == ";":
+                predicat, objet = termes
+            elif len(termes) == 1 and precedent == ",":
+                objet = termes[0]
+            else:
+                raise ValueError(f"Motif de triplet incomplet : {' '.join(termes)}")
+            self.motifs.append((sujet, predicat, objet))
+            precedent = jeton
+            termes = []
+
+    def _terme(self, jeton, en_predicat):
+        if jeton[:1] in "?$":
+            return "?" + jeton[1:]
+        if jeton == "a" and en_predicat:
+            return RDF_TYPE
+        if jeton.startswith("<") or jeton.startswith('"'):
+            return normaliser_constante(jeton)
+        prefixe, sep, local = jeton.partition(":")
+        if sep and prefixe in self.prefixes:
+            return self.prefixes[prefixe] + local
+        if sep and not local.startswith("//"):
+            raise ValueError(f"Préfixe inconnu : {prefixe}:")
+        return jeton
+
+# <-------------------------->
+# Résultats
+# <-------------------------->
+class ResultatRequete:
+    # Identifiants des termes liés à chaque variable ; les textes ne sont lus que pour les lignes affichées
+    def __init__(self, requete, colonnes, termes, duree):
+        self.variables = requete.variables
+        self.colonnes = colonnes  # variable -> tableau d'identifiants
+        self.termes = termes
+        self.duree = duree
+
+    def __len__(self):
+        return len(self.colonnes[self.variables[0]]) if self.variables else 0
+
+    def ligne(self, i):
+        return tuple(self.termes[int(self.colonnes[v][i])] for v in self.variables)
+
+    def page(self, numero, taille=100):
+        debut = numero * taille
+        return [self.ligne(i) for i in range(debut, min(debut + taille, len(self)))]
+
+    def nb_pages(self, taille=100):
+        return max(1, (len(self) + taille - 1) // taille)
+
+# <-------------------------->
+# Service de requêtes sur un index de triplets
+# <-------------------------->
+class ServiceRequetes:
+    # Les requêtes préparées (déjà analysées) sont gardées par texte de requête, et leurs résultats
+    # tant que l'index interrogé reste celui de la même ontologie.
+    def __init__(self, taille_cache=TAILLE_CACHE_REQUETES):
+        self.index = None
+        self.empreinte = None
+        self.taille_cache = taille_cache
+        self._preparees = OrderedDict()  # texte -> RequetePreparee
+        self._resultats = OrderedDict()  # RequetePreparee.cle -> ResultatRequete
+        self.hits = 0
+        self.misses = 0
+        self.dernier_hit = False
+
+    def lier(self, index, empreinte):
+        # Un autre contenu d'ontologie invalide les résultats (les requêtes préparées restent valables)
+        if empreinte != self.empreinte or index is not self.index:
+            self._resultats.clear()
+        self.index = index
+        self.empreinte = empreinte
+
+    def _memoriser(self, cache, cle, valeur):
+        cache[cle] = valeur
+        cache.move_to_end(cle)
+        while len(cache) > self.taille_cache:
+            cache.popitem(last=False)
+
+    def preparer(self, texte):
+        texte = texte.strip()
+        requete = self._preparees.get(texte)
+        if requete is None:
+            requete = RequetePreparee(texte)
+        self._memoriser(self._preparees, texte, requete)
+        return requete
+
+    def executer(self, texte):
+        if self.index is None:
+            raise ValueError("Aucune ontologie à interroger.")
+        requete = self.preparer(texte)
+        resultat = self._resultats.get(requete.cle)
+        self.dernier_hit = resultat is not None
+        if resultat is not None:
+            self.hits += 1
+            self._resultats.move_to_end(requete.cle)
+            return resultat
+        self.misses += 1
+        debut = time.perf_counter()
+        resultat = ResultatRequete(requete, self._evaluer(requete), self.index.termes, 0.0)
+        resultat.duree = time.perf_counter() - debut
+        self._memoriser(self._resultats, requete.cle, resultat)
+        return resultat
+
+    def _evaluer(self, requete):
+        index = self.index
+        atomes = [tuple(t if t.startswith("?") else index.chercher_terme(t) for t in motif) for motif in requete.motifs]
+        liaisons = self._joindre(atomes)
+        colonnes = [np.asarray(liaisons[v], dtype=np.int32) for v in requete.variables]
+        if requete.distinct and len(colonnes[0]):
+            # Lignes distinctes, dans l'ordre de leur première apparition
+            _, premieres = np.unique(np.stack(colonnes, axis=1), axis=0, return_index=True)
+            premieres.sort()
+            colonnes = [c[premieres] for c in colonnes]
+        fin = None if requete.limite is None else requete.decalage + requete.limite
+        return {v: c[requete.decalage:fin] for v, c in zip(requete.variables, colonnes)}
+
+    def _joindre(self, atomes):
+        # L'index ne sait joindre que des prédicats connus : un prédicat variable est remplacé tour
+        # à tour par chaque prédicat de l'index et les résultats sont mis bout à bout
+        variable = next((p for _, p, _ in atomes if isinstance(p, str)), None)
+        if variable is None:
+            return self.index.joindre(atomes)
+        variables = [t for a in atomes for t in (a[0], a[2]) if isinstance(t, str)] + [variable]
+        morceaux = []
+        for predicat in self.index.faits:
+            substitues = [tuple(predicat if t == variable else t for t in a) for a in atomes]
+            if any(isinstance(t, str) for a in substitues for t in a):
+                liaisons = self._joindre(substitues)
+                n = len(next(iter(liaisons.values())))
+            else:
+                liaisons, n = {}, int(all(self._fait_present(a) for a in substitues))
+            if n:
+                liaisons[variable] = np.full(n, predicat, dtype=np.int32)
+                morceaux.append(liaisons)
+        if not morceaux:
+            return {v: np.zeros(0, dtype=np.int32) for v in variables}
+        return {v: np.concatenate([m[v] for m in morceaux]) for v in dict.fromkeys(variables)}
+
+    def _fait_present(self, atome):
+        s, p, o = atome
+        faits = self.index.faits.get(p)
+        return faits is not None and s >= 0 and o >= 0 and bool(faits.contient([s], [o])[0])
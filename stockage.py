@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from execution_amie import ExecutionAmie
+from regles_amie import TableRegles, COLONNES_METRIQUES
+
+def chemin_base_defaut():
+    racine = os.environ.get("LLC_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "extracteur_llc")
+    return os.path.join(racine, "executions.sqlite")
+
+_METRIQUES = [nom for nom, _ in COLONNES_METRIQUES]
+_STATS = ["nb_faits", "temps_chargement", "memoire_chargement_mo", "temps_minage", "temps_total", "nb_regles"]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY,
+    empreinte_ontologie TEXT,
+    cle_entree TEXT,
+    ontologie TEXT,
+    minc REAL,
+    minpca REAL,
+    const INTEGER,
+    nc INTEGER,
+    commande TEXT,
+    date REAL,
+    duree REAL,
+    statut TEXT,
+    {", ".join(f"{nom} REAL" for nom in _STATS)},
+    prefixes TEXT,
+    sortie BLOB
+);
+CREATE INDEX IF NOT EXISTS executions_configuration ON executions (cle_entree, minc, minpca, const);
+CREATE INDEX IF NOT EXISTS executions_ontologie ON executions (empreinte_ontologie);
+CREATE TABLE IF NOT EXISTS regles (
+    execution_id INTEGER REFERENCES executions (id) ON DELETE CASCADE,
+    numero INTEGER,
+    regle TEXT,
+    tete TEXT,
+    {", ".join(f"{nom} {'REAL' if dtype is np.float64 else 'INTEGER'}" for nom, dtype in COLONNES_METRIQUES)},
+    functional_variable TEXT,
+    PRIMARY KEY (execution_id, numero)
+);
+CREATE INDEX IF NOT EXISTS regles_regle ON regles (regle);
+{"".join(f"CREATE INDEX IF NOT EXISTS regles_{nom} ON regles ({nom});" for nom in _METRIQUES)}
+"""
+
+# <-------------------------->
+# Historique des exécutions d'AMIE (SQLite)
+# <-------------------------->
+class StockageExecutions:
+    # Une ligne par exécution (paramètres, ligne de commande, durées, statistiques de chargement
+    # affichées par AMIE) et une ligne par règle, indexée sur ses métriques. Une configuration
+    # déjà minée (même entrée, mêmes -minc, -minpca, -const) est retrouvée par chercher().
+    # La connexion est partagée entre threads (fins d'exécution du balayage), protégée par un verrou.
+    def __init__(self, path=None):
+        self.path = path or chemin_base_defaut()
+        dossier = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dossier, exist_ok=True)
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(self.path, check_same_thread=False)
+        self._connexion.row_factory = sqlite3.Row
+        self._connexion.execute("PRAGMA foreign_keys = ON")
+        self._connexion.execute("PRAGMA journal_mode = WAL")
+        self._connexion.executescript(_SCHEMA)
+
+    def enregistrer(self, regles, empreinte_ontologie, cle_entree, minc, minpca, const=False, nc=None,
+                    commande=None, statut=None, duree=None, stats=None, lignes=None, ontologie=None, date=None):
+        # Renvoie l'identifiant de l'exécution enregistrée
+        stats = stats or {}
+        sortie = zlib.compress("\n".join(lignes).encode("utf-8")) if lignes is not None else None
+        with self._verrou, self._connexion:
+            curseur = self._connexion.execute(
+                f"INSERT INTO executions (empreinte_ontologie, cle_entree, ontologie, minc, minpca, const, nc, commande, "
+                f"date, duree, statut, {', '.join(_STATS)}, prefixes, sortie) "
+                f"VALUES ({', '.join('?' * (13 + len(_STATS)))})",
+                [empreinte_ontologie, cle_entree, ontologie, float(minc), float(minpca), int(bool(const)),
+                 int(nc) if nc not in (None, "") else None, json.dumps(commande) if commande else None,
+                 date or time.time(), duree, statut] + [stats.get(nom) for nom in _STATS]
+                + [json.dumps(regles.prefixes), sortie]
+            )
+            execution_id = curseur.lastrowid
+            colonnes = [regles.colonne(nom) for nom in _METRIQUES]
+            variables = regles.colonne("functional_variable")
+            predicats = regles.predicats_tete()
+            self._connexion.executemany(
+                f"INSERT INTO regles VALUES ({', '.join('?' * (5 + len(_METRIQUES)))})",
+                ([execution_id, i, regles.texte_regle(i), regles.termes[predicats[i]]]
+                 + [c[i].item() for c in colonnes] + [regles.termes[variables[i]]] for i in range(len(regles)))
+            )
+        return execution_id
+
+    def chercher(self, cle_entree, minc, minpca, const=False, statut=ExecutionAmie.TERMINE):
+        # Dernière exécution terminée pour cette configuration, ou None
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT * FROM executions WHERE cle_entree = ? AND minc = ? AND minpca = ? AND const = ? AND statut = ? "
+                "ORDER BY date DESC LIMIT 1",
+                (cle_entree, float(minc), float(minpca), int(bool(const)), statut)
+            ).fetchone()
+        return dict(ligne) if ligne is not None else None
+
+    def execution(self, execution_id):
+        with self._verrou:
+            ligne = self._connexion.execute("SELECT * FROM executions WHERE id = ?", (execution_id,)).fetchone()
+        return dict(ligne) if ligne is not None else None
+
+    def executions(self, empreinte_ontologie=None, limite=200):
+        # Exécutions les plus récentes, avec un résumé de leurs règles
+        requete = (
+            "SELECT e.id, e.ontologie, e.minc, e.minpca, e.const, e.nc, e.date, e.duree, e.statut, e.nb_faits, "
+            "e.temps_chargement, COUNT(r.numero) AS nb_regles, AVG(r.pca_confidence) AS pca_moyenne, "
+            "MAX(r.pca_confidence) AS pca_max, AVG(r.head_coverage) AS hc_moyenne "
+            "FROM executions e LEFT JOIN regles r ON r.execution_id = e.id "
+        )
+        parametres = []
+        if empreinte_ontologie:
+            requete += "WHERE e.empreinte_ontologie = ? "
+            parametres.append(empreinte_ontologie)
+        requete += "GROUP BY e.id ORDER BY e.date DESC LIMIT ?"
+        parametres.append(limite)
+        with self._verrou:
+            return [dict(l) for l in self._connexion.execute(requete, parametres)]
+
+    def charger_regles(self, execution_id, table=None):
+        # Reconstruit la TableRegles d'une exécution, sans relancer AMIE
+        execution = self.execution(execution_id)
+        if execution is None:
+            return None
+        table = table if table is not None else TableRegles()
+        table.prefixes.update(json.loads(execution["prefixes"] or "{}"))
+        with self._verrou:
+            lignes = self._connexion.execute(
+                f"SELECT regle, {', '.join(_METRIQUES)}, functional_variable FROM regles "
+                f"WHERE execution_id = ? ORDER BY numero", (execution_id,)
+            ).fetchall()
+        for ligne in lignes:
+            table.ajouter_texte(ligne["regle"], {nom: ligne[nom] for nom in _METRIQUES}, ligne["functional_variable"])
+        return table
+
+    def sortie(self, execution_id):
+        # Lignes affichées par AMIE lors de l'exécution
+        with self._verrou:
+            ligne = self._connexion.execute("SELECT sortie FROM executions WHERE id = ?", (execution_id,)).fetchone()
+        if ligne is None or ligne["sortie"] is None:
+            return []
+        return zlib.decompress(ligne["sortie"]).decode("utf-8").split("\n")
+
+    def chercher_regles(self, execution_ids=None, tete=None, tri="pca_confidence", limite=1000, **seuils):
+        # chercher_regles(pca_confidence=0.8, positive_examples=(10, None)) : bornes min, ou (min, max)
+        conditions, parametres = [], []
+        if execution_ids is not None:
+            execution_ids = list(execution_ids)
+            conditions.append(f"execution_id IN ({', '.join('?' * len(execution_ids))})")
+            parametres.extend(execution_ids)
+        if tete is not None:
+            conditions.append("tete = ?")
+            parametres.append(tete)
+        for nom, seuil in seuils.items():
+            if nom not in _METRIQUES:
+                raise ValueError(f"Métrique inconnue : {nom}")
+            bas, haut = seuil if isinstance(seuil, tuple) else (seuil, None)
+            if bas is not None:
+                conditions.append(f"{nom} >= ?")
+                parametres.append(bas)
+            if haut is not None:
+                conditions.append(f"{nom} <= ?")
+                parametres.append(haut)
+        if tri not in _METRIQUES:
+            raise ValueError(f"Métrique inconnue : {tri}")
+        requete = "SELECT * FROM regles"
+        if conditions:
+            requete += " WHERE " + " AND ".join(conditions)
+        requete += f" ORDER BY {tri} DESC LIMIT ?"
+        parametres.append(limite)
+        with self._verrou:
+            return [dict(l) for l in self._connexion.execute(requete, parametres)]
+
+    def supprimer(self, execution_id):
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM executions WHERE id = ?", (execution_id,))
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
+
+def tableau_executions(executions):
+    # Une ligne par exécution enregistrée, colonnes alignées
+    entetes = ["n°", "date", "minc", "minpca", "const", "nc", "statut", "durée (s)", "faits", "règles", "PCA moy.", "PCA max", "HC moy."]
+    lignes = [entetes]
+    for e in executions:
+        lignes.append([
+            str(e["id"]), time.strftime("%Y-%m-%d %H:%M", time.localtime(e["date"])), f"{e['minc']:g}", f"{e['minpca']:g}",
+            "oui" if e["const"] else "non", str(e["nc"] or "-"), e["statut"] or "-",
+            f"{e['duree']:.1f}" if e["duree"] is not None else "-", str(int(e["nb_faits"])) if e["nb_faits"] is not None else "-",
+            str(e["nb_regles"]), f"{e['pca_moyenne'] or 0:.4f}", f"{e['pca_max'] or 0:.4f}", f"{e['hc_moyenne'] or 0:.4f}",
+        ])
+    largeurs = [max(len(l[k]) for l in lignes) for k in range(len(entetes))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(l, largeurs)).rstrip() for l in lignes)
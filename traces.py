@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mémoire maximale
+    resource = None
+
+# Ordre d'affichage des étapes du pipeline (les autres suivent, dans l'ordre de leur première mesure)
+ORDRE_ETAPES = ["chargement", "fusion", "conversion", "filtrage", "amie", "demarrage_jvm", "chargement_amie", "minage_amie",
+                "balayage", "analyse_regles", "elagage", "affichage", "index", "qualite", "sauvegarde"]
+
+# Traces d'exécution gardées dans le cache (les plus anciennes sont supprimées)
+NB_TRACES_CONSERVEES = 50
+
+def dossier_traces_defaut():
+    racine = os.environ.get("LLC_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "extracteur_llc")
+    return os.path.join(racine, "traces")
+
+def rss_en_mo(ru_maxrss):
+    # ru_maxrss (getrusage, wait4) est en octets sous macOS, en kilo-octets ailleurs
+    return ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def memoire_max_mo():
+    # Mémoire résidente maximale atteinte jusqu'ici par le processus, en Mo
+    if resource is None:
+        return None
+    return rss_en_mo(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def _lire_pic_linux():
+    # VmHWM : pic de mémoire résidente depuis le lancement, ou depuis la dernière remise à zéro (en Mo)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def _remettre_pic_a_zero():
+    # Linux : écrire 5 dans clear_refs ramène VmHWM à la mémoire résidente courante
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+class _PicsMemoire:
+    # Pic de mémoire résidente de chaque étape en cours. Sous Linux, le pic du processus est remis à zéro
+    # au début de chaque étape ; les étapes déjà en cours (imbriquées, ou dans un autre thread) relèvent
+    # d'abord le pic atteint jusque-là. Ailleurs, seul le pic du processus est connu : une étape n'a de
+    # pic que si elle l'a fait monter (sinon il est resté sous un pic antérieur, inconnu : None).
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._en_cours = {}  # jeton -> pic relevé (Mo) ou pic du processus au début de l'étape
+        self._remise_a_zero = sys.platform.startswith("linux") and _lire_pic_linux() is not None
+
+    def debut(self):
+        jeton = object()
+        with self._verrou:
+            if self._remise_a_zero:
+                pic = _lire_pic_linux()
+                for autre in self._en_cours:
+                    self._en_cours[autre] = max(self._en_cours[autre] or 0.0, pic or 0.0)
+                self._remise_a_zero = _remettre_pic_a_zero()
+                self._en_cours[jeton] = _lire_pic_linux() if self._remise_a_zero else None
+            else:
+                self._en_cours[jeton] = memoire_max_mo()
+        return jeton
+
+    def fin(self, jeton):
+        with self._verrou:
+            releve = self._en_cours.pop(jeton)
+            if self._remise_a_zero:
+                pic = _lire_pic_linux()
+                return None if pic is None else max(pic, releve or 0.0)
+            pic = memoire_max_mo()
+            if pic is None or releve is None or pic <= releve:
+                return None
+            return pic
+
+_pics_memoire = _PicsMemoire()
+
+# <-------------------------->
+# Étapes et traces
+# <-------------------------->
+class Etape:
+    # Mesures d'une étape du pipeline. "source" vaut "amie" pour les phases d'une exécution d'AMIE3
+    # (démarrage du JVM, chargement et minage lus dans son journal), déjà comptées dans l'étape "amie".
+    def __init__(self, nom, source="mesure"):
+        self.nom = nom
+        self.source = source
+        self.duree = 0.0
+        self.cpu = None
+        self.memoire_max_mo = None
+        self.nb_appels = 0
+        self.compteurs = {}
+
+    def vers_dict(self):
+        return {"nom": self.nom, "source": self.source, "duree": self.duree, "cpu": self.cpu,
+                "memoire_max_mo": self.memoire_max_mo, "nb_appels": self.nb_appels, "compteurs": self.compteurs}
+
+    @classmethod
+    def depuis_dict(cls, d):
+        etape = cls(d["nom"], d.get("source", "mesure"))
+        etape.duree = d.get("duree", 0.0)
+        etape.cpu = d.get("cpu")
+        etape.memoire_max_mo = d.get("memoire_max_mo")
+        etape.nb_appels = d.get("nb_appels", 1)
+        etape.compteurs = d.get("compteurs", {})
+        return etape
+
+class TraceExecution:
+    # Durée, temps CPU, pic de mémoire résidente et effectifs (faits, règles) de chaque étape d'une exécution.
+    # Une étape mesurée plusieurs fois (analyse et affichage des lignes d'AMIE, reçues par lots) cumule
+    # ses durées. Le temps CPU est celui du processus entier (threads compris) ; pour AMIE3, celui du JVM.
+    def __init__(self, nom=""):
+        self.nom = nom
+        self.debut = datetime.datetime.now().isoformat(timespec="seconds")
+        self.etapes = {}  # nom -> Etape
+        self.infos = {}   # paramètres de l'exécution (ontologie, -minc, ...)
+        self.chemin = None
+
+    def __len__(self):
+        return len(self.etapes)
+
+    def etape(self, nom, source="mesure"):
+        if nom not in self.etapes:
+            self.etapes[nom] = Etape(nom, source)
+        return self.etapes[nom]
+
+    @contextmanager
+    def mesurer(self, nom, **compteurs):
+        # with trace.mesurer("conversion") as etape: ... ; etape.compteurs["faits"] = n
+        etape = self.etape(nom)
+        etape.compteurs.update(compteurs)
+        jeton = _pics_memoire.debut()
+        debut, debut_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield etape
+        finally:
+            etape.duree += time.perf_counter() - debut
+            etape.cpu = (etape.cpu or 0.0) + time.process_time() - debut_cpu
+            pic = _pics_memoire.fin(jeton)
+            if pic is not None:
+                etape.memoire_max_mo = max(etape.memoire_max_mo or 0.0, pic)
+            etape.nb_appels += 1
+
+    def ajouter(self, nom, duree, cpu=None, memoire_max_mo=None, source="mesure", **compteurs):
+        # Étape mesurée ailleurs (sous-processus, journal d'AMIE3)
+        etape = self.etape(nom, source)
+        etape.duree += duree
+        if cpu is not None:
+            etape.cpu = (etape.cpu or 0.0) + cpu
+        if memoire_max_mo is not None:
+            etape.memoire_max_mo = max(etape.memoire_max_mo or 0.0, memoire_max_mo)
+        etape.nb_appels += 1
+        etape.compteurs.update(compteurs)
+        return etape
+
+    def etapes_ordonnees(self):
+        rang = {nom: k for k, nom in enumerate(ORDRE_ETAPES)}
+        return sorted(self.etapes.values(), key=lambda e: rang.get(e.nom, len(rang)))
+
+    def duree_totale(self):
+        # Les phases d'AMIE3 sont incluses dans la durée de l'étape "amie" : elles ne s'ajoutent pas
+        return sum(e.duree for e in self.etapes.values() if e.source == "mesure")
+
+    def lignes(self):
+        # (étape, durée, part du total en %, cpu, mémoire max, compteurs) pour l'affichage
+        total = self.duree_totale() or 1.0
+        return [(e.nom if e.source == "mesure" else f"  {e.nom}", e.duree, 100 * e.duree / total, e.cpu, e.memoire_max_mo,
+                 ", ".join(f"{k} : {v}" for k, v in e.compteurs.items()))
+                for e in self.etapes_ordonnees()]
+
+    def tableau(self):
+        entete = f"{'Étape':<22} {'Durée (s)':>10} {'%':>6} {'CPU (s)':>9} {'Pic (Mo)':>10}  Détails"
+        lignes = [entete, "-" * len(entete)]
+        for nom, duree, part, cpu, memoire, details in self.lignes():
+            cpu = "-" if cpu is None else f"{cpu:.3f}"
+            memoire = "-" if memoire is None else f"{memoire:.1f}"
+            lignes.append(f"{nom:<22} {duree:>10.3f} {part:>6.1f} {cpu:>9} {memoire:>10}  {details}")
+        return "\n".join(lignes)
+
+    def vers_dict(self):
+        return {"nom": self.nom, "debut": self.debut, "infos": self.infos, "duree_totale": self.duree_totale(),
+                "etapes": [e.vers_dict() for e in self.etapes_ordonnees()]}
+
+    def sauvegarder(self, chemin=None, dossier=None):
+        # Sans chemin, la trace est rangée dans le cache sous son horodatage ; renvoie le chemin écrit
+        if chemin is None:
+            dossier = dossier or dossier_traces_defaut()
+            os.makedirs(dossier, exist_ok=True)
+            chemin = os.path.join(dossier, f"trace-{datetime.datetime.now():%Y%m%d-%H%M%S-%f}.json")
+            _evincer_traces(dossier)
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(self.vers_dict(), f, indent=2, ensure_ascii=False)
+        self.chemin = chemin
+        return chemin
+
+    @classmethod
+    def charger(cls, chemin):
+        with open(chemin, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        trace = cls(d.get("nom", ""))
+        trace.debut = d.get("debut", trace.debut)
+        trace.infos = d.get("infos", {})
+        for e in d.get("etapes", []):
+            etape = Etape.depuis_dict(e)
+            trace.etapes[etape.nom] = etape
+        trace.chemin = chemin
+        return trace
+
+def _evincer_traces(dossier, garder=NB_TRACES_CONSERVEES):
+    try:
+        traces = sorted(nom for nom in os.listdir(dossier) if nom.startswith("trace-") and nom.endswith(".json"))
+    except OSError:
+        return
+    for nom in traces[:max(0, len(traces) - garder + 1)]:
+        try:
+            os.remove(os.path.join(dossier, nom))
+        except OSError:
+            pass
+
+def tracer_execution_amie(trace, execution, stats):
+    # Étapes d'une exécution d'AMIE3 : démarrage du JVM (jusqu'à la première ligne), puis chargement
+    # et minage tels qu'AMIE3 les rapporte dans son journal
+    ressources = execution.ressources or {}
+    trace.ajouter("amie", execution.duree or 0.0, cpu=ressources.get("cpu"), memoire_max_mo=ressources.get("memoire_max_mo"),
+                  statut=execution.statut, lignes=len(execution.lignes))
+    if execution.premiere_ligne is not None:
+        trace.ajouter("demarrage_jvm", execution.premiere_ligne, source="amie")
+    if "temps_chargement" in stats:
+        trace.ajouter("chargement_amie", stats["temps_chargement"], source="amie", faits=stats.get("nb_faits"),
+                      memoire_rapportee_mo=stats.get("memoire_chargement_mo"))
+    if "temps_minage" in stats:
+        trace.ajouter("minage_amie", stats["temps_minage"], source="amie", regles=stats.get("nb_regles"))